@@ -1,12 +1,14 @@
 import streamlit as st
 import pandas as pd
-import time
 import os
 import logic
 import json
 from datetime import datetime
 
 import database
+import instrument
+import search_worker
+import sources
 
 # Initialize DB
 database.init_db()
@@ -175,6 +177,7 @@ if not st.session_state['user']:
                     user = database.verify_password(email, password)
                     if user:
                         st.session_state['user'] = user
+                        st.session_state['last_visit'] = database.touch_last_visit(user['id'])
                         # Load Profile
                         profile = database.get_profile(user['id'])
                         if profile:
@@ -237,8 +240,7 @@ if not st.session_state['user']:
             
             if uploaded_cv and 'cv_text' not in st.session_state['registration_data']:
                 with st.spinner("Extracting and analyzing your CV..."):
-                    cv_text = logic.extract_text_from_pdf(uploaded_cv)
-                    profile = logic.generate_candidate_profile(cv_text)
+                    cv_text, profile = logic.profile_cv(uploaded_cv)
                     
                     st.session_state['registration_data']['cv_text'] = cv_text
                     st.session_state['registration_data']['profile'] = profile
@@ -308,6 +310,7 @@ if not st.session_state['user']:
                         
                         user = database.get_user_by_email(st.session_state['registration_data']['email'])
                         st.session_state['user'] = user
+                        st.session_state['last_visit'] = database.touch_last_visit(user['id'])
                         st.session_state['cv_text'] = st.session_state['registration_data']['cv_text']
                         st.session_state['candidate_profile'] = st.session_state['registration_data']['profile']
                         
@@ -351,10 +354,12 @@ with st.sidebar:
     
     cv_upload = st.file_uploader("📄 Upload/Update CV", type="pdf")
     
-    if cv_upload:
+    # The uploader keeps holding the file across reruns, so only process a CV we haven't seen yet
+    cv_fingerprint = logic.pdf_fingerprint(cv_upload.getvalue()) if cv_upload else None
+    
+    if cv_upload and cv_fingerprint != st.session_state.get('cv_fingerprint'):
         with st.spinner("Processing CV..."):
-            cv_text = logic.extract_text_from_pdf(cv_upload)
-            profile = logic.generate_candidate_profile(cv_text)
+            cv_text, profile = logic.profile_cv(cv_upload)
             
             database.save_profile(
                 st.session_state['user']['id'],
@@ -365,6 +370,7 @@ with st.sidebar:
             
             st.session_state['cv_text'] = cv_text
             st.session_state['candidate_profile'] = profile
+            st.session_state['cv_fingerprint'] = cv_fingerprint
             st.success("✅ CV Updated!")
             st.rerun()
     
@@ -394,12 +400,7 @@ with st.sidebar:
     target_email = st.text_input("📧 Alert Email", value=current_target)
     
     if target_email != current_target:
-        conn = database.sqlite3.connect(database.DB_NAME)
-        c = conn.cursor()
-        c.execute("UPDATE users SET target_email = ? WHERE id = ?", 
-                  (target_email, st.session_state['user']['id']))
-        conn.commit()
-        conn.close()
+        database.update_target_email(st.session_state['user']['id'], target_email)
         st.session_state['user']['target_email'] = target_email
     
     st.divider()
@@ -409,8 +410,12 @@ with st.sidebar:
         if not user_profile:
             st.warning("Please upload a CV first!")
         else:
-            st.session_state['trigger_search'] = True
-            st.rerun()
+            candidate_profile = user_profile['structured_profile']
+            candidate_profile['search_keywords'] = user_profile['search_keywords']
+            # Runs in the background; clicking again while it runs just re-attaches to it
+            _, started = search_worker.start_search(st.session_state['user']['id'], candidate_profile)
+            if not started:
+                st.toast("A search is already running")
 
 # Main Page - Job Feed
 st.title("📰 Daily Intelligence Report")
@@ -418,123 +423,250 @@ st.caption(f"Generated on {datetime.now().strftime('%B %d, %Y')}")
 
 st.divider()
 
-# Trigger job search
-if st.session_state.get('trigger_search', False):
-    st.session_state['trigger_search'] = False
-    
-    user_profile = database.get_profile(st.session_state['user']['id'])
-    candidate_profile = user_profile['structured_profile']
-    candidate_profile['search_keywords'] = user_profile['search_keywords']
-    
-    with st.status("🔍 Scanning Job Boards...", expanded=True) as status:
-        start_time = time.time()
-        
-        def update_status(msg):
-            status.write(msg)
-        
-        jobs = logic.fetch_all_jobs(candidate_profile, status_callback=update_status)
-        
-        end_time = time.time()
-        elapsed = end_time - start_time
-        
-        status.update(label=f"✅ Found {len(jobs)} jobs in {elapsed:.2f}s", state="complete", expanded=False)
-    
-    # Match jobs
-    results = []
-    progress_bar = st.progress(0)
-    
-    for i, job in enumerate(jobs):
-        analysis = logic.match_job_to_cv(job['clean_body'], candidate_profile)
-        score = analysis.get('score', 0)
-        
-        if score > 0:  # Only keep jobs with score > 0
-            results.append({
-                "title": job['title'],
-                "org": job['org'],
-                "score": score,
-                "summary": analysis.get('job_summary', 'N/A'),
-                "strengths": analysis.get('strengths', []),
-                "gaps": analysis.get('gaps', []),
-                "url": job['url'],
-                "source": job['source']
-            })
-        
-        progress_bar.progress((i + 1) / len(jobs))
-    
-    progress_bar.empty()
-    st.session_state['job_results'] = sorted(results, key=lambda x: x['score'], reverse=True)
+SEARCH_POLL_SECONDS = 2
+FEED_PAGE_SIZE = 20
 
-# Display job cards
-if 'job_results' in st.session_state and st.session_state['job_results']:
-    st.subheader(f"🎯 {len(st.session_state['job_results'])} Matching Opportunities")
-    
-    for job in st.session_state['job_results']:
-        # Determine badge color
-        badge_class = "score-green" if job['score'] > 85 else "score-orange"
-        
-        # Build strengths list
-        strengths_html = "".join([f"<li>{s}</li>" for s in job['strengths'][:5]])
+def render_job_card(job):
+    # Determine badge color
+    badge_class = "score-green" if job['score'] > 85 else "score-orange"
+    
+    # Build strengths list
+    strengths_html = "".join([f"<li>{s}</li>" for s in job['strengths'][:5]])
+    
+    # Build gaps list
+    gaps_html = "".join([f"<li>{g}</li>" for g in job['gaps'][:5]])
+    
+    # Create card HTML
+    card_html = f"""
+    <div class="job-card">
+        <div class="job-header">
+            <div>
+                <h2 class="job-title">{job['title']}</h2>
+                <p class="job-org">{job['org']}</p>
+            </div>
+            <div class="score-badge {badge_class}">
+                {job['score']}% Match
+            </div>
+        </div>
         
-        # Build gaps list
-        gaps_html = "".join([f"<li>{g}</li>" for g in job['gaps'][:5]])
+        <div class="summary-box">
+            {job['summary']}
+        </div>
         
-        # Create card HTML
-        card_html = f"""
-        <div class="job-card">
-            <div class="job-header">
-                <div>
-                    <h2 class="job-title">{job['title']}</h2>
-                    <p class="job-org">{job['org']}</p>
-                </div>
-                <div class="score-badge {badge_class}">
-                    {job['score']}% Match
-                </div>
-            </div>
-            
-            <div class="summary-box">
-                {job['summary']}
+        <div class="details-grid">
+            <div class="detail-box">
+                <h4>✅ Your Match</h4>
+                <ul>
+                    {strengths_html}
+                </ul>
             </div>
-            
-            <div class="details-grid">
-                <div class="detail-box">
-                    <h4>✅ Your Match</h4>
-                    <ul>
-                        {strengths_html}
-                    </ul>
-                </div>
-                <div class="detail-box">
-                    <h4>⚠️ Potential Gaps</h4>
-                    <ul>
-                        {gaps_html}
-                    </ul>
-                </div>
+            <div class="detail-box">
+                <h4>⚠️ Potential Gaps</h4>
+                <ul>
+                    {gaps_html}
+                </ul>
             </div>
-            
-            <a href="{job['url']}" target="_blank" class="apply-button">
-                Apply Now →
-            </a>
         </div>
-        """
         
-        st.markdown(card_html, unsafe_allow_html=True)
-        
-        # Save button (outside the card)
-        col1, col2, col3 = st.columns([1, 1, 4])
-        with col1:
-            if st.button("💾 Save", key=f"save_{job['url']}", use_container_width=True):
-                saved = database.save_job(
-                    st.session_state['user']['id'],
-                    job['title'],
-                    job['org'],
-                    job['score'],
-                    job['url']
-                )
-                if saved:
-                    st.toast(f"Saved: {job['title']}")
-                else:
-                    st.toast("Already saved!")
+        <a href="{job['url']}" target="_blank" class="apply-button">
+            Apply Now →
+        </a>
+    </div>
+    """
+    
+    st.markdown(card_html, unsafe_allow_html=True)
+    if job.get('alternates'):
+        st.caption("Also posted on " + ", ".join(f"[{a['source']}]({a['url']})" for a in job['alternates']))
+    
+    # Save button (outside the card)
+    col1, col2, col3 = st.columns([1, 1, 4])
+    with col1:
+        if st.button("💾 Save", key=f"save_{job['url']}", use_container_width=True):
+            saved = database.save_job(
+                st.session_state['user']['id'],
+                job['title'],
+                job['org'],
+                job['score'],
+                job['url']
+            )
+            if saved:
+                st.toast(f"Saved: {job['title']}")
+            else:
+                st.toast("Already saved!")
+
+def render_search(search):
+    """Status, progress and the cards scored so far of a running search."""
+    snapshot = search.snapshot()
+    results = snapshot['results']
+    
+    label = "🔍 Scanning Job Boards..." if snapshot['shortlisted'] is None else "🤖 Matching jobs to your profile..."
+    with st.status(label, expanded=snapshot['shortlisted'] is None):
+        for message in snapshot['messages']:
+            st.write(message)
+    if snapshot['shortlisted']:
+        st.progress(snapshot['scored'] / snapshot['shortlisted'],
+                    text=f"Scored {snapshot['scored']} of {snapshot['shortlisted']} shortlisted jobs")
+    
+    if results:
+        st.subheader(f"🎯 {len(results)} Matching Opportunities")
+        for job in results:
+            render_job_card(job)
+
+@st.fragment(run_every=SEARCH_POLL_SECONDS)
+def live_search(user_id):
+    """Re-renders just the feed every few seconds while the background search runs."""
+    search = search_worker.get_search(user_id)
+    if search is None or search.done:
+        # Full rerun to stop polling and render the finished feed
+        st.rerun()
+    render_search(search)
+
+def admin_emails():
+    """Users allowed to see the admin panel: ADMIN_EMAILS in secrets or JOBHUNTER_ADMIN_EMAILS, comma-separated."""
+    emails = ""
+    try:
+        emails = st.secrets.get('ADMIN_EMAILS', '')
+    except:
+        pass
+    emails = emails or os.getenv('JOBHUNTER_ADMIN_EMAILS', '')
+    return {e.strip().lower() for e in emails.split(",") if e.strip()}
 
-elif 'job_results' in st.session_state:
-    st.info("No matching jobs found. Try adjusting your profile or check back later!")
+def render_admin_panel():
+    """User counts and the per-source timings of recent crawls."""
+    stats = database.get_user_stats()
+    col_users, col_subs, col_profiles = st.columns(3)
+    col_users.metric("Users", stats['total_users'])
+    col_subs.metric("Subscribed", stats['active_subscriptions'])
+    col_profiles.metric("With a profile", stats['users_with_profiles'])
+    
+    render_source_registry()
+    
+    runs = instrument.load_runs(limit=10)
+    if not runs:
+        st.caption("No crawls recorded yet.")
+        return
+    labels = {f"{datetime.fromtimestamp(ts):%Y-%m-%d %H:%M} ({run_id})": events for run_id, ts, events in runs}
+    summary = instrument.summarize(labels[st.selectbox("Crawl", list(labels))])
+    if not summary:
+        st.caption("No sources were fetched in this crawl.")
+        return
+    rows = [{
+        "Source": name,
+        "Postings": s['postings'],
+        "Wall (s)": round(s['elapsed_ms'] / 1000, 1),
+        "Requests": s['requests'],
+        "Errors": s['errors'],
+        "p50 (ms)": s['p50_ms'],
+        "p95 (ms)": s['p95_ms'],
+        "KB": round(s['bytes'] / 1024),
+        "Parse (ms)": s['parse_ms'],
+        "Statuses": ", ".join(f"{code}×{n}" for code, n in sorted(s['statuses'].items())),
+    } for name, s in summary.items()]
+    st.dataframe(pd.DataFrame(rows).sort_values("Wall (s)", ascending=False), hide_index=True, use_container_width=True)
+    
+    source = st.selectbox("Source", list(summary))
+    selected = summary[source]
+    st.bar_chart(pd.Series(selected['histogram'], name="Requests"), x_label="Latency", y_label="Requests")
+    if selected['orgs']:
+        org_rows = [{"Org": org, "Postings": s['postings'], "Wall (s)": round(s['elapsed_ms'] / 1000, 1),
+                     "Requests": s['requests'], "Errors": s['errors'], "p95 (ms)": s['p95_ms'],
+                     "KB": round(s['bytes'] / 1024), "Parse (ms)": s['parse_ms']}
+                    for org, s in selected['orgs'].items()]
+        st.dataframe(pd.DataFrame(org_rows).sort_values("Wall (s)", ascending=False), hide_index=True,
+                     use_container_width=True)
+
+def render_source_registry():
+    """Crawl targets with their observed change rate and schedule; org boards can be added or switched off."""
+    targets = sources.registry()
+    st.dataframe(pd.DataFrame([{
+        "Source": t['source'],
+        "Org": t['org'] or "(feed)",
+        "Enabled": bool(t['enabled']),
+        "Changes/day": round(t['change_rate'] * 24, 2) if t['change_rate'] is not None else None,
+        "Every (h)": round(t['interval_hours'] or sources.DEFAULT_INTERVAL_HOURS, 1),
+        "Last crawled": t['last_crawled'],
+        "Last changed": t['last_changed'],
+        "Crawls": t['crawls'],
+    } for t in targets]), hide_index=True, use_container_width=True)
+    
+    col_add, col_toggle = st.columns(2)
+    with col_add.form("add_source_target", clear_on_submit=True):
+        source = st.selectbox("Source", [name for name in sources.names() if sources.has_targets(name)])
+        org = st.text_input("Org board id")
+        if st.form_submit_button("Add board") and org.strip():
+            database.ensure_sources([(source, org.strip())])
+            st.rerun()
+    with col_toggle.form("toggle_source_target"):
+        labels = {f"{t['source']} / {t['org'] or '(feed)'}": t for t in targets}
+        target = labels[st.selectbox("Target", list(labels))]
+        if st.form_submit_button("Enable / disable"):
+            database.set_source_enabled(target['source'], target['org'], not target['enabled'])
+            st.rerun()
+
+def reset_feed_page():
+    st.session_state['feed_page'] = 0
+
+def render_feed(user_id, profile_version, searched):
+    """The user's stored matches for their current profile, a page at a time."""
+    last_visit = st.session_state.get('last_visit')
+    new_count = database.count_matches(user_id, since=last_visit, profile_version=profile_version) if last_visit else 0
+    only_new = False
+    if new_count:
+        only_new = st.toggle(f"🆕 Only show the {new_count} new since your last visit", key="feed_only_new",
+                             on_change=reset_feed_page)
+    
+    since = last_visit if only_new else None
+    total = database.count_matches(user_id, since=since, profile_version=profile_version)
+    if not total:
+        if searched:
+            st.info("No matching jobs found. Try adjusting your profile or check back later!")
+        else:
+            st.info("👈 Click 'Find New Jobs' in the sidebar to start your search!")
+        return
+    
+    pages = (total + FEED_PAGE_SIZE - 1) // FEED_PAGE_SIZE
+    page = min(st.session_state.get('feed_page', 0), pages - 1)
+    
+    st.subheader(f"🎯 {total} Matching Opportunities")
+    jobs = database.get_matches(user_id, limit=FEED_PAGE_SIZE, offset=page * FEED_PAGE_SIZE,
+                                since=since, profile_version=profile_version)
+    alternates = database.get_alternates([job['posting_id'] for job in jobs])
+    for job in jobs:
+        job['alternates'] = alternates.get(job['posting_id'], [])
+        render_job_card(job)
+    
+    if pages > 1:
+        col_prev, col_page, col_next = st.columns([1, 2, 1])
+        with col_prev:
+            if st.button("← Previous", disabled=page == 0, use_container_width=True):
+                st.session_state['feed_page'] = page - 1
+                st.rerun()
+        with col_page:
+            st.caption(f"Page {page + 1} of {pages}")
+        with col_next:
+            if st.button("Next →", disabled=page >= pages - 1, use_container_width=True):
+                st.session_state['feed_page'] = page + 1
+                st.rerun()
+
+# Display job cards
+# Scored matches are stored per user, so returning users see their feed without re-scoring
+user_id = st.session_state['user']['id']
+feed_version = None
+if user_profile:
+    feed_version = logic.profile_version(dict(user_profile['structured_profile'], search_keywords=user_profile['search_keywords']))
+
+if st.session_state['user'].get('email', '').lower() in admin_emails():
+    with st.expander("🛠️ Admin: users and crawl timings"):
+        render_admin_panel()
+
+search = search_worker.get_search(user_id)
+if search and not search.done:
+    live_search(user_id)
 else:
-    st.info("👈 Click 'Find New Jobs' in the sidebar to start your search!")
+    if search:
+        snapshot = search.snapshot()
+        if snapshot['state'] == "failed":
+            st.error(f"Search failed: {snapshot['error']}")
+        else:
+            st.caption(f"✅ Scored {snapshot['shortlisted']} shortlisted jobs in {snapshot['elapsed']:.0f}s")
+    render_feed(user_id, feed_version, searched=search is not None)
@@ -0,0 +1,275 @@
+import os
+import io
+import json
+import time
+import uuid
+import threading
+from types import SimpleNamespace
+
+import cache
+import llm
+import logic
+import prompt
+
+# Offline match scoring through the OpenAI Batch API, for the nightly run. All
+# uncached match prompts are written to one JSONL file, submitted as a batch
+# and polled until it completes; results go into the match cache and are mapped
+# back to their postings. The pending batch is recorded in a small state file,
+# so a run that dies while waiting finishes that batch on the next start
+# instead of paying for it twice.
+
+OFFLINE_SCORING = os.getenv("JOBHUNTER_OFFLINE_SCORING", "0") == "1"
+BATCH_STATE_PATH = os.getenv("JOBHUNTER_BATCH_STATE", "batch_state.json")
+POLL_SECONDS = 30
+MAX_WAIT_SECONDS = int(os.getenv("JOBHUNTER_BATCH_MAX_WAIT", str(3600)))  # Well inside the Actions job limit
+CANCEL_WAIT_SECONDS = 600  # A cancelled batch can take this long to stop and publish its output
+ENDPOINT = "/v1/chat/completions"
+COMPLETION_WINDOW = "24h"
+
+# --- State file ---
+
+def load_state(path=None):
+    """The pending batch recorded by an earlier run, or None."""
+    path = path or BATCH_STATE_PATH
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Unreadable batch state {path}: {e}")
+        return None
+
+def save_state(state, path=None):
+    path = path or BATCH_STATE_PATH
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+def clear_state(path=None):
+    path = path or BATCH_STATE_PATH
+    if os.path.exists(path):
+        os.remove(path)
+
+# --- Batch lifecycle ---
+
+def request_line(custom_id, job, profile_text):
+    """One JSONL line of the batch input: the same prompt _request_match sends."""
+    text, _ = logic.build_match_prompt(job['clean_body'], None, profile_text)
+    return json.dumps({
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": ENDPOINT,
+        "body": {
+            "model": logic.MATCH_MODEL,
+            "messages": [{"role": "user", "content": text}],
+            "response_format": {"type": "json_object"}
+        }
+    })
+
+def submit(client, lines):
+    """Uploads the JSONL lines and starts a batch. Returns the batch id."""
+    data = ("\n".join(lines) + "\n").encode("utf-8")
+    upload = client.files.create(file=("matches.jsonl", data), purpose="batch")
+    batch = client.batches.create(input_file_id=upload.id, endpoint=ENDPOINT, completion_window=COMPLETION_WINDOW)
+    return batch.id
+
+def wait(client, batch_id, poll_seconds=POLL_SECONDS, max_wait=MAX_WAIT_SECONDS):
+    """Polls until the batch stops running. Returns the batch, or None if max_wait runs out first."""
+    deadline = time.monotonic() + max_wait
+    while True:
+        batch = client.batches.retrieve(batch_id)
+        if batch.status in ("completed", "failed", "expired", "cancelled"):
+            return batch
+        if time.monotonic() >= deadline:
+            return None
+        counts = getattr(batch, 'request_counts', None)
+        if counts is not None:
+            print(f"   Batch {batch.status}: {counts.completed}/{counts.total} done")
+        time.sleep(poll_seconds)
+
+def read_results(client, batch):
+    """{custom_id: analysis} from a finished batch's output file. Failed or malformed lines are left out.
+
+    Expired batches still have an output file for the requests that finished in time.
+    """
+    if not getattr(batch, 'output_file_id', None):
+        return {}
+    results = {}
+    for line in client.files.content(batch.output_file_id).text.splitlines():
+        if not line.strip():
+            continue
+        try:
+            entry = json.loads(line)
+            response = entry.get('response') or {}
+            if entry.get('error') or response.get('status_code') != 200:
+                continue
+            body = response['body']
+            analysis = json.loads(body['choices'][0]['message']['content'])
+        except Exception as e:
+            print(f"Skipping malformed batch result: {e}")
+            continue
+        usage = body.get('usage') or {}
+        llm.record("batch", None, usage.get('prompt_tokens', 0), usage.get('completion_tokens', 0))
+        results[entry['custom_id']] = analysis
+    return results
+
+def finish(client, state, path=None, poll_seconds=POLL_SECONDS, max_wait=MAX_WAIT_SECONDS):
+    """Waits for the recorded batch, caches its results and clears the state. Returns {custom_id: analysis}.
+
+    A batch still running after max_wait is cancelled, and the requests it had
+    finished by then are read from its output file like those of an expired
+    batch. If the cancel hasn't taken effect within CANCEL_WAIT_SECONDS, the
+    state is kept so the next run collects that output instead.
+    """
+    batch = wait(client, state['batch_id'], poll_seconds, max_wait)
+    if batch is None:
+        print(f"⏱️ Batch {state['batch_id']} still running after {max_wait}s; cancelling it")
+        try:
+            client.batches.cancel(state['batch_id'])
+        except Exception as e:
+            print(f"Cancelling batch failed: {e}")
+        batch = wait(client, state['batch_id'], poll_seconds, CANCEL_WAIT_SECONDS)
+        if batch is None:
+            print(f"Batch {state['batch_id']} is still cancelling; the next run collects its results")
+            return {}
+    results = read_results(client, batch)
+    print(f"📦 Batch {batch.status}: {len(results)}/{len(state['requests'])} results")
+    for custom_id, analysis in results.items():
+        request = state['requests'].get(custom_id)
+        if request:
+            logic._store_match(request['key'], analysis)
+    clear_state(path)
+    return results
+
+def resume(client=None, path=None, poll_seconds=POLL_SECONDS, max_wait=MAX_WAIT_SECONDS):
+    """Finishes a batch left pending by an interrupted run.
+
+    Returns [(meta, analysis)] for its results, where meta is what the
+    interrupted run passed in for that job, so the caller can still store them.
+    """
+    state = load_state(path)
+    if not state:
+        return []
+    print(f"♻️ Resuming batch {state['batch_id']} from an earlier run...")
+    try:
+        results = finish(client or llm.get_client(), state, path, poll_seconds, max_wait)
+    except Exception as e:
+        print(f"Resuming batch failed: {e}")
+        return []
+    return [(state['requests'][cid].get('meta'), analysis) for cid, analysis in results.items()
+            if cid in state['requests']]
+
+def score_offline(tasks, metas=None, client=None, path=None, poll_seconds=POLL_SECONDS, max_wait=MAX_WAIT_SECONDS):
+    """Batch-API counterpart of logic.score_many: yields ((job, candidate_profile), analysis).
+
+    Cached matches are yielded first. The rest are scored in one batch;
+    metas[i] (JSON-serializable) is kept in the state file with task i so a
+    resumed run can map results back to postings. Jobs the batch fails to
+    score are rescored synchronously.
+    """
+    metas = metas or [None] * len(tasks)
+    pending = {}
+    for i, (job, profile) in enumerate(tasks):
+        key = logic._match_cache_key(job['clean_body'], profile)
+        cached = cache.get_match(key)
+        if cached is not None:
+            yield (job, profile), cached
+        else:
+            pending[f"job-{i}"] = (job, profile, key, metas[i])
+    if not pending:
+        return
+
+    results = {}
+    try:
+        client = client or llm.get_client()
+        profile_texts = {}
+        lines = []
+        for custom_id, (job, profile, _, _) in pending.items():
+            if id(profile) not in profile_texts:
+                profile_texts[id(profile)] = prompt.compact_profile(profile)
+            lines.append(request_line(custom_id, job, profile_texts[id(profile)]))
+        batch_id = submit(client, lines)
+        print(f"📤 Submitted batch {batch_id} with {len(lines)} match prompts")
+        state = {"batch_id": batch_id, "submitted_at": time.time(),
+                 "requests": {cid: {"key": key, "meta": meta} for cid, (_, _, key, meta) in pending.items()}}
+        save_state(state, path)
+        results = finish(client, state, path, poll_seconds, max_wait)
+    except Exception as e:
+        print(f"Batch scoring failed: {e}")
+
+    retry = []
+    for custom_id, (job, profile, _, _) in pending.items():
+        if custom_id in results:
+            yield (job, profile), results[custom_id]
+        else:
+            retry.append((job, profile))
+    if retry:
+        print(f"🔁 Scoring {len(retry)} jobs the batch missed synchronously")
+        yield from logic.score_many(retry)
+
+class LocalBatchClient:
+    """In-process stand-in for the files and batches endpoints, for tests and dry runs.
+
+    Each request body is answered by respond(body) (a chat completion dict).
+    A batch completes after ready_after retrieve calls; a cancelled one has
+    answered its first finished_on_cancel requests.
+    """
+
+    def __init__(self, respond, ready_after=1, finished_on_cancel=0):
+        self.respond = respond
+        self.ready_after = ready_after
+        self.finished_on_cancel = finished_on_cancel
+        self.uploads = {}
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.files = SimpleNamespace(create=self._create_file, content=self._file_content)
+        self.batches = SimpleNamespace(create=self._create_batch, retrieve=self._retrieve, cancel=self._cancel)
+
+    def _create_file(self, file, purpose):
+        name, data = file
+        file_id = f"file-{uuid.uuid4().hex[:8]}"
+        self.uploads[file_id] = data.decode("utf-8") if isinstance(data, bytes) else data
+        return SimpleNamespace(id=file_id)
+
+    def _file_content(self, file_id):
+        return SimpleNamespace(text=self.uploads[file_id])
+
+    def _create_batch(self, input_file_id, endpoint, completion_window):
+        batch_id = f"batch-{uuid.uuid4().hex[:8]}"
+        self.jobs[batch_id] = {"input": input_file_id, "polls": 0, "status": "in_progress", "output": None}
+        return self._retrieve(batch_id, poll=False)
+
+    def _run(self, job, limit=None, status="completed"):
+        out = io.StringIO()
+        for line in self.uploads[job['input']].splitlines()[:limit]:
+            request = json.loads(line)
+            try:
+                response = {"status_code": 200, "body": self.respond(request['body'])}
+                error = None
+            except Exception as e:
+                response, error = None, {"message": str(e)}
+            out.write(json.dumps({"custom_id": request['custom_id'], "response": response, "error": error}) + "\n")
+        output_id = f"file-{uuid.uuid4().hex[:8]}"
+        self.uploads[output_id] = out.getvalue()
+        job['output'] = output_id
+        job['status'] = status
+
+    def _retrieve(self, batch_id, poll=True):
+        with self.lock:
+            job = self.jobs[batch_id]
+            if poll and job['status'] == "in_progress":
+                job['polls'] += 1
+                if job['polls'] >= self.ready_after:
+                    self._run(job)
+            total = len(self.uploads[job['input']].splitlines())
+            done = total if job['status'] == "completed" else 0
+            return SimpleNamespace(id=batch_id, status=job['status'], output_file_id=job['output'],
+                              request_counts=SimpleNamespace(total=total, completed=done, failed=0))
+
+    def _cancel(self, batch_id):
+        with self.lock:
+            job = self.jobs[batch_id]
+            if job['status'] == "in_progress":
+                self._run(job, self.finished_on_cancel, "cancelled")
@@ -0,0 +1,71 @@
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+
+import database
+
+# Benchmark: per-user lookups (profile, saved jobs, top matches) as jobs.db grows.
+# Users, saved jobs and matches are added in stages through the bulk write APIs;
+# after each stage the median lookup latency is measured on random users. Pass
+# --no-index to drop the per-user indexes and compare.
+#
+#   python bench_db.py [max_rows] [--no-index]
+
+ROWS_PER_USER = 100
+LOOKUPS = 300
+
+def grow(next_user, n_users):
+    start = time.time()
+    with database.connection() as conn:
+        conn.executemany("INSERT INTO users (id, email, password_hash, target_email) VALUES (?, ?, ?, ?)",
+                         [(u, f"user{u}@example.com", "x", None) for u in range(next_user, next_user + n_users)])
+        conn.executemany("INSERT INTO profiles (user_id, cv_text, structured_profile, search_keywords) VALUES (?, ?, ?, ?)",
+                         [(u, "cv", "{}", "[]") for u in range(next_user, next_user + n_users)])
+    for u in range(next_user, next_user + n_users):
+        database.save_jobs_many(u, [{"title": f"Job {i}", "org": "Org", "score": i, "url": f"http://x/{u}/{i}"}
+                                    for i in range(ROWS_PER_USER)])
+        database.record_matches_many([{"user_id": u, "posting_id": i + 1, "score": i, "summary": "s",
+                                       "strengths": [], "gaps": [], "profile_version": "v"}
+                                      for i in range(ROWS_PER_USER)])
+    return time.time() - start
+
+def top_matches(user_id):
+    with database.connection() as conn:
+        return conn.execute("SELECT * FROM matches WHERE user_id = ? ORDER BY score DESC LIMIT 20", (user_id,)).fetchall()
+
+def median_us(fn, user_ids):
+    latencies = []
+    for u in user_ids:
+        start = time.perf_counter()
+        fn(int(u))
+        latencies.append(time.perf_counter() - start)
+    return np.median(latencies) * 1e6
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    max_rows = int(args[0]) if args else 1000000
+    database.DB_NAME = os.path.join(tempfile.mkdtemp(), "jobs.db")
+    database.init_db()
+    if "--no-index" in sys.argv:
+        with database.connection() as conn:
+            for index in ("idx_profiles_user_id", "idx_saved_jobs_user_date", "idx_matches_user_score"):
+                conn.execute(f"DROP INDEX {index}")
+        print("Per-user indexes dropped")
+
+    rng = np.random.default_rng(0)
+    n_users = 0
+    stage = 10000
+    print(f"{'rows/table':>10} {'write s':>8} {'profile us':>11} {'saved us':>9} {'matches us':>11}")
+    while stage <= max_rows:
+        new_users = stage // ROWS_PER_USER - n_users
+        elapsed = grow(n_users + 1, new_users)
+        n_users += new_users
+        users = rng.integers(1, n_users + 1, size=LOOKUPS)
+        print(f"{stage:>10} {elapsed:>8.1f} {median_us(database.get_profile, users):>11.0f} "
+              f"{median_us(database.get_saved_jobs, users):>9.0f} {median_us(top_matches, users):>11.0f}")
+        stage *= 10
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import sys
+import time
+import numpy as np
+
+import dedup
+
+# Benchmark: fingerprinting and duplicate detection over synthetic crawls in
+# which a tenth of the postings are lightly edited copies of another posting
+# (the aggregator case), at growing sizes, to check the cost stays near-linear.
+#
+#   python bench_dedup.py [max_postings]
+
+VOCABULARY = [f"w{i}" for i in range(5000)]
+
+def synthetic_crawl(rng, n):
+    postings = []
+    for i in range(n):
+        if i and rng.random() < 0.1:
+            source = postings[int(rng.integers(0, i))]
+            words = source['clean_body'].split()
+            words[int(rng.integers(0, len(words)))] = "edited"
+            text = " ".join(words) + " How to apply: see the link."
+            title, org = source['title'], source['org']
+        else:
+            text = " ".join(rng.choice(VOCABULARY, size=300))
+            title, org = f"Role {i}", f"Org {i % 200}"
+        postings.append({"posting_id": i + 1, "title": title, "org": org, "clean_body": text,
+                         "url": f"https://jobs.example.org/{i}"})
+    return postings
+
+def main():
+    max_postings = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    rng = np.random.default_rng(42)
+    n = 1000
+    while n <= max_postings:
+        postings = synthetic_crawl(rng, n)
+        start = time.time()
+        for p in postings:
+            dedup.fingerprint(p)
+        fingerprint_s = time.time() - start
+        start = time.time()
+        links = dedup.find_duplicates(postings)
+        find_s = time.time() - start
+        print(f"{n:>6} postings: fingerprint {fingerprint_s * 1000 / n:.2f} ms/posting, "
+              f"find {find_s * 1000:.0f} ms ({find_s * 1e6 / n:.1f} us/posting), {len(links)} duplicates linked")
+        n *= 4
+
+if __name__ == "__main__":
+    main()
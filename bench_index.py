@@ -0,0 +1,65 @@
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+
+import relevance
+import vector_index
+
+# Benchmark: top-K profile queries against an on-disk vector index of synthetic
+# postings (default 100k). Rows are generated directly as sparse term weights;
+# embedding throughput is measured separately on a sample of synthetic texts.
+#
+#   python bench_index.py [n_postings] [terms_per_posting]
+
+VOCABULARY = ("evaluation policy analyst data monitoring impact programme public health climate finance "
+              "regulation research economics statistics manager senior director officer consultant "
+              "procurement logistics humanitarian development education gender water energy budget").split()
+
+def synthetic_text(rng, n_words=400):
+    return " ".join(rng.choice(VOCABULARY, size=n_words))
+
+def main():
+    n_postings = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    terms_per_posting = int(sys.argv[2]) if len(sys.argv) > 2 else 150
+    vector_index.INDEX_DIR = os.path.join(tempfile.mkdtemp(), "vector_index")
+    rng = np.random.default_rng(42)
+
+    sample = [synthetic_text(rng) for _ in range(1000)]
+    start = time.time()
+    relevance.term_frequencies(sample)
+    per_doc = (time.time() - start) / len(sample)
+    print(f"Embedding: {per_doc * 1000:.2f} ms/posting ({1 / per_doc:.0f} postings/s)")
+
+    start = time.time()
+    batch = 10000
+    for offset in range(0, n_postings, batch):
+        rows = min(batch, n_postings - offset)
+        tf = np.zeros((rows, relevance.EMBEDDING_DIM), dtype=np.float32)
+        cols = rng.integers(0, relevance.EMBEDDING_DIM, size=(rows, terms_per_posting))
+        weights = (1 + np.log1p(rng.exponential(1.0, size=(rows, terms_per_posting)))) * rng.choice([-1, 1], size=(rows, terms_per_posting))
+        np.put_along_axis(tf, cols, weights.astype(np.float32), axis=1)
+        ids = np.arange(offset + 1, offset + rows + 1)
+        vector_index.append_vectors(ids, [f"{i:015x}" for i in ids], tf)
+    build = time.time() - start
+    vectors_path, _, _ = vector_index._paths()
+    print(f"Build: {n_postings} postings appended in {build:.2f}s, "
+          f"{os.path.getsize(vectors_path) / 1e6:.0f} MB on disk")
+
+    profiles = [{"search_keywords": list(rng.choice(VOCABULARY, size=4))} for _ in range(20)]
+    vector_index.query(profiles[0], 25)  # Warm the page cache
+    latencies = []
+    for profile in profiles:
+        start = time.time()
+        vector_index.query(profile, 25)
+        latencies.append(time.time() - start)
+    latencies = np.array(latencies) * 1000
+    print(f"Query top-25: median {np.median(latencies):.0f} ms, p95 {np.percentile(latencies, 95):.0f} ms")
+
+    start = time.time()
+    vector_index.query(profiles[0], 25, allowed_ids=set(range(1, 500)))
+    print(f"Query restricted to 500 ids: {(time.time() - start) * 1000:.0f} ms")
+
+if __name__ == "__main__":
+    main()
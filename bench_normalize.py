@@ -0,0 +1,57 @@
+import sys
+import time
+import random
+from bs4 import BeautifulSoup
+
+import normalize
+
+# Micro-benchmark: cleaning posting bodies with the old BeautifulSoup path
+# (full html.parser tree + get_text) vs normalize.normalize_body (streaming
+# html.parser handler, whitespace collapse, boilerplate removal, 6000-char cut).
+#
+#   python bench_normalize.py [n_postings] [paragraphs_per_posting]
+
+WORDS = ("evaluation policy analysis programme monitoring results stakeholder data team lead design "
+         "implement report partners donors field research quality budget strategy").split()
+
+def synthetic_posting(rng, paragraphs):
+    def sentence():
+        return " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 20))).capitalize() + "."
+    parts = ["<div class='posting'><h2>About the role</h2>"]
+    for i in range(paragraphs):
+        if i % 4 == 1:
+            parts.append("<h3>Responsibilities</h3><ul>" + "".join(f"<li>{sentence()}</li>" for _ in range(6)) + "</ul>")
+        else:
+            parts.append(f"<p style='margin:0'>{sentence()} <strong>{sentence()}</strong>&nbsp;{sentence()}</p>")
+    parts.append("<h3>Benefits</h3><ul>" + "".join(f"<li>{rng.choice(WORDS)} allowance</li>" for _ in range(8)) + "</ul>")
+    parts.append("<p>We are an equal opportunity employer and consider applicants without regard to race, religion or age.</p></div>")
+    return "".join(parts)
+
+def old_path(raw):
+    return BeautifulSoup(raw, "html.parser").get_text(separator="\n")
+
+def bench(fn, postings):
+    start = time.perf_counter()
+    for raw in postings:
+        fn(raw)
+    return (time.perf_counter() - start) / len(postings) * 1e6
+
+def main():
+    n_postings = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    paragraphs = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    rng = random.Random(0)
+    postings = [synthetic_posting(rng, paragraphs) for _ in range(n_postings)]
+    avg_kb = sum(len(p) for p in postings) / len(postings) / 1024
+    print(f"{n_postings} postings, {avg_kb:.1f} KB of HTML each")
+
+    old = bench(old_path, postings)
+    new = bench(normalize.normalize_body, postings)
+    full = bench(lambda raw: normalize.normalize_body(raw, max_chars=None), postings)
+    print(f"BeautifulSoup get_text:      {old:8.0f} us/posting")
+    print(f"normalize_body (6000 chars): {new:8.0f} us/posting ({old / new:.1f}x)")
+    print(f"normalize_body (no limit):   {full:8.0f} us/posting ({old / full:.1f}x)")
+    sample = postings[0]
+    print(f"Output: {len(old_path(sample))} chars with BeautifulSoup, {len(normalize.normalize_body(sample))} after normalizing")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import sys
+import time
+import io
+import random
+
+import pdfplumber
+import pdf_text
+
+# Benchmark: CV text extraction over a corpus of synthetic text PDFs (2 to 200
+# pages), comparing the old single-pass pdfplumber extraction of every page with
+# the streaming extractor (stops at the prompt budget) and with full streaming
+# extraction in the process pool.
+#
+#   JOBHUNTER_PDF_WORKERS=4 python bench_pdf.py [max_pages]
+
+WORDS = ("evaluation policy analysis programme monitoring results framework impact stakeholder "
+         "survey regression publication journal review development finance climate health").split()
+
+def synthetic_pdf(n_pages, lines_per_page=55, seed=0, text_pages=None):
+    """A minimal multi-page PDF with Helvetica text lines. Pages not in text_pages (if given) have no text layer."""
+    rng = random.Random(seed)
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for p in range(n_pages):
+        lines = []
+        if text_pages is None or p in text_pages:
+            for _ in range(lines_per_page):
+                line = " ".join(rng.choice(WORDS) for _ in range(12))
+                lines.append(f"({line}) Tj T*")
+        stream = ("BT /F1 9 Tf 11 TL 40 800 Td " + " ".join(lines) + " ET").encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_ref = len(objects)
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_ref)
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % k for k in kids) + b"] /Count %d >>" % n_pages
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+def full_single_pass(pdf_bytes):
+    """The previous extractor: every page, one growing string."""
+    text = ""
+    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+        for page in pdf.pages:
+            extracted = page.extract_text()
+            if extracted:
+                text += extracted + "\n"
+    return text
+
+def timed(fn, *args):
+    start = time.time()
+    result = fn(*args)
+    return time.time() - start, len(result)
+
+def main():
+    max_pages = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    corpus = [(n, synthetic_pdf(n, seed=n)) for n in (2, 10, 50, 200) if n <= max_pages]
+    pdf_text._get_pool().submit(int).result()  # Start the pool outside the timings
+
+    print(f"{pdf_text.PDF_WORKERS} extraction worker(s)")
+    print(f"{'pages':>5} {'single pass':>12} {'streaming':>10} {'full, pool':>11} {'chars (stream)':>15}")
+    for n_pages, pdf_bytes in corpus:
+        single, _ = timed(full_single_pass, pdf_bytes)
+        streaming, n_chars = timed(pdf_text.extract_text, pdf_bytes)
+        if n_pages >= pdf_text.PARALLEL_MIN_PAGES:
+            pooled, _ = timed(pdf_text.extract_text, pdf_bytes, None)
+            pooled = f"{pooled:.2f}s"
+        else:
+            pooled = "-"
+        print(f"{n_pages:>5} {single:>11.2f}s {streaming:>9.2f}s {pooled:>11} {n_chars:>15}")
+
+if __name__ == "__main__":
+    main()
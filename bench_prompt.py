@@ -0,0 +1,45 @@
+import sys
+import json
+import random
+
+import bench_normalize
+import logic
+import normalize
+import prompt
+
+# Input tokens per match call: the previous prompt (full profile JSON plus up
+# to 6000 characters of posting) vs the compact profile and the requirement
+# excerpt. Token counts use tiktoken when installed, the local estimate otherwise.
+#
+#   python bench_prompt.py [n_postings] [paragraphs_per_posting]
+
+PROFILE = {
+    "1_essential_qualifications": {"education": "PhD Economics", "years_experience": 8,
+                                   "languages": ["English", "French"], "sector": "International development"},
+    "2_core_tech_stack": ["Impact Evaluation", "Cost-Benefit Analysis", "Survey Design", "Stata", "R"],
+    "3_desired_stack": ["Python", "GIS"],
+    "4_logistics": {"current_location": "Paris, France", "mobility": "Open to relocation"},
+    "search_keywords": ["Evaluation", "Policy Analyst", "Economist"]
+}
+
+def main():
+    n_postings = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    paragraphs = int(sys.argv[2]) if len(sys.argv) > 2 else 12
+    rng = random.Random(0)
+    bodies = [normalize.normalize_body(bench_normalize.synthetic_posting(rng, paragraphs)) for _ in range(n_postings)]
+
+    old_total = new_total = 0
+    profile_text = prompt.compact_profile(PROFILE)
+    for body in bodies:
+        old_prompt = logic.MATCH_PROMPT.format(profile=json.dumps(PROFILE), job_text=body[:normalize.BODY_MAX_CHARS])
+        old_total += prompt.count_tokens(old_prompt)
+        new_total += logic.build_match_prompt(body, PROFILE, profile_text)[1]
+
+    counter = "tiktoken" if prompt._get_encoding() else "estimate"
+    print(f"{n_postings} postings, tokens counted with {counter}")
+    print(f"profile: {prompt.count_tokens(json.dumps(PROFILE))} -> {prompt.count_tokens(profile_text)} tokens")
+    print(f"per call: {old_total / n_postings:.0f} -> {new_total / n_postings:.0f} tokens "
+          f"({1 - new_total / old_total:.0%} fewer)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import os
+import sys
+import tempfile
+import time
+import threading
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import openai
+
+import cache
+import llm
+import logic
+
+# Benchmark: serial match_job_to_cv vs the concurrent score_jobs pipeline
+# against a stub OpenAI client (no network). The stub sleeps LATENCY seconds per
+# call and answers 429 whenever more than RATE_CAP calls are in flight.
+#
+#   python bench_scoring.py [n_jobs] [max_in_flight]
+
+LATENCY = 0.2
+RATE_CAP = 6
+
+class FakeRateLimitError(openai.RateLimitError):
+    def __init__(self):
+        Exception.__init__(self, "429 Too Many Requests")
+        self.response = SimpleNamespace(headers={"retry-after": "0.2"})
+
+class FakeCompletions:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.calls = 0
+        self.rejected = 0
+
+    def create(self, **kwargs):
+        with self.lock:
+            self.calls += 1
+            if self.in_flight >= RATE_CAP:
+                self.rejected += 1
+                raise FakeRateLimitError()
+            self.in_flight += 1
+        try:
+            time.sleep(LATENCY)
+            content = '{"score": 80, "job_summary": "Stub", "strengths": [], "gaps": []}'
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+def main():
+    n_jobs = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    max_in_flight = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    os.environ.setdefault("OPENAI_API_KEY", "bench-key")
+    # Start from an empty match cache so every job costs an API call
+    cache.CACHE_DB_NAME = os.path.join(tempfile.mkdtemp(), "cache.db")
+
+    completions = FakeCompletions()
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    jobs = [{"title": f"Job {i}", "clean_body": f"Job description {i}"} for i in range(n_jobs)]
+    profile = {"search_keywords": ["Evaluation"]}
+
+    with patch('openai.OpenAI', return_value=client):
+        llm.reset_client()
+        serial_jobs = [{"clean_body": f"Serial description {i}"} for i in range(10)]
+        start = time.time()
+        for job in serial_jobs:
+            logic.match_job_to_cv(job['clean_body'], profile)
+        serial = (time.time() - start) / len(serial_jobs) * n_jobs
+        print(f"Serial (extrapolated from 10): {serial:.2f}s for {n_jobs} jobs")
+
+        completions.calls = completions.rejected = 0
+        start = time.time()
+        scored = sum(1 for _ in logic.score_jobs(jobs, profile, max_in_flight=max_in_flight))
+        elapsed = time.time() - start
+        print(f"Pipeline (max_in_flight={max_in_flight}, server cap={RATE_CAP}): "
+              f"{elapsed:.2f}s for {scored} jobs, {completions.calls} calls, {completions.rejected} rate-limited")
+        print(f"Speedup: {serial / elapsed:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+import sqlite3
+import atexit
+import hashlib
+import json
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+import database
+
+# Persistent caches live in their own SQLite file next to jobs.db so they can be
+# wiped at any time without touching user data.
+CACHE_DB_NAME = "cache.db"
+
+MATCH_TTL = 14 * 24 * 3600  # Seconds before a cached match is re-scored
+MATCH_MAX_ENTRIES = 20000  # Least recently used entries beyond this are evicted
+DETAIL_MAX_ENTRIES = 20000  # Posting detail bodies kept, least recently used evicted first
+EVICT_SLACK = 0.01  # Fraction of max_entries a table may grow past its limit between two evictions
+LAST_USED_RESOLUTION = 3600  # Seconds; a hit only bumps last_used when it is older than this
+STATS_FLUSH_EVERY = 100  # Lookups whose hit/miss counts and last_used bumps are written together
+
+_initialized = set()
+
+# Lookups only read: their counters and last_used bumps are buffered here and
+# written in one transaction (see flush_stats), so scoring threads hitting the
+# cache do not queue on SQLite's single writer.
+_pending_lock = threading.Lock()
+_pending_counts = Counter()  # (cache name, "hits" | "misses") -> count
+_pending_used = {}  # table -> {key: last_used}
+_inserts = Counter()  # table -> inserts since its last eviction
+
+@contextmanager
+def _connect():
+    """A pooled connection to the cache database (see database.connection), created on first use."""
+    with database.connection(CACHE_DB_NAME) as conn:
+        if CACHE_DB_NAME not in _initialized:
+            init_cache(conn)
+            _initialized.add(CACHE_DB_NAME)
+        yield conn
+
+def init_cache(conn=None):
+    if conn is None:
+        with database.connection(CACHE_DB_NAME) as conn:
+            return init_cache(conn)
+    c = conn.cursor()
+
+    c.execute('''CREATE TABLE IF NOT EXISTS match_cache (
+        key TEXT PRIMARY KEY,
+        prompt_version TEXT NOT NULL,
+        model TEXT NOT NULL,
+        analysis TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        last_used REAL NOT NULL
+    )''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_match_cache_last_used ON match_cache (last_used)")
+
+    c.execute('''CREATE TABLE IF NOT EXISTS cv_cache (
+        fingerprint TEXT PRIMARY KEY,
+        cv_text TEXT NOT NULL,
+        profile TEXT,
+        profile_version TEXT,
+        created_at REAL NOT NULL
+    )''')
+
+    c.execute('''CREATE TABLE IF NOT EXISTS detail_cache (
+        key TEXT PRIMARY KEY,
+        version TEXT NOT NULL,
+        body TEXT NOT NULL,
+        last_used REAL NOT NULL
+    )''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_detail_cache_last_used ON detail_cache (last_used)")
+
+    c.execute('''CREATE TABLE IF NOT EXISTS cache_stats (
+        name TEXT PRIMARY KEY,
+        hits INTEGER DEFAULT 0,
+        misses INTEGER DEFAULT 0
+    )''')
+
+def _count(name, hit, table=None, key=None, last_used=None):
+    """Buffers a hit or miss and, when the entry's last_used is stale, its new last_used."""
+    now = time.time()
+    with _pending_lock:
+        _pending_counts[(name, "hits" if hit else "misses")] += 1
+        if key is not None and now - last_used > LAST_USED_RESOLUTION:
+            _pending_used.setdefault(table, {})[key] = now
+        due = sum(_pending_counts.values()) >= STATS_FLUSH_EVERY
+    if due:
+        flush_stats()
+
+def _write_pending(c):
+    with _pending_lock:
+        counts, used = dict(_pending_counts), dict(_pending_used)
+        _pending_counts.clear()
+        _pending_used.clear()
+    for (name, column), n in counts.items():
+        c.execute("INSERT OR IGNORE INTO cache_stats (name) VALUES (?)", (name,))
+        c.execute(f"UPDATE cache_stats SET {column} = {column} + ? WHERE name = ?", (n, name))
+    for table, keys in used.items():
+        c.executemany(f"UPDATE {table} SET last_used = ? WHERE key = ?", [(t, k) for k, t in keys.items()])
+
+def flush_stats():
+    """Writes the buffered hit/miss counters and last_used bumps."""
+    try:
+        with _connect() as conn:
+            _write_pending(conn.cursor())
+    except sqlite3.Error as e:
+        print(f"Cache stats write failed: {e}")
+
+atexit.register(flush_stats)
+
+def _evict(c, table, max_entries):
+    """LRU eviction past max_entries, run once every EVICT_SLACK * max_entries inserts rather than on each."""
+    with _pending_lock:
+        _inserts[table] += 1
+        if _inserts[table] < max(1, int(max_entries * EVICT_SLACK)):
+            return
+        _inserts[table] = 0
+    _write_pending(c)  # Recent hits count toward the LRU order
+    c.execute(f'''DELETE FROM {table} WHERE key IN (
+                    SELECT key FROM {table} ORDER BY last_used DESC LIMIT -1 OFFSET ?)''',
+              (max_entries,))
+
+def get_stats(name=None):
+    """Returns {cache_name: {"hits": int, "misses": int}}, or the counters of one cache."""
+    flush_stats()
+    with _connect() as conn:
+        rows = conn.execute("SELECT name, hits, misses FROM cache_stats").fetchall()
+    stats = {row[0]: {"hits": row[1], "misses": row[2]} for row in rows}
+    if name is not None:
+        return stats.get(name, {"hits": 0, "misses": 0})
+    return stats
+
+# --- Match Results ---
+
+def match_key(job_text, candidate_profile, prompt_version, model):
+    """Content address of a match: whitespace-normalized job text, canonical profile JSON, prompt version and model."""
+    normalized_job = " ".join(job_text.split())
+    profile_str = json.dumps(candidate_profile, sort_keys=True)
+    material = "\x1f".join([normalized_job, profile_str, prompt_version, model])
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+def get_match(key, ttl=MATCH_TTL):
+    """Returns the cached analysis for key, or None on a miss or expired entry."""
+    try:
+        with _connect() as conn:
+            c = conn.cursor()
+            now = time.time()
+            c.execute("SELECT analysis, created_at, last_used FROM match_cache WHERE key = ?", (key,))
+            row = c.fetchone()
+            if row and now - row[1] > ttl:
+                c.execute("DELETE FROM match_cache WHERE key = ?", (key,))
+    except sqlite3.Error as e:
+        print(f"Match cache read failed: {e}")
+        return None
+    if row and now - row[1] <= ttl:
+        _count("match", True, "match_cache", key, row[2])
+        return json.loads(row[0])
+    _count("match", False)
+    return None
+
+def put_match(key, prompt_version, model, analysis, max_entries=MATCH_MAX_ENTRIES):
+    try:
+        with _connect() as conn:
+            c = conn.cursor()
+            now = time.time()
+            c.execute('''INSERT OR REPLACE INTO match_cache (key, prompt_version, model, analysis, created_at, last_used)
+                         VALUES (?, ?, ?, ?, ?, ?)''',
+                      (key, prompt_version, model, json.dumps(analysis), now, now))
+            _evict(c, "match_cache", max_entries)
+    except sqlite3.Error as e:
+        print(f"Match cache write failed: {e}")
+
+def purge_matches(prompt_version, model, ttl=MATCH_TTL):
+    """Drops entries from other prompt versions/models and entries older than ttl. Returns rows removed."""
+    with _connect() as conn:
+        c = conn.execute("DELETE FROM match_cache WHERE prompt_version != ? OR model != ? OR created_at < ?",
+                         (prompt_version, model, time.time() - ttl))
+        return c.rowcount
+
+# --- Posting Details ---
+
+def get_detail(source, posting_id, version):
+    """The detail body cached for a posting at this version (e.g. its releasedDate), or None."""
+    key = f"{source}:{posting_id}"
+    try:
+        with _connect() as conn:
+            c = conn.cursor()
+            c.execute("SELECT body, last_used FROM detail_cache WHERE key = ? AND version = ?", (key, version))
+            row = c.fetchone()
+    except sqlite3.Error as e:
+        print(f"Detail cache read failed: {e}")
+        return None
+    if row:
+        _count("detail", True, "detail_cache", key, row[1])
+        return row[0]
+    _count("detail", False)
+    return None
+
+def put_detail(source, posting_id, version, body, max_entries=DETAIL_MAX_ENTRIES):
+    try:
+        with _connect() as conn:
+            c = conn.cursor()
+            c.execute("INSERT OR REPLACE INTO detail_cache (key, version, body, last_used) VALUES (?, ?, ?, ?)",
+                      (f"{source}:{posting_id}", version, body, time.time()))
+            _evict(c, "detail_cache", max_entries)
+    except sqlite3.Error as e:
+        print(f"Detail cache write failed: {e}")
+
+# --- CV Parsing ---
+
+def get_cv(fingerprint):
+    """Returns {"cv_text", "profile", "profile_version"} cached for a PDF fingerprint, or None."""
+    try:
+        with _connect() as conn:
+            c = conn.cursor()
+            c.execute("SELECT cv_text, profile, profile_version FROM cv_cache WHERE fingerprint = ?", (fingerprint,))
+            row = c.fetchone()
+    except sqlite3.Error as e:
+        print(f"CV cache read failed: {e}")
+        return None
+    _count("cv", row is not None)
+    if not row:
+        return None
+    return {
+        "cv_text": row[0],
+        "profile": json.loads(row[1]) if row[1] else None,
+        "profile_version": row[2]
+    }
+
+def put_cv(fingerprint, cv_text, profile=None, profile_version=None):
+    try:
+        with _connect() as conn:
+            conn.execute('''INSERT OR REPLACE INTO cv_cache (fingerprint, cv_text, profile, profile_version, created_at)
+                            VALUES (?, ?, ?, ?, ?)''',
+                         (fingerprint, cv_text, json.dumps(profile) if profile is not None else None,
+                          profile_version, time.time()))
+    except sqlite3.Error as e:
+        print(f"CV cache write failed: {e}")
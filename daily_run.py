@@ -1,6 +1,77 @@
 import os
+import batch_api
+import cache
+import database
+import llm
 import logic
+import relevance
 import sys
+from collections import Counter
+
+def _merged(profiles, field):
+    """Distinct values of a list field across profiles, the ones most profiles share first."""
+    counts = Counter()
+    for profile in profiles:
+        counts.update({str(v).strip() for v in profile.get(field) or [] if str(v).strip()})
+    return [v for v, _ in counts.most_common()]
+
+def build_crawl_profile(profiles):
+    """Merges subscriber profiles into the one profile used to crawl the job boards.
+
+    Every subscriber's keywords and core skills are kept, ranked by how many
+    subscribers share them: keyword-driven sources such as ReliefWeb query all
+    the keywords, and the title filters of SmartRecruiters and Remote OK use
+    both, as they do in a subscriber's own search.
+    """
+    return {"search_keywords": _merged(profiles, 'search_keywords') or ["Evaluation", "Policy"],
+            "2_core_tech_stack": _merged(profiles, '2_core_tech_stack')}
+
+def load_recipients():
+    """Returns [(label, target_email, profile, user_id)] for every subscribed user.
+
+    The legacy single-user setup (cv.pdf + TARGET_EMAIL) is still honoured when present.
+    """
+    recipients = []
+    for user in database.get_subscribed_users():
+        profile = user['structured_profile'] or {}
+        profile['search_keywords'] = user['search_keywords'] or profile.get('search_keywords', [])
+        recipients.append((user['email'], user['target_email'] or user['email'], profile, user['id']))
+
+    cv_path = "cv.pdf"
+    target_email = os.getenv("TARGET_EMAIL")
+    if target_email and os.path.exists(cv_path):
+        # Cached by PDF fingerprint, so an unchanged cv.pdf is free
+        print(f"📄 Loading CV from {cv_path}...")
+        cv_text, profile = logic.profile_cv(cv_path)
+        if cv_text:
+            recipients.append((cv_path, target_email, profile, None))
+        else:
+            print("❌ Failed to extract text from CV.")
+    return recipients
+
+def report_row(job, analysis):
+    row = dict(analysis)
+    row['URL'] = job['url']
+    row['Job Title'] = job['title']
+    row['Organization'] = job['org']
+    row['source'] = job['source']
+    row['Score'] = analysis.get('score', 0)
+    row['Summary'] = analysis.get('job_summary', 'N/A')
+    row['strengths'] = analysis.get('strengths', [])
+    row['gaps'] = analysis.get('gaps', [])
+    return row
+
+def store_resumed(resumed):
+    """Stores the matches of a batch an interrupted run left behind, so they reach the users' feeds."""
+    matches = []
+    for meta, analysis in resumed:
+        if meta and meta.get('user_id') is not None:
+            record = logic.match_record(meta['user_id'], meta, analysis, meta['profile_version'])
+            if record:
+                matches.append(record)
+    if matches:
+        database.record_matches_many(matches)
+        print(f"💾 Stored {len(matches)} matches from the resumed batch")
 
 def main():
     print("🚀 Starting Daily Job Hunter...")
@@ -13,54 +84,80 @@ def main():
     if not all([openai_key, email_user, email_pass]):
         print("❌ Missing environment variables! Ensure OPENAI_API_KEY, EMAIL_USER, and EMAIL_PASS are set.")
         sys.exit(1)
-    
-    # Note: For multi-user support, this script should be modified to:
-    # 1. Query all users with subscription_enabled = 1
-    # 2. Process each user's profile and send individual emails
-    # For now, it processes a single CV file as before
-
-    # 2. Load CV
-    cv_path = "cv.pdf"
-    if not os.path.exists(cv_path):
-        print(f"❌ CV file not found at {cv_path}. Please ensure cv.pdf is in the root directory.")
-        sys.exit(1)
-
-    print(f"📄 Loading CV from {cv_path}...")
-    cv_text = logic.extract_text_from_pdf(cv_path)
-    
-    if not cv_text:
-        print("❌ Failed to extract text from CV.")
-        sys.exit(1)
 
-    # 3. Generate Profile
-    print("🧠 Generating Candidate Profile...")
-    profile = logic.generate_candidate_profile(cv_text)
-    print(f"   Keywords: {profile.get('search_keywords')}")
+    # 2. Load Subscribers
+    database.init_db()
+    if batch_api.OFFLINE_SCORING:
+        store_resumed(batch_api.resume())
+    recipients = load_recipients()
+    if not recipients:
+        print("📭 No subscribed users with a profile.")
+        return
+    print(f"👥 {len(recipients)} subscriber(s)")
 
-    # 4. Fetch Jobs
+    # 3. Crawl the boards that are due, once for everyone
+    # Only postings that are new or changed since the last digest get scored and emailed;
+    # the ones on boards not due today were already found by earlier crawls and sit in the store
+    crawl_profile = build_crawl_profile([profile for _, _, profile, _ in recipients])
+    print(f"   Keywords: {crawl_profile['search_keywords']}")
     print("🔍 Fetching Jobs...")
-    jobs = logic.fetch_all_jobs(profile, status_callback=print)
-    
+    jobs = logic.fetch_all_jobs(crawl_profile, status_callback=print, incremental=True, scheduled=True)
+    jobs = logic.digest_postings(jobs)
+
     if not jobs:
-        print("📭 No jobs found today.")
+        print("📭 No new jobs found today.")
         return
 
-    # 5. Match Jobs
-    print(f"🤖 Matching {len(jobs)} jobs...")
-    results = []
-    for job in jobs:
-        analysis = logic.match_job_to_cv(job['clean_body'], profile)
-        analysis['URL'] = job['url']
-        analysis['Job Title'] = job['title']
-        analysis['Organization'] = job['org']
-        analysis['source'] = job['source']
-        analysis['Score'] = analysis.get('score', 0)
-        analysis['Summary'] = analysis.get('job_summary', 'N/A')
-        results.append(analysis)
-
-    # 6. Send Email
-    print("📧 Sending Email Report...")
-    logic.send_visual_email(results, email_user, email_pass, target_email)
+    # 4. Match each subscriber's most relevant postings in one shared worker pool
+    new_ids = {job['posting_id'] for job in jobs if job.get('posting_id')}
+    if new_ids:
+        # Postings are embedded once in the vector index, so each subscriber only costs a query
+        shortlists = {id(profile): logic.find_matching_postings(profile, allowed_ids=new_ids) for _, _, profile, _ in recipients}
+    else:
+        shortlists = {id(profile): relevance.rank_jobs(jobs, profile) for _, _, profile, _ in recipients}
+    tasks = [(job, profile) for _, _, profile, _ in recipients for job in shortlists[id(profile)]]
+    print(f"🤖 Matching {len(tasks)} shortlisted jobs (of {len(jobs)}) for {len(recipients)} subscriber(s)...")
+    remaining = {key: len(shortlist) for key, shortlist in shortlists.items()}
+    results = {id(profile): [] for _, _, profile, _ in recipients}
+    by_profile = {id(profile): (label, target_email, user_id, logic.profile_version(profile))
+                  for label, target_email, profile, user_id in recipients}
+
+    # 5. Email each subscriber as soon as their last job is scored
+    # Scores are also stored per user so the app's feed shows them without re-scoring
+    for label, target_email, profile, _ in recipients:
+        if not remaining[id(profile)]:
+            print(f"📭 No relevant postings for {label}.")
+    matches = []
+    if batch_api.OFFLINE_SCORING:
+        # Nightly runs aren't latency-sensitive: score through the Batch API at batch pricing
+        metas = [{"user_id": by_profile[id(profile)][2], "posting_id": job.get('posting_id'),
+                  "profile_version": by_profile[id(profile)][3]} for job, profile in tasks]
+        scored = batch_api.score_offline(tasks, metas)
+    else:
+        scored = logic.score_many(tasks)
+    for (job, profile), analysis in scored:
+        key = id(profile)
+        label, target_email, user_id, version = by_profile[key]
+        results[key].append(report_row(job, analysis))
+        if user_id is not None:
+            record = logic.match_record(user_id, job, analysis, version)
+            if record:
+                matches.append(record)
+        remaining[key] -= 1
+        if remaining[key] == 0:
+            print(f"📧 Sending Email Report for {label}...")
+            logic.send_visual_email(results.pop(key), target_email)
+    
+    if matches:
+        database.record_matches_many(matches)
+        print(f"💾 Stored {len(matches)} matches")
+    database.clear_digest_pending(new_ids)
+
+    stats = cache.get_stats("match")
+    print(f"   Match cache: {stats['hits']} hits / {stats['misses']} misses (all time)")
+    for kind, m in llm.metrics().items():
+        print(f"   LLM {kind}: {m['calls']} calls ({m['errors']} failed), p50 {m['p50_s']}s / p95 {m['p95_s']}s, "
+              f"{m['input_tokens']} input tokens ({m['tokens_per_call']} per call)")
     print("✅ Daily run complete!")
 
 if __name__ == "__main__":
@@ -2,14 +2,74 @@ import sqlite3
 import hashlib
 import os
 import json
+import atexit
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 
 DB_NAME = "jobs.db"
 
+BUSY_TIMEOUT = 30  # Seconds a writer waits for another connection's lock before failing
+CACHE_SIZE_KB = 16384  # Page cache per connection
+STATEMENT_CACHE_SIZE = 256  # Prepared statements kept per connection
+POOL_SIZE = 8  # Idle connections kept open per database file
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def _open(path):
+    # check_same_thread is off because pooled connections move between threads;
+    # the pool guarantees only one thread uses a connection at a time
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT, cached_statements=STATEMENT_CACHE_SIZE,
+                           check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    # WAL lets UI sessions keep reading while the daily crawl writes
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KB}")
+    return conn
+
+@contextmanager
+def connection(path=None):
+    """Checks a pooled connection to path (default DB_NAME) out for a with block.
+
+    The block runs as one transaction: committed when it exits normally and
+    rolled back if it raises.
+    """
+    path = path or DB_NAME
+    with _pools_lock:
+        idle = _pools.get(path)
+        conn = idle.pop() if idle else None
+    if conn is None:
+        conn = _open(path)
+    try:
+        with conn:
+            yield conn
+    finally:
+        with _pools_lock:
+            idle = _pools.setdefault(path, [])
+            if len(idle) < POOL_SIZE:
+                idle.append(conn)
+                conn = None
+        if conn is not None:
+            conn.close()
+
+def close_all():
+    """Closes every idle pooled connection, checkpointing the WAL into the database files."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for idle in pools:
+        for conn in idle:
+            conn.close()
+
+atexit.register(close_all)
+
 def init_db():
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    
+    with connection() as conn:
+        _create_tables(conn.cursor())
+
+def _create_tables(c):
     # Create Users Table
     c.execute('''CREATE TABLE IF NOT EXISTS users (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -23,7 +83,12 @@ def init_db():
     # Add subscription_enabled column if it doesn't exist (migration)
     try:
         c.execute("ALTER TABLE users ADD COLUMN subscription_enabled INTEGER DEFAULT 1")
-        conn.commit()
+    except sqlite3.OperationalError:
+        pass  # Column already exists
+    
+    # Add last_visit column if it doesn't exist (migration)
+    try:
+        c.execute("ALTER TABLE users ADD COLUMN last_visit TIMESTAMP")
     except sqlite3.OperationalError:
         pass  # Column already exists
 
@@ -58,8 +123,73 @@ def init_db():
         UNIQUE(user_id, url)
     )''')
     
-    conn.commit()
-    conn.close()
+    # Create Postings Table (every posting seen by a crawl, keyed by source + external id)
+    c.execute('''CREATE TABLE IF NOT EXISTS postings (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        source TEXT NOT NULL,
+        external_id TEXT NOT NULL,
+        url TEXT,
+        title TEXT,
+        org TEXT,
+        clean_body TEXT,
+        content_hash TEXT,
+        first_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(source, external_id)
+    )''')
+    
+    # Dedup fingerprints, the link from a duplicate to its canonical posting and the
+    # flag for postings new or changed since the last daily digest (migration)
+    for column in ("canonical_url TEXT", "dedup_key TEXT", "simhash INTEGER", "canonical_id INTEGER",
+                   "digest_pending INTEGER DEFAULT 0"):
+        try:
+            c.execute(f"ALTER TABLE postings ADD COLUMN {column}")
+        except sqlite3.OperationalError:
+            pass  # Column already exists
+    
+    # Create Sources Table (crawl targets: an org board of a source, or org '' for a whole feed)
+    c.execute('''CREATE TABLE IF NOT EXISTS sources (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        source TEXT NOT NULL,
+        org TEXT NOT NULL DEFAULT '',
+        enabled INTEGER DEFAULT 1,
+        change_rate REAL,
+        interval_hours REAL,
+        last_crawled TIMESTAMP,
+        last_changed TIMESTAMP,
+        crawls INTEGER DEFAULT 0,
+        UNIQUE(source, org)
+    )''')
+    
+    # Query keys (keywords, title terms) each target was last crawled for, as JSON {key: crawled_at} (migration)
+    try:
+        c.execute("ALTER TABLE sources ADD COLUMN crawled_keys TEXT")
+    except sqlite3.OperationalError:
+        pass  # Column already exists
+    
+    # Create Matches Table (one scored result per user and posting)
+    c.execute('''CREATE TABLE IF NOT EXISTS matches (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        posting_id INTEGER NOT NULL,
+        score INTEGER,
+        summary TEXT,
+        strengths TEXT,
+        gaps TEXT,
+        profile_version TEXT,
+        scored_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users (id),
+        FOREIGN KEY (posting_id) REFERENCES postings (id),
+        UNIQUE(user_id, posting_id)
+    )''')
+    
+    # Indexes for the per-user lookups done on every rerun and for the crawl's freshness queries
+    c.execute("CREATE INDEX IF NOT EXISTS idx_profiles_user_id ON profiles (user_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_saved_jobs_user_date ON saved_jobs (user_id, date_added)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_postings_last_seen ON postings (last_seen)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_postings_canonical_id ON postings (canonical_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_matches_user_score ON matches (user_id, score)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_matches_user_scored_at ON matches (user_id, scored_at)")
 
 # --- User Management ---
 
@@ -71,26 +201,18 @@ def hash_password(password):
     return hashlib.sha256((salt + password).encode()).hexdigest()
 
 def create_user(email, password, target_email):
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
     try:
-        pwd_hash = hash_password(password)
-        c.execute("INSERT INTO users (email, password_hash, target_email) VALUES (?, ?, ?)", 
-                  (email, pwd_hash, target_email))
-        conn.commit()
-        return c.lastrowid
+        with connection() as conn:
+            pwd_hash = hash_password(password)
+            c = conn.execute("INSERT INTO users (email, password_hash, target_email) VALUES (?, ?, ?)", 
+                             (email, pwd_hash, target_email))
+            return c.lastrowid
     except sqlite3.IntegrityError:
         return None # Email already exists
-    finally:
-        conn.close()
 
 def get_user_by_email(email):
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    c.execute("SELECT * FROM users WHERE email = ?", (email,))
-    user = c.fetchone()
-    conn.close()
+    with connection() as conn:
+        user = conn.execute("SELECT * FROM users WHERE email = ?", (email,)).fetchone()
     if user:
         return dict(user)
     return None
@@ -104,36 +226,29 @@ def verify_password(email, password):
 # --- Profile Management ---
 
 def save_profile(user_id, cv_text, profile_json, keywords):
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    
-    # Check if profile exists
-    c.execute("SELECT id FROM profiles WHERE user_id = ?", (user_id,))
-    exists = c.fetchone()
-    
     profile_str = json.dumps(profile_json)
     keywords_str = json.dumps(keywords)
     
-    if exists:
-        c.execute('''UPDATE profiles 
-                     SET cv_text = ?, structured_profile = ?, search_keywords = ?, updated_at = CURRENT_TIMESTAMP 
-                     WHERE user_id = ?''', 
-                  (cv_text, profile_str, keywords_str, user_id))
-    else:
-        c.execute('''INSERT INTO profiles (user_id, cv_text, structured_profile, search_keywords) 
-                     VALUES (?, ?, ?, ?)''', 
-                  (user_id, cv_text, profile_str, keywords_str))
-    
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        
+        # Check if profile exists
+        c.execute("SELECT id FROM profiles WHERE user_id = ?", (user_id,))
+        exists = c.fetchone()
+        
+        if exists:
+            c.execute('''UPDATE profiles 
+                         SET cv_text = ?, structured_profile = ?, search_keywords = ?, updated_at = CURRENT_TIMESTAMP 
+                         WHERE user_id = ?''', 
+                      (cv_text, profile_str, keywords_str, user_id))
+        else:
+            c.execute('''INSERT INTO profiles (user_id, cv_text, structured_profile, search_keywords) 
+                         VALUES (?, ?, ?, ?)''', 
+                      (user_id, cv_text, profile_str, keywords_str))
 
 def get_profile(user_id):
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    c.execute("SELECT * FROM profiles WHERE user_id = ?", (user_id,))
-    row = c.fetchone()
-    conn.close()
+    with connection() as conn:
+        row = conn.execute("SELECT * FROM profiles WHERE user_id = ?", (user_id,)).fetchone()
     
     if row:
         data = dict(row)
@@ -152,78 +267,333 @@ def get_profile(user_id):
 # --- Job Management ---
 
 def save_job(user_id, title, company, score, url):
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
     try:
-        c.execute("INSERT INTO saved_jobs (user_id, title, company, score, url) VALUES (?, ?, ?, ?, ?)", 
-                  (user_id, title, company, score, url))
-        conn.commit()
+        with connection() as conn:
+            conn.execute("INSERT INTO saved_jobs (user_id, title, company, score, url) VALUES (?, ?, ?, ?, ?)", 
+                         (user_id, title, company, score, url))
         return True
     except sqlite3.IntegrityError:
         return False
-    finally:
-        conn.close()
+
+def save_jobs_many(user_id, jobs):
+    """Saves several jobs (dicts with title, org, score, url) in one transaction. Returns how many were new."""
+    rows = [(user_id, job.get('title'), job.get('org'), job.get('score'), job.get('url')) for job in jobs]
+    with connection() as conn:
+        before = conn.total_changes
+        conn.executemany("INSERT OR IGNORE INTO saved_jobs (user_id, title, company, score, url) VALUES (?, ?, ?, ?, ?)", rows)
+        return conn.total_changes - before
 
 def get_saved_jobs(user_id):
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    c.execute("SELECT * FROM saved_jobs WHERE user_id = ? ORDER BY date_added DESC", (user_id,))
-    rows = c.fetchall()
-    conn.close()
+    with connection() as conn:
+        rows = conn.execute("SELECT * FROM saved_jobs WHERE user_id = ? ORDER BY date_added DESC", (user_id,)).fetchall()
     return [dict(row) for row in rows]
 
 def delete_job(job_id, user_id):
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("DELETE FROM saved_jobs WHERE id = ? AND user_id = ?", (job_id, user_id))
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        conn.execute("DELETE FROM saved_jobs WHERE id = ? AND user_id = ?", (job_id, user_id))
+
+# --- Posting Store ---
+
+def get_posting_hashes(source):
+    """Returns {external_id: content_hash} for every stored posting of a source."""
+    with connection() as conn:
+        rows = conn.execute("SELECT external_id, content_hash FROM postings WHERE source = ?", (source,)).fetchall()
+    return {row[0]: row[1] for row in rows}
+
+def upsert_postings_many(jobs):
+    """Records crawled postings in one transaction.
+
+    New postings are inserted, changed ones (different content_hash) get their
+    content replaced, and unchanged ones only have last_seen bumped. Jobs with
+    changed=False only need source, external_id and content_hash. New or
+    changed postings store their dedup fingerprints (canonical_url, dedup_key,
+    simhash), lose any duplicate link until dedup runs again and are marked
+    for the next daily digest. Sets
+    job['posting_id'] on every job.
+    """
+    changed = [(job['source'], job['external_id'], job.get('url'), job.get('title'),
+                job.get('org'), job.get('clean_body'), job.get('content_hash'),
+                job.get('canonical_url'), job.get('dedup_key'), job.get('simhash'))
+               for job in jobs if job.get('changed', True)]
+    unchanged = [(job['source'], job['external_id']) for job in jobs if not job.get('changed', True)]
+    ids = {}
+    with connection() as conn:
+        conn.executemany('''INSERT INTO postings (source, external_id, url, title, org, clean_body, content_hash,
+                                                  canonical_url, dedup_key, simhash, digest_pending)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1)
+                            ON CONFLICT(source, external_id) DO UPDATE SET
+                                url = excluded.url, title = excluded.title, org = excluded.org,
+                                clean_body = excluded.clean_body, content_hash = excluded.content_hash,
+                                canonical_url = excluded.canonical_url, dedup_key = excluded.dedup_key,
+                                simhash = excluded.simhash, canonical_id = NULL, digest_pending = 1,
+                                last_seen = CURRENT_TIMESTAMP''', changed)
+        conn.executemany("UPDATE postings SET last_seen = CURRENT_TIMESTAMP WHERE source = ? AND external_id = ?",
+                         unchanged)
+        by_source = {}
+        for job in jobs:
+            by_source.setdefault(job['source'], []).append(job['external_id'])
+        for source, external_ids in by_source.items():
+            for i in range(0, len(external_ids), 500):
+                chunk = external_ids[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                c = conn.execute(f"SELECT id, external_id FROM postings WHERE source = ? AND external_id IN ({placeholders})",
+                                 [source] + chunk)
+                ids.update({(source, row[1]): row[0] for row in c.fetchall()})
+    for job in jobs:
+        job['posting_id'] = ids.get((job['source'], job['external_id']))
+
+def get_last_crawl_time():
+    """Returns the UTC timestamp string of the most recently seen posting, or None if the store is empty."""
+    with connection() as conn:
+        row = conn.execute("SELECT MAX(last_seen) FROM postings").fetchone()
+    return row[0] if row else None
+
+def get_postings_seen_since(cutoff):
+    """Returns every posting whose last_seen is at or after the UTC timestamp string cutoff."""
+    with connection() as conn:
+        rows = conn.execute("SELECT * FROM postings WHERE last_seen >= ? ORDER BY id", (cutoff,)).fetchall()
+    return [dict(row, posting_id=row['id']) for row in rows]
+
+def get_postings(posting_ids):
+    """Returns stored postings by id, in the order given."""
+    if not posting_ids:
+        return []
+    posting_ids = list(posting_ids)
+    rows = {}
+    with connection() as conn:
+        for i in range(0, len(posting_ids), 500):
+            chunk = posting_ids[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            c = conn.execute(f"SELECT * FROM postings WHERE id IN ({placeholders})", chunk)
+            rows.update({row['id']: dict(row) for row in c.fetchall()})
+    return [rows[pid] for pid in posting_ids if pid in rows]
+
+def get_posting_fingerprints(cutoff):
+    """Dedup fingerprints of every posting seen at or after cutoff.
+
+    Rows stored before fingerprinting existed have dedup_key None and come with
+    url, title, org and clean_body so they can be fingerprinted.
+    """
+    with connection() as conn:
+        rows = conn.execute('''SELECT id, canonical_id, canonical_url, dedup_key, simhash,
+                                      CASE WHEN dedup_key IS NULL THEN url END AS url,
+                                      CASE WHEN dedup_key IS NULL THEN title END AS title,
+                                      CASE WHEN dedup_key IS NULL THEN org END AS org,
+                                      CASE WHEN dedup_key IS NULL THEN clean_body END AS clean_body
+                               FROM postings WHERE last_seen >= ?''', (cutoff,)).fetchall()
+    return [dict(row) for row in rows]
+
+def update_fingerprints_many(postings):
+    """Stores the canonical_url, dedup_key and simhash of postings (dicts with id)."""
+    rows = [(p['canonical_url'], p['dedup_key'], p['simhash'], p['id']) for p in postings]
+    with connection() as conn:
+        conn.executemany("UPDATE postings SET canonical_url = ?, dedup_key = ?, simhash = ? WHERE id = ?", rows)
+
+def link_postings_many(links):
+    """Points each posting at its canonical posting; links is {posting_id: canonical_id}, None for standalone."""
+    with connection() as conn:
+        conn.executemany("UPDATE postings SET canonical_id = ? WHERE id = ?",
+                         [(canonical_id, posting_id) for posting_id, canonical_id in links.items()])
+
+def get_alternates(posting_ids):
+    """{canonical posting id: [{id, source, url}]} of the duplicates linked to each of posting_ids."""
+    posting_ids = list(posting_ids)
+    alternates = {}
+    with connection() as conn:
+        for i in range(0, len(posting_ids), 500):
+            chunk = posting_ids[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            c = conn.execute(f"SELECT id, canonical_id, source, url FROM postings WHERE canonical_id IN ({placeholders}) "
+                             "ORDER BY id", chunk)
+            for row in c.fetchall():
+                alternates.setdefault(row['canonical_id'], []).append({"id": row['id'], "source": row['source'],
+                                                                      "url": row['url']})
+    return alternates
+
+def get_digest_postings(cutoff):
+    """Canonical postings new or changed since the last daily digest and seen at or after cutoff."""
+    with connection() as conn:
+        rows = conn.execute('''SELECT * FROM postings
+                               WHERE digest_pending = 1 AND canonical_id IS NULL AND last_seen >= ?
+                               ORDER BY id''', (cutoff,)).fetchall()
+    return [dict(row, posting_id=row['id']) for row in rows]
+
+def clear_digest_pending(posting_ids):
+    with connection() as conn:
+        conn.executemany("UPDATE postings SET digest_pending = 0 WHERE id = ?", [(pid,) for pid in posting_ids])
+
+# --- Crawl Sources ---
+
+def ensure_sources(targets):
+    """Adds the (source, org) crawl targets that aren't stored yet."""
+    with connection() as conn:
+        conn.executemany("INSERT OR IGNORE INTO sources (source, org) VALUES (?, ?)", targets)
+
+def get_sources():
+    """Every crawl target with its schedule, by source then insertion order."""
+    with connection() as conn:
+        rows = conn.execute("SELECT * FROM sources ORDER BY source, id").fetchall()
+    return [dict(row) for row in rows]
+
+def set_source_enabled(source, org, enabled):
+    with connection() as conn:
+        conn.execute("UPDATE sources SET enabled = ? WHERE source = ? AND org = ?", (int(bool(enabled)), source, org))
+
+def update_source_schedule(source, org, change_rate, interval_hours, crawled_at, changed, crawled_keys=None):
+    """Records a crawl of a target: its new change rate and interval, when it last changed and the query keys it covered."""
+    with connection() as conn:
+        conn.execute('''INSERT INTO sources (source, org, change_rate, interval_hours, last_crawled, last_changed, crawls,
+                                             crawled_keys)
+                        VALUES (?, ?, ?, ?, ?, ?, 1, ?)
+                        ON CONFLICT(source, org) DO UPDATE SET
+                            change_rate = excluded.change_rate, interval_hours = excluded.interval_hours,
+                            last_crawled = excluded.last_crawled,
+                            last_changed = COALESCE(excluded.last_changed, last_changed),
+                            crawls = crawls + 1, crawled_keys = excluded.crawled_keys''',
+                     (source, org, change_rate, interval_hours, crawled_at, crawled_at if changed else None, crawled_keys))
+
+# --- Match Results ---
+
+def record_matches_many(matches):
+    """Stores scored results in one transaction, replacing any earlier score for the same user and posting.
+
+    Each match is a dict with user_id, posting_id, score, summary, strengths,
+    gaps and profile_version. scored_at only moves when the score or profile
+    version changes, so re-recording a cached match doesn't make it new again.
+    """
+    rows = [(m['user_id'], m['posting_id'], m.get('score', 0), m.get('summary'),
+             json.dumps(m.get('strengths', [])), json.dumps(m.get('gaps', [])), m.get('profile_version'))
+            for m in matches if m.get('posting_id')]
+    with connection() as conn:
+        conn.executemany('''INSERT INTO matches (user_id, posting_id, score, summary, strengths, gaps, profile_version)
+                            VALUES (?, ?, ?, ?, ?, ?, ?)
+                            ON CONFLICT(user_id, posting_id) DO UPDATE SET
+                                score = excluded.score, summary = excluded.summary,
+                                strengths = excluded.strengths, gaps = excluded.gaps,
+                                profile_version = excluded.profile_version,
+                                scored_at = CASE WHEN score IS excluded.score
+                                                  AND profile_version IS excluded.profile_version
+                                                 THEN scored_at ELSE CURRENT_TIMESTAMP END''', rows)
+
+def _match_filter(user_id, since, profile_version):
+    where = "m.user_id = ? AND m.score > 0"
+    params = [user_id]
+    if since:
+        where += " AND m.scored_at > ?"
+        params.append(since)
+    if profile_version:
+        where += " AND m.profile_version = ?"
+        params.append(profile_version)
+    return where, params
+
+def get_matches(user_id, limit=20, offset=0, since=None, profile_version=None):
+    """Returns a page of a user's stored matches with their posting, best score first.
+
+    since (a UTC timestamp string) keeps only matches scored after it;
+    profile_version keeps only matches scored for that version of the profile.
+    """
+    where, params = _match_filter(user_id, since, profile_version)
+    with connection() as conn:
+        rows = conn.execute(f'''
+            SELECT m.posting_id, m.score, m.summary, m.strengths, m.gaps, m.scored_at,
+                   p.title, p.org, p.url, p.source
+            FROM matches m
+            JOIN postings p ON p.id = m.posting_id
+            WHERE {where}
+            ORDER BY m.score DESC, m.scored_at DESC
+            LIMIT ? OFFSET ?
+        ''', params + [limit, offset]).fetchall()
+    
+    matches = []
+    for row in rows:
+        data = dict(row)
+        try:
+            data['strengths'] = json.loads(data['strengths'])
+        except: data['strengths'] = []
+        
+        try:
+            data['gaps'] = json.loads(data['gaps'])
+        except: data['gaps'] = []
+        
+        matches.append(data)
+    return matches
+
+def count_matches(user_id, since=None, profile_version=None):
+    where, params = _match_filter(user_id, since, profile_version)
+    with connection() as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM matches m WHERE {where}", params).fetchone()[0]
+
+def touch_last_visit(user_id):
+    """Records a visit now and returns the previous visit's UTC timestamp string (None on a first visit)."""
+    with connection() as conn:
+        row = conn.execute("SELECT last_visit FROM users WHERE id = ?", (user_id,)).fetchone()
+        conn.execute("UPDATE users SET last_visit = CURRENT_TIMESTAMP WHERE id = ?", (user_id,))
+    return row[0] if row else None
 
 # --- Admin Functions ---
 
 def get_all_users():
     """Get all users with their profile status."""
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    
-    # Get users with profile status
-    c.execute('''
-        SELECT u.*, 
-               CASE WHEN p.id IS NOT NULL THEN 1 ELSE 0 END as has_profile,
-               p.updated_at as profile_updated
-        FROM users u
-        LEFT JOIN profiles p ON u.id = p.user_id
-        ORDER BY u.created_at DESC
-    ''')
-    rows = c.fetchall()
-    conn.close()
+    with connection() as conn:
+        # Get users with profile status
+        rows = conn.execute('''
+            SELECT u.*, 
+                   CASE WHEN p.id IS NOT NULL THEN 1 ELSE 0 END as has_profile,
+                   p.updated_at as profile_updated
+            FROM users u
+            LEFT JOIN profiles p ON u.id = p.user_id
+            ORDER BY u.created_at DESC
+        ''').fetchall()
     return [dict(row) for row in rows]
 
+def get_subscribed_users():
+    """Get users with subscription enabled and a stored profile, with their parsed profile."""
+    with connection() as conn:
+        rows = conn.execute('''
+            SELECT u.id, u.email, u.target_email, p.structured_profile, p.search_keywords
+            FROM users u
+            JOIN profiles p ON u.id = p.user_id
+            WHERE u.subscription_enabled = 1
+            ORDER BY u.id
+        ''').fetchall()
+    
+    users = []
+    for row in rows:
+        data = dict(row)
+        try:
+            data['structured_profile'] = json.loads(data['structured_profile'])
+        except: data['structured_profile'] = {}
+        
+        try:
+            data['search_keywords'] = json.loads(data['search_keywords'])
+        except: data['search_keywords'] = []
+        
+        users.append(data)
+    return users
+
 def toggle_subscription(user_id, enabled):
     """Enable or disable email subscription for a user."""
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("UPDATE users SET subscription_enabled = ? WHERE id = ?", (1 if enabled else 0, user_id))
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        conn.execute("UPDATE users SET subscription_enabled = ? WHERE id = ?", (1 if enabled else 0, user_id))
+
+def update_target_email(user_id, target_email):
+    """Changes where a user's daily alerts are sent."""
+    with connection() as conn:
+        conn.execute("UPDATE users SET target_email = ? WHERE id = ?", (target_email, user_id))
 
 def get_user_stats():
     """Get user statistics."""
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    
-    c.execute("SELECT COUNT(*) FROM users")
-    total_users = c.fetchone()[0]
-    
-    c.execute("SELECT COUNT(*) FROM users WHERE subscription_enabled = 1")
-    active_subscriptions = c.fetchone()[0]
-    
-    c.execute("SELECT COUNT(DISTINCT user_id) FROM profiles")
-    users_with_profiles = c.fetchone()[0]
-    
-    conn.close()
+    with connection() as conn:
+        c = conn.cursor()
+        
+        c.execute("SELECT COUNT(*) FROM users")
+        total_users = c.fetchone()[0]
+        
+        c.execute("SELECT COUNT(*) FROM users WHERE subscription_enabled = 1")
+        active_subscriptions = c.fetchone()[0]
+        
+        c.execute("SELECT COUNT(DISTINCT user_id) FROM profiles")
+        users_with_profiles = c.fetchone()[0]
     
     return {
         "total_users": total_users,
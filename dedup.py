@@ -0,0 +1,163 @@
+import re
+import hashlib
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+import numpy as np
+
+import relevance
+
+# Cross-source duplicate detection. The same vacancy is often crawled from an
+# org's own board and from an aggregator, or twice under different tracking
+# URLs. Each posting gets three fingerprints: its canonical URL, a normalized
+# title + org key and a 64-bit SimHash of its body. Postings are checked in
+# order against hash tables of the canonical ones seen so far (the SimHash in
+# LSH bands), so a crawl costs about one lookup per posting, and duplicates
+# are linked to the first posting of their group.
+
+SIMHASH_BITS = 64
+BANDS = 4  # Bands of 16 bits: SimHashes within BANDS - 1 bits share a band
+MAX_DISTANCE = 3  # Bodies this close (Hamming distance) are the same posting
+KEY_MAX_DISTANCE = 18  # Same title and org: bodies need only be roughly alike
+MIN_FEATURES = 20  # Bodies with fewer tokens get no SimHash
+BODY_CHARS = 20000
+
+TRACKING_PARAMS = {"ref", "src", "source", "referrer", "lever-source", "lever-origin", "gh_src", "fbclid", "gclid"}
+ORG_SUFFIXES = {"inc", "llc", "ltd", "limited", "gmbh", "plc", "corp", "co", "sa", "ag"}
+
+_MASK = (1 << SIMHASH_BITS) - 1
+_BAND_BITS = SIMHASH_BITS // BANDS
+_SHIFTS = np.arange(SIMHASH_BITS, dtype=np.uint64)
+_BRACKETS_RE = re.compile(r"\([^)]*\)|\[[^\]]*\]")
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+_hash_cache = {}
+
+def canonical_url(url):
+    """url without scheme, www., tracking parameters, fragment or trailing slash, for comparison."""
+    if not url:
+        return ""
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return url.strip().lower()
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                   if not k.lower().startswith("utm_") and k.lower() not in TRACKING_PARAMS)
+    return urlunsplit(("", host, parts.path.rstrip("/"), urlencode(query), "")).lstrip("/")
+
+def _words(text):
+    return _NON_ALNUM_RE.sub(" ", text.lower()).split()
+
+def dedup_key(title, org):
+    """Normalized "title|org": case, punctuation and bracketed notes like "(Remote)" dropped, org legal suffixes too."""
+    title_words = _words(_BRACKETS_RE.sub(" ", title or ""))
+    org_words = [w for w in _words(org or "") if w not in ORG_SUFFIXES]
+    return " ".join(title_words) + "|" + "".join(org_words)
+
+def _token_hash(token):
+    """Stable 64-bit hash of a token; blake2b so SimHashes are identical across processes."""
+    h = _hash_cache.get(token)
+    if h is None:
+        h = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+        if len(_hash_cache) < 500000:
+            _hash_cache[token] = h
+    return h
+
+def simhash(text):
+    """64-bit SimHash of text's unigrams and bigrams, weighted 1 + log tf, as a signed int (SQLite INTEGER).
+
+    None when text has fewer than MIN_FEATURES distinct tokens.
+    """
+    counts = {}
+    for token in relevance.tokenize((text or "")[:BODY_CHARS]):
+        counts[token] = counts.get(token, 0) + 1
+    if len(counts) < MIN_FEATURES:
+        return None
+    hashes = np.fromiter((_token_hash(t) for t in counts), dtype=np.uint64, count=len(counts))
+    weights = 1.0 + np.log(np.fromiter(counts.values(), dtype=np.float64, count=len(counts)))
+    signs = ((hashes[:, None] >> _SHIFTS) & np.uint64(1)).astype(np.float64) * 2 - 1
+    bits = (weights @ signs) > 0
+    value = int((bits.astype(np.uint64) << _SHIFTS).sum())
+    return value - (1 << SIMHASH_BITS) if value >> (SIMHASH_BITS - 1) else value
+
+def distance(a, b):
+    """Hamming distance between two SimHashes."""
+    return bin((a ^ b) & _MASK).count("1")
+
+def _bands(h):
+    h &= _MASK
+    return [(i, (h >> (i * _BAND_BITS)) & ((1 << _BAND_BITS) - 1)) for i in range(BANDS)]
+
+def fingerprint(posting):
+    """Sets canonical_url, dedup_key and simhash on a posting dict (url, title, org, clean_body) and returns it."""
+    posting['canonical_url'] = canonical_url(posting.get('url'))
+    posting['dedup_key'] = dedup_key(posting.get('title'), posting.get('org'))
+    posting['simhash'] = simhash(posting.get('clean_body'))
+    return posting
+
+class Index:
+    """Hash tables over the fingerprints of canonical postings."""
+
+    def __init__(self):
+        self.urls = {}
+        self.keys = {}
+        self.bands = {}
+
+    def add(self, posting_id, fp):
+        if fp.get('canonical_url'):
+            self.urls.setdefault(fp['canonical_url'], posting_id)
+        self.keys.setdefault(fp['dedup_key'], []).append((posting_id, fp.get('simhash')))
+        if fp.get('simhash') is not None:
+            for band in _bands(fp['simhash']):
+                self.bands.setdefault(band, []).append((posting_id, fp['simhash']))
+
+    def find(self, fp):
+        """The id of an indexed posting fp duplicates, or None."""
+        if fp.get('canonical_url') and fp['canonical_url'] in self.urls:
+            return self.urls[fp['canonical_url']]
+        h = fp.get('simhash')
+        for posting_id, other in self.keys.get(fp['dedup_key'], ()):
+            if (h is None and other is None) or (h is not None and other is not None and distance(h, other) <= KEY_MAX_DISTANCE):
+                return posting_id
+        if h is not None:
+            for band in _bands(h):
+                for posting_id, other in self.bands.get(band, ()):
+                    if distance(h, other) <= MAX_DISTANCE:
+                        return posting_id
+        return None
+
+def find_duplicates(postings, known=()):
+    """Links each of postings (fingerprinted, with posting_id) that duplicates an earlier posting.
+
+    known are stored fingerprints (id, canonical_id, canonical_url, dedup_key,
+    simhash) of postings not in the crawl batch. Returns {posting_id:
+    canonical_id} for the links to make; canonical_id None unlinks a known
+    duplicate whose canonical posting is no longer stored, so it stands on its own.
+    """
+    index = Index()
+    known = sorted(known, key=lambda r: r['id'])
+    stored_ids = {r['id'] for r in known} | {p['posting_id'] for p in postings}
+    links = {}
+    for row in known:
+        if row.get('canonical_id') and row['canonical_id'] in stored_ids:
+            continue
+        if row.get('canonical_id'):
+            links[row['id']] = None
+        index.add(row['id'], row)
+
+    # Lowest id first, so the posting seen first stays canonical
+    for posting in sorted(postings, key=lambda p: p['posting_id']):
+        canonical_id = index.find(posting)
+        if canonical_id is None or canonical_id == posting['posting_id']:
+            index.add(posting['posting_id'], posting)
+        else:
+            links[posting['posting_id']] = canonical_id
+
+    # Alternates of a posting that just became a duplicate itself follow it to its canonical one
+    for row in known:
+        if links.get(row.get('canonical_id')):
+            links[row['id']] = links[row['canonical_id']]
+    return links
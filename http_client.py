@@ -0,0 +1,365 @@
+import os
+import json
+import time
+import codecs
+import hashlib
+import threading
+import weakref
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib.parse import urlparse
+from urllib3.util.retry import Retry
+
+import instrument
+
+# Shared fetch layer for the job-board fetchers: one pooled keep-alive session,
+# per-host concurrency limits, default timeouts and ETag/Last-Modified
+# revalidation backed by an on-disk response cache. Large JSON feeds can be
+# read item by item as they arrive (iter_json), so memory stays bounded by the
+# largest item rather than the whole feed.
+
+CONNECT_TIMEOUT = float(os.getenv("JOBHUNTER_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("JOBHUNTER_READ_TIMEOUT", "20"))
+POOL_MAXSIZE = 16  # Keep-alive connections kept per host
+USER_AGENT = "JobHunter/1.0"
+
+RESPONSE_CACHE_DIR = "http_cache"
+RESPONSE_CACHE_MAX_AGE = 30 * 24 * 3600  # Seconds before unused cached bodies are pruned
+STREAM_CHUNK_BYTES = 64 * 1024
+
+DEFAULT_HOST_CONCURRENCY = 4
+HOST_CONCURRENCY = {
+    "api.smartrecruiters.com": 6,
+    "boards-api.greenhouse.io": 4,
+    "api.lever.co": 4,
+    "api.reliefweb.int": 2,
+    "remoteok.com": 1,
+}
+
+_session = None
+_session_lock = threading.Lock()
+_host_semaphores = {}
+_host_semaphores_lock = threading.Lock()
+
+def get_session():
+    """Returns the process-wide requests session, creating it on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            # Retry refused connections and 5xx, but never a read timeout: a hung board should fail fast
+            retries = Retry(total=2, read=False, backoff_factor=0.5, status_forcelist=[502, 503, 504],
+                            allowed_methods=["GET", "HEAD"])
+            adapter = HTTPAdapter(pool_connections=len(HOST_CONCURRENCY) + 4,
+                                  pool_maxsize=POOL_MAXSIZE, max_retries=retries)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update({"User-Agent": USER_AGENT, "Accept-Encoding": "gzip, deflate"})
+            _session = session
+            prune_response_cache()
+        return _session
+
+def _host_semaphore(url):
+    """Returns the shared semaphore limiting concurrent requests to the URL's host."""
+    host = urlparse(url).netloc
+    with _host_semaphores_lock:
+        if host not in _host_semaphores:
+            limit = HOST_CONCURRENCY.get(host, DEFAULT_HOST_CONCURRENCY)
+            _host_semaphores[host] = threading.BoundedSemaphore(limit)
+        return _host_semaphores[host]
+
+def request(method, url, **kwargs):
+    """Performs an HTTP request on the shared session under the per-host limit, recording it in instrument.
+
+    A streamed response keeps its host slot until it is closed (iter_json
+    closes it), so streamed downloads count toward the limit while their body
+    is read.
+    """
+    kwargs.setdefault("timeout", (CONNECT_TIMEOUT, READ_TIMEOUT))
+    semaphore = _host_semaphore(url)
+    semaphore.acquire()
+    start = time.perf_counter()
+    try:
+        response = get_session().request(method, url, **kwargs)
+    except Exception:
+        semaphore.release()
+        instrument.record_http(method, url, "error", 0, (time.perf_counter() - start) * 1000)
+        raise
+    latency_ms = (time.perf_counter() - start) * 1000
+    if kwargs.get("stream"):
+        _hold_slot(response, semaphore)
+    else:
+        semaphore.release()
+    instrument.record_http(method, url, response.status_code, _transferred(response, kwargs.get("stream")), latency_ms)
+    return response
+
+def _hold_slot(response, semaphore):
+    """Releases semaphore once, when response is closed or, failing that, garbage collected."""
+    lock = threading.Lock()
+    held = [True]
+
+    def release():
+        with lock:
+            if held:
+                held.pop()
+                semaphore.release()
+
+    close = response.close
+    def close_and_release():
+        try:
+            close()
+        finally:
+            release()
+    response.close = close_and_release
+    try:
+        weakref.finalize(response, release)
+    except TypeError:
+        pass  # Not weak-referenceable (test doubles)
+
+def _transferred(response, stream):
+    """Bytes on the wire: Content-Length (the compressed size) when given, else the body read so far."""
+    try:
+        return int(response.headers.get("Content-Length"))
+    except (TypeError, ValueError):
+        return 0 if stream else len(response.content or b"")
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+def get(url, conditional=False, **kwargs):
+    """GETs url. With conditional=True the last 200 body is kept on disk and
+    revalidated with If-None-Match/If-Modified-Since; a 304 is returned as the
+    cached 200 response with from_cache set to True.
+
+    With stream=True as well, a cached body is read from disk as it is
+    consumed, and a new 200 body is only written to the cache by iter_json
+    once it has been read to the end."""
+    if not conditional:
+        return request("GET", url, **kwargs)
+
+    meta_path, body_path = _cache_paths(url, kwargs.get("params"))
+    meta = _read_meta(meta_path)
+    headers = dict(kwargs.pop("headers", None) or {})
+    if meta and os.path.exists(body_path):
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    response = request("GET", url, headers=headers, **kwargs)
+    response.from_cache = False
+    if response.status_code == 304 and meta:
+        try:
+            if kwargs.get("stream"):
+                response.close()
+                body = open(body_path, "rb")
+            else:
+                with open(body_path, "rb") as f:
+                    body = f.read()
+        except OSError:
+            return request("GET", url, **kwargs)
+        os.utime(meta_path)
+        return _cached_response(url, meta, body)
+
+    if response.status_code == 200 and (response.headers.get("ETag") or response.headers.get("Last-Modified")):
+        if kwargs.get("stream"):
+            response.cache_paths = (meta_path, body_path)
+        else:
+            _write_cache(meta_path, body_path, response)
+    return response
+
+# --- On-disk response cache ---
+
+def _cache_paths(url, params=None):
+    key = url if not params else url + "?" + json.dumps(params, sort_keys=True)
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+    base = os.path.join(RESPONSE_CACHE_DIR, digest)
+    return base + ".json", base + ".body"
+
+def _read_meta(meta_path):
+    try:
+        with open(meta_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _cache_meta(response):
+    return {
+        "url": response.url,
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "content_type": response.headers.get("Content-Type"),
+        "encoding": response.encoding,
+    }
+
+def _write_cache(meta_path, body_path, response):
+    meta = _cache_meta(response)
+    try:
+        os.makedirs(RESPONSE_CACHE_DIR, exist_ok=True)
+        # Write to temp files and rename so concurrent readers never see a partial body
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(body_path + suffix, "wb") as f:
+            f.write(response.content)
+        with open(meta_path + suffix, "w") as f:
+            json.dump(meta, f)
+        os.replace(body_path + suffix, body_path)
+        os.replace(meta_path + suffix, meta_path)
+    except OSError as e:
+        print(f"Response cache write failed: {e}")
+
+def _cached_response(url, meta, body):
+    """A 200 response for a cached body, given as bytes or as an open file to stream from."""
+    response = requests.Response()
+    response.status_code = 200
+    response.url = meta.get("url") or url
+    if isinstance(body, bytes):
+        response._content = body
+    else:
+        response.raw = body
+    response.encoding = meta.get("encoding")
+    response.headers = CaseInsensitiveDict({"Content-Type": meta.get("content_type") or ""})
+    response.from_cache = True
+    return response
+
+def prune_response_cache(max_age=RESPONSE_CACHE_MAX_AGE):
+    """Deletes cached bodies not revalidated within max_age seconds."""
+    if not os.path.isdir(RESPONSE_CACHE_DIR):
+        return
+    cutoff = time.time() - max_age
+    for name in os.listdir(RESPONSE_CACHE_DIR):
+        path = os.path.join(RESPONSE_CACHE_DIR, name)
+        try:
+            if name.endswith(".json") and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                os.remove(path[:-len(".json")] + ".body")
+        except OSError:
+            pass
+
+# --- Streaming JSON ---
+
+_VALUE_DELIMITERS = " \t\r\n,]}:"
+
+class _JsonStream:
+    """Incremental reader over text chunks that decodes one JSON value at a time."""
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.decoder = json.JSONDecoder()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _more(self):
+        """Appends the next chunk, dropping what was already consumed. False at the end of the stream."""
+        chunk = next(self.chunks, None) if not self.eof else None
+        if chunk is None:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """The next non-whitespace character, without consuming it; "" at the end."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._more():
+                return ""
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} in JSON stream, got {self.peek()!r}")
+        self.pos += 1
+
+    def value(self):
+        """Decodes the next complete value, reading chunks until it is whole."""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+                # A number may continue in the next chunk ("1" of "1.5"), so only a delimiter after it ends it
+                if self.eof or (end < len(self.buf) and self.buf[end] in _VALUE_DELIMITERS):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._more()
+
+def iter_json_items(chunks, key=None):
+    """Yields the items of a JSON array from text chunks: the top-level array,
+    or the array under key in a top-level object (nothing if key is missing)."""
+    stream = _JsonStream(chunks)
+    if key is not None:
+        stream.expect("{")
+        while True:
+            if stream.peek() == "}":
+                return
+            name = stream.value()
+            stream.expect(":")
+            if name == key:
+                break
+            stream.value()
+            if stream.peek() == ",":
+                stream.expect(",")
+    stream.expect("[")
+    if stream.peek() == "]":
+        return
+    while True:
+        yield stream.value()
+        if stream.peek() == "]":
+            return
+        stream.expect(",")
+
+def iter_json(response, key=None, chunk_size=STREAM_CHUNK_BYTES):
+    """Yields the items of the JSON array in a response as its body arrives (see iter_json_items).
+
+    Get the response with stream=True. Stopping early is fine: the connection
+    is closed. A conditional GET's new body is written to the response cache
+    as it is read, and kept only if it was read to the end.
+    """
+    cache_paths = getattr(response, "cache_paths", None)
+    tee = None
+    if isinstance(cache_paths, tuple):
+        try:
+            os.makedirs(RESPONSE_CACHE_DIR, exist_ok=True)
+            tee_path = cache_paths[1] + f".{os.getpid()}.{threading.get_ident()}.tmp"
+            tee = open(tee_path, "wb")
+        except OSError as e:
+            print(f"Response cache write failed: {e}")
+
+    def chunks():
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        for chunk in response.iter_content(chunk_size):
+            if tee:
+                tee.write(chunk)
+            yield decoder.decode(chunk)
+        yield decoder.decode(b"", final=True)
+
+    complete = False
+    try:
+        yield from iter_json_items(chunks(), key)
+        complete = True
+    finally:
+        response.close()
+        if tee:
+            tee.close()
+            _finish_tee(tee_path, cache_paths, response, complete)
+
+def _finish_tee(tee_path, cache_paths, response, complete):
+    meta_path, body_path = cache_paths
+    try:
+        if not complete:
+            os.remove(tee_path)
+            return
+        meta_tmp = meta_path + f".{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(meta_tmp, "w") as f:
+            json.dump(_cache_meta(response), f)
+        os.replace(tee_path, body_path)
+        os.replace(meta_tmp, meta_path)
+    except OSError as e:
+        print(f"Response cache write failed: {e}")
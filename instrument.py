@@ -0,0 +1,216 @@
+import os
+import json
+import time
+import uuid
+import threading
+from contextlib import contextmanager
+
+# Fetch instrumentation. Every HTTP call made through http_client and every
+# source/org fetch is recorded as a JSON line (latency, bytes, status, posting
+# count, parse time) tagged with the crawl it belongs to. A crawl's events are
+# also kept in memory so the run can print a per-source summary, and the admin
+# panel summarizes the most recent crawls from the log file.
+
+METRICS_LOG = os.getenv("JOBHUNTER_METRICS_LOG", "fetch_metrics.jsonl")
+METRICS_LOG_MAX_BYTES = 5 * 1024 * 1024  # Rotated to .1 beyond this
+LATENCY_BUCKETS_MS = (100, 250, 500, 1000, 2500, 5000)
+
+_run = {"id": None, "started": None, "events": []}
+_run_lock = threading.Lock()
+_log_lock = threading.Lock()
+_local = threading.local()
+
+def start_run(kind="crawl"):
+    """Starts a new crawl; later events are tagged with its id. Returns the id."""
+    with _run_lock:
+        _run["id"] = uuid.uuid4().hex[:12]
+        _run["started"] = time.time()
+        _run["events"] = []
+    emit("run_start", kind=kind)
+    return _run["id"]
+
+def end_run():
+    """Records the end of the crawl and returns its summary."""
+    with _run_lock:
+        elapsed = time.time() - _run["started"] if _run["started"] else 0
+    emit("run_end", elapsed_ms=round(elapsed * 1000))
+    return summarize(run_events())
+
+def run_events():
+    with _run_lock:
+        return list(_run["events"])
+
+def emit(event, **fields):
+    """Records one event in the current run and appends it to the JSON lines log."""
+    record = {"ts": round(time.time(), 3), "run": _run["id"], "event": event}
+    record.update(fields)
+    with _run_lock:
+        _run["events"].append(record)
+    _write(record)
+
+def _write(record):
+    if not METRICS_LOG:
+        return
+    try:
+        with _log_lock:
+            if os.path.exists(METRICS_LOG) and os.path.getsize(METRICS_LOG) > METRICS_LOG_MAX_BYTES:
+                os.replace(METRICS_LOG, METRICS_LOG + ".1")
+            with open(METRICS_LOG, "a") as f:
+                f.write(json.dumps(record) + "\n")
+    except OSError as e:
+        print(f"Metrics log write failed: {e}")
+
+# --- Scopes ---
+
+def current():
+    """The innermost fetch scope of this thread, or None."""
+    stack = getattr(_local, "stack", None)
+    return stack[-1] if stack else None
+
+@contextmanager
+def scope(source, org=None):
+    """Attributes HTTP calls made by this thread to source/org while the block runs.
+
+    On exit a "fetch" event records the elapsed time, the time spent in HTTP
+    calls and the rest as parse time. Scopes that fan out to org threads mark
+    themselves with has_orgs, and their parse time is left to the org events.
+    """
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    state = {"source": source, "org": org, "http_ms": 0.0, "postings": None, "error": None, "has_orgs": False}
+    stack.append(state)
+    start = time.perf_counter()
+    try:
+        yield state
+    except Exception as e:
+        state["error"] = str(e)
+        raise
+    finally:
+        stack.pop()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        parse_ms = None if state["has_orgs"] else round(max(0.0, elapsed_ms - state["http_ms"]), 1)
+        emit("fetch", source=source, org=org, postings=state["postings"], elapsed_ms=round(elapsed_ms, 1),
+             http_ms=round(state["http_ms"], 1), parse_ms=parse_ms, error=state["error"])
+
+@contextmanager
+def attach(state):
+    """Attributes this thread's HTTP calls to state, a scope opened by another thread (for worker pools)."""
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    stack.append(state)
+    try:
+        yield state
+    finally:
+        stack.pop()
+
+def record_http(method, url, status, n_bytes, latency_ms, from_cache=False):
+    """Records one HTTP call, attributed to the calling thread's scope."""
+    state = current()
+    if state:
+        state["http_ms"] += latency_ms
+    emit("http", source=state["source"] if state else None, org=state["org"] if state else None,
+         method=method, url=url.split("?")[0], status=status, bytes=n_bytes,
+         latency_ms=round(latency_ms, 1), from_cache=from_cache)
+
+# --- Summaries ---
+
+def _percentile(values, q):
+    if not values:
+        return 0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def _histogram(latencies):
+    labels = [f"<{b}ms" for b in LATENCY_BUCKETS_MS] + [f">={LATENCY_BUCKETS_MS[-1]}ms"]
+    counts = dict.fromkeys(labels, 0)
+    for latency in latencies:
+        for bound, label in zip(LATENCY_BUCKETS_MS, labels):
+            if latency < bound:
+                counts[label] += 1
+                break
+        else:
+            counts[labels[-1]] += 1
+    return counts
+
+def _new_stats():
+    return {"requests": 0, "errors": 0, "statuses": {}, "bytes": 0, "latencies": [],
+            "postings": 0, "parse_ms": 0.0, "elapsed_ms": 0.0}
+
+def _finish(stats):
+    latencies = stats.pop("latencies")
+    stats["p50_ms"] = round(_percentile(latencies, 0.5), 1)
+    stats["p95_ms"] = round(_percentile(latencies, 0.95), 1)
+    stats["histogram"] = _histogram(latencies)
+    stats["parse_ms"] = round(stats["parse_ms"], 1)
+    stats["elapsed_ms"] = round(stats["elapsed_ms"], 1)
+    return stats
+
+def summarize(events):
+    """{source: stats} with per-org stats under "orgs"; HTTP calls outside any scope go under "other"."""
+    sources = {}
+    for e in events:
+        if e["event"] not in ("http", "fetch"):
+            continue
+        source = sources.setdefault(e.get("source") or "other", dict(_new_stats(), orgs={}))
+        targets = [source]
+        if e.get("org"):
+            targets.append(source["orgs"].setdefault(e["org"], _new_stats()))
+        for stats in targets:
+            if e["event"] == "http":
+                stats["requests"] += 1
+                status = str(e["status"])
+                stats["statuses"][status] = stats["statuses"].get(status, 0) + 1
+                if status == "error" or int(status) >= 400:
+                    stats["errors"] += 1
+                stats["bytes"] += e.get("bytes") or 0
+                stats["latencies"].append(e["latency_ms"])
+            else:
+                stats["parse_ms"] += e.get("parse_ms") or 0
+                if e.get("error"):
+                    stats["errors"] += 1
+        if e["event"] == "fetch":
+            # Org fetches overlap, so wall time and posting totals come from each scope's own event
+            stats = targets[-1]
+            stats["elapsed_ms"] = e["elapsed_ms"]
+            stats["postings"] = e.get("postings") or 0
+    for source in sources.values():
+        for org, stats in source["orgs"].items():
+            source["orgs"][org] = _finish(stats)
+        _finish(source)
+    return sources
+
+def summary_lines(summary):
+    """One line per source, slowest first, for the console or a status box."""
+    lines = []
+    for name, s in sorted(summary.items(), key=lambda item: -item[1]["elapsed_ms"]):
+        line = (f"{name}: {s['postings']} postings in {s['elapsed_ms'] / 1000:.1f}s, {s['requests']} requests "
+                f"(p50 {s['p50_ms']:.0f}ms, p95 {s['p95_ms']:.0f}ms), {s['bytes'] / 1024:.0f} KB, "
+                f"parse {s['parse_ms']:.0f}ms")
+        if s["errors"]:
+            line += f", {s['errors']} errors"
+        if s["orgs"]:
+            slowest = max(s["orgs"].items(), key=lambda item: item[1]["elapsed_ms"])
+            line += f"; slowest org {slowest[0]} ({slowest[1]['elapsed_ms'] / 1000:.1f}s)"
+        lines.append(line)
+    return lines
+
+def load_runs(path=None, limit=5):
+    """[(run_id, started_ts, events)] for the last limit runs in the log, newest first."""
+    path = path or METRICS_LOG
+    runs = {}
+    for name in (path + ".1", path):
+        try:
+            with open(name) as f:
+                for line in f:
+                    try:
+                        e = json.loads(line)
+                    except ValueError:
+                        continue
+                    if e.get("run"):
+                        runs.setdefault(e["run"], []).append(e)
+        except OSError:
+            continue
+    ordered = sorted(runs.items(), key=lambda item: item[1][0]["ts"], reverse=True)[:limit]
+    return [(run_id, events[0]["ts"], events) for run_id, events in ordered]
@@ -0,0 +1,158 @@
+import os
+import json
+import time
+import threading
+
+import openai
+
+# One OpenAI client (sync, and async for event-loop callers) per process and retry setting. The API key is looked up once, the client's
+# HTTP connection pool (keep-alive connections) is shared by every call and
+# thread, and each call is timed and its token usage recorded per kind of call
+# ("profile", "match", "screen"...), so a run can report latency and cost.
+
+LLM_TIMEOUT = float(os.getenv("JOBHUNTER_LLM_TIMEOUT", "60"))  # Seconds per call
+# SDK retries on connection errors, 429 and 5xx. Calls that run under logic's adaptive limiter pass
+# max_retries=0 so rate limits reach the limiter, which does its own retrying.
+LLM_MAX_RETRIES = int(os.getenv("JOBHUNTER_LLM_RETRIES", "2"))
+LATENCY_SAMPLES = 10000  # Per kind, for the percentiles
+
+_api_key = None
+_clients = {}  # max_retries -> client
+_async_clients = {}  # max_retries -> async client
+_client_lock = threading.Lock()
+
+def get_api_key():
+    """OpenAI API key from Streamlit secrets or the environment, looked up once it is found."""
+    global _api_key
+    if _api_key:
+        return _api_key
+    key = None
+    try:
+        import streamlit as st
+        if hasattr(st, 'secrets') and 'OPENAI_API_KEY' in st.secrets:
+            key = st.secrets['OPENAI_API_KEY']
+    except:
+        pass
+    _api_key = key or os.getenv('OPENAI_API_KEY')
+    return _api_key
+
+def get_client(max_retries=LLM_MAX_RETRIES):
+    """The shared sync client that retries failed calls max_retries times, created on first use."""
+    with _client_lock:
+        client = _clients.get(max_retries)
+        if client is None:
+            api_key = get_api_key()
+            if not api_key:
+                raise ValueError("OPENAI_API_KEY not found in secrets or environment")
+            client = _clients[max_retries] = openai.OpenAI(api_key=api_key, timeout=LLM_TIMEOUT, max_retries=max_retries)
+        return client
+
+def get_async_client(max_retries=LLM_MAX_RETRIES):
+    """The shared async client, for use from one long-lived event loop."""
+    with _client_lock:
+        client = _async_clients.get(max_retries)
+        if client is None:
+            api_key = get_api_key()
+            if not api_key:
+                raise ValueError("OPENAI_API_KEY not found in secrets or environment")
+            client = _async_clients[max_retries] = openai.AsyncOpenAI(api_key=api_key, timeout=LLM_TIMEOUT,
+                                                                      max_retries=max_retries)
+        return client
+
+def reset_client():
+    """Drops the clients and the cached key, e.g. after the key changes."""
+    global _api_key
+    with _client_lock:
+        _api_key = None
+        _clients.clear()
+        _async_clients.clear()
+
+# --- Metrics ---
+
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+def record(kind, latency=None, input_tokens=0, output_tokens=0, error=False):
+    """Adds one call to the metrics of its kind. latency is None for calls not timed here (e.g. Batch API results)."""
+    with _metrics_lock:
+        m = _metrics.setdefault(kind, {"calls": 0, "errors": 0, "input_tokens": 0, "output_tokens": 0, "latencies": []})
+        m["calls"] += 1
+        m["errors"] += int(error)
+        m["input_tokens"] += input_tokens
+        m["output_tokens"] += output_tokens
+        if latency is not None and len(m["latencies"]) < LATENCY_SAMPLES:
+            m["latencies"].append(latency)
+
+def _percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def metrics():
+    """{kind: {calls, errors, input_tokens, output_tokens, tokens_per_call, p50_s, p95_s, mean_s}} for this process."""
+    with _metrics_lock:
+        snapshot = {kind: dict(m, latencies=list(m["latencies"])) for kind, m in _metrics.items()}
+    out = {}
+    for kind, m in snapshot.items():
+        latencies = m.pop("latencies")
+        m["tokens_per_call"] = round(m["input_tokens"] / m["calls"]) if m["calls"] else 0
+        m["p50_s"] = round(_percentile(latencies, 0.5), 3)
+        m["p95_s"] = round(_percentile(latencies, 0.95), 3)
+        m["mean_s"] = round(sum(latencies) / len(latencies), 3) if latencies else 0.0
+        out[kind] = m
+    return out
+
+def reset_metrics():
+    with _metrics_lock:
+        _metrics.clear()
+
+def _usage(response, local_tokens):
+    """(input, output) tokens of a response, preferring the API's counts to the local estimate."""
+    usage = getattr(response, 'usage', None)
+    prompt_tokens = getattr(usage, 'prompt_tokens', None)
+    completion_tokens = getattr(usage, 'completion_tokens', None)
+    if not isinstance(prompt_tokens, int) or prompt_tokens <= 0:
+        prompt_tokens = local_tokens or 0
+    if not isinstance(completion_tokens, int):
+        completion_tokens = 0
+    return prompt_tokens, completion_tokens
+
+# --- Calls ---
+
+def chat_json(model, text, kind="chat", timeout=None, local_tokens=None, max_retries=LLM_MAX_RETRIES):
+    """Sends one user message in JSON mode and returns the parsed reply. Raises on failure.
+
+    local_tokens is the caller's token count of text, used when the response has no usage.
+    """
+    client = get_client(max_retries)
+    start = time.perf_counter()
+    try:
+        response = client.chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": text}],
+            response_format={"type": "json_object"},
+            timeout=timeout or LLM_TIMEOUT
+        )
+    except Exception:
+        record(kind, time.perf_counter() - start, local_tokens or 0, error=True)
+        raise
+    record(kind, time.perf_counter() - start, *_usage(response, local_tokens))
+    return json.loads(response.choices[0].message.content)
+
+async def chat_json_async(model, text, kind="chat", timeout=None, local_tokens=None, max_retries=LLM_MAX_RETRIES):
+    """Async chat_json on the shared async client."""
+    client = get_async_client(max_retries)
+    start = time.perf_counter()
+    try:
+        response = await client.chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": text}],
+            response_format={"type": "json_object"},
+            timeout=timeout or LLM_TIMEOUT
+        )
+    except Exception:
+        record(kind, time.perf_counter() - start, local_tokens or 0, error=True)
+        raise
+    record(kind, time.perf_counter() - start, *_usage(response, local_tokens))
+    return json.loads(response.choices[0].message.content)
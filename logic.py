@@ -1,55 +1,150 @@
 import os
 import json
-import requests
 import time
-import pdfplumber
 import smtplib
-import io
-from bs4 import BeautifulSoup
+import hashlib
+import random
+import threading
 import openai
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeout
+from datetime import datetime, timedelta, timezone
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 
+import cache
+import database
+import dedup
+import http_client
+import instrument
+import llm
+import normalize
+import pdf_text
+import prompt
+import relevance
+import sources
+import vector_index
+
 # Initialize OpenAI client
 # Client will be initialized inside functions to allow env var setting in main.py
 
-def extract_text_from_pdf(pdf_input):
-    """Extracts text from a PDF file path or file-like object."""
-    text = ""
+# --- Fetch engine settings ---
+FETCH_DEADLINE = 60  # Seconds a full scan may take before we return what we have
+MAX_ORG_WORKERS = 8  # Parallel org requests per fetcher
+CRAWL_MAX_AGE_HOURS = 6  # On-demand searches reuse the posting store if it was crawled more recently
+POSTING_MAX_AGE_DAYS = 14  # Postings not seen by a crawl for this long are treated as closed
+
+# ReliefWeb: the date window and fields are part of the API query, and result pages are fetched concurrently
+RELIEFWEB_URL = "https://api.reliefweb.int/v2/jobs?appname=AngeloDiLegge-JobResearch-9k2x5-g1sb1E"
+RELIEFWEB_WINDOW_DAYS = 7
+RELIEFWEB_PAGE_SIZE = 200
+RELIEFWEB_MAX_PAGES = 10
+RELIEFWEB_DETAIL_BATCH = 50  # Postings per full-body request
+RELIEFWEB_KEYWORDS_PER_QUERY = 5  # Keywords ORed in one listing query; longer lists are split over several
+
+# SmartRecruiters: listing pages (the API's maximum page size) are fetched concurrently
+SMARTRECRUITERS_PAGE_SIZE = 100
+SMARTRECRUITERS_MAX_PAGES = 10
+
+# Default org boards; the crawl reads the current list from the source registry
+SMARTRECRUITERS_ORGS = ["OECD", "CERN", "TheGlobalFund", "Euroclear", "ReliefInternational", "InternationalSOS", "JobsForHumanity", "OxfamAmerica2", "PlanInternational", "Dalberg"]
+GREENHOUSE_ORGS = ["worldresourcesinstitute", "path", "dataorg", "interamerican", "educate", "onecampaign"]
+LEVER_ORGS = ["climatepolicyinitiative", "vitalstrategies", "dimagi", "givedirectly", "openai", "anthropic"]
+
+# --- Scoring pipeline settings ---
+MAX_SCORING_IN_FLIGHT = int(os.getenv("JOBHUNTER_MAX_IN_FLIGHT", "8"))
+SCORING_MAX_BACKOFF = 30  # Seconds
+# Batch mode: one quick-screen prompt scores several jobs; only jobs at or above
+# the threshold get the full single-job analysis
+BATCH_SCORING = os.getenv("JOBHUNTER_BATCH_SCORING", "0") == "1"
+BATCH_SIZE = int(os.getenv("JOBHUNTER_BATCH_SIZE", "20"))
+BATCH_THRESHOLD = int(os.getenv("JOBHUNTER_BATCH_THRESHOLD", "60"))
+BATCH_JOB_TOKENS = 150  # Excerpt budget per job in a batch prompt
+
+_crawls = threading.local()
+
+def _note_crawl(source, org, jobs, keys=()):
+    """Records a crawl of a target in the schedule, or holds it for fetch_all_jobs.
+
+    Inside fetch_all_jobs a source's crawls are only recorded once its results
+    are accepted, so a source that overruns the deadline stays due.
+    """
+    pending = getattr(_crawls, "pending", None)
+    if pending is None:
+        sources.record_crawl(source, org, jobs, keys=keys)
+    else:
+        pending.append((source, org, jobs, keys))
+
+def _fetch_orgs(fetch_org, targets, source, keys=()):
+    """Runs fetch_org for every target in parallel and flattens the results in target order.
+
+    fetch_org returns None when a board can't be read; the failure is recorded
+    in the org's fetch event and left out of the crawl schedule, so the board
+    stays due instead of counting as a crawl that found no changes. keys are
+    the query keys noted as covered for each board read.
+    """
+    if not targets:
+        return []
+    parent = instrument.current()
+    if parent:
+        parent["has_orgs"] = True
+
+    def fetch(org):
+        with instrument.scope(source, org) as state:
+            jobs = fetch_org(org)
+            if jobs is None:
+                state["error"] = "fetch failed"
+            else:
+                state["postings"] = len(jobs)
+        return jobs
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=min(len(targets), MAX_ORG_WORKERS)) as pool:
+        futures = {pool.submit(fetch, org): org for org in targets}
+        for future in as_completed(futures):
+            org = futures[future]
+            try:
+                jobs = future.result()
+            except Exception:
+                jobs = None
+            if jobs is not None:
+                _note_crawl(source, org, jobs, keys)
+            results[org] = jobs or []
+    jobs = []
+    for org in targets:
+        jobs.extend(results.get(org, []))
+    return jobs
+
+def _map_in_scope(fn, items):
+    """fn over items on up to MAX_ORG_WORKERS threads, results in order; HTTP calls count toward the caller's fetch scope."""
+    items = list(items)
+    if not items:
+        return []
+    parent = instrument.current()
+
+    def run(item):
+        if parent is None:
+            return fn(item)
+        with instrument.attach(parent):
+            return fn(item)
+
+    with ThreadPoolExecutor(max_workers=min(len(items), MAX_ORG_WORKERS)) as pool:
+        return list(pool.map(run, items))
+
+def extract_text_from_pdf(pdf_input, max_chars=pdf_text.CV_TEXT_CHARS):
+    """Extracts up to max_chars of text (all of it for None) from a PDF given as bytes, a file path or a file-like object."""
     try:
-        # If input is bytes, wrap in BytesIO
-        if isinstance(pdf_input, bytes):
-            pdf_input = io.BytesIO(pdf_input)
-            
-        with pdfplumber.open(pdf_input) as pdf:
-            for page in pdf.pages:
-                extracted = page.extract_text()
-                if extracted:
-                    text += extracted + "\n"
+        return pdf_text.extract_text(read_pdf_bytes(pdf_input), max_chars)
     except Exception as e:
         print(f"Error extracting text from PDF: {e}")
-    return text
+        return ""
 
-def get_openai_key():
-    """Get OpenAI API key from secrets or environment."""
-    try:
-        import streamlit as st
-        if hasattr(st, 'secrets') and 'OPENAI_API_KEY' in st.secrets:
-            return st.secrets['OPENAI_API_KEY']
-    except:
-        pass
-    return os.getenv('OPENAI_API_KEY')
-
-def generate_candidate_profile(cv_text):
-    """Uses OpenAI to summarize CV into a structured profile for IOs."""
-    print("🧠 Analyzing CV against IO criteria...")
-    prompt = f"""
+PROFILE_MODEL = "gpt-4o-mini"
+PROFILE_PROMPT = """
     You are a Recruitment Expert for International Organizations (UN, EU, OECD).
     Analyze this CV.
 
     CV TEXT:
-    {cv_text[:12000]}
+    {cv_text}
 
     OUTPUT JSON ONLY:
     {{
@@ -68,183 +163,638 @@ def generate_candidate_profile(cv_text):
         "search_keywords": ["List 3-4 keywords for finding relevant jobs"]
     }}
     """
+PROFILE_PROMPT_VERSION = hashlib.sha256((PROFILE_PROMPT + PROFILE_MODEL).encode("utf-8")).hexdigest()[:12]
+
+def _request_profile(cv_text):
+    """Sends the profiling prompt to OpenAI and returns the parsed profile. Raises on failure."""
+    prompt = PROFILE_PROMPT.format(cv_text=cv_text[:pdf_text.CV_TEXT_CHARS])
+    return llm.chat_json(PROFILE_MODEL, prompt, kind="profile")
+
+def _default_profile():
+    return {"search_keywords": ["Evaluation", "Policy"], "1_essential_qualifications": {"years_experience": 5}}
+
+def generate_candidate_profile(cv_text):
+    """Uses OpenAI to summarize CV into a structured profile for IOs."""
+    print("🧠 Analyzing CV against IO criteria...")
+    try:
+        return _request_profile(cv_text)
+    except Exception as e:
+        print(f"Error generating profile: {e}")
+        return _default_profile()
+
+def read_pdf_bytes(pdf_input):
+    """Returns the raw bytes of a PDF given as bytes, a file path or a file-like object (e.g. a Streamlit upload)."""
+    if isinstance(pdf_input, bytes):
+        return pdf_input
+    if isinstance(pdf_input, (str, os.PathLike)):
+        with open(pdf_input, "rb") as f:
+            return f.read()
+    if hasattr(pdf_input, 'getvalue'):
+        return pdf_input.getvalue()
+    pdf_input.seek(0)
+    return pdf_input.read()
+
+def pdf_fingerprint(pdf_bytes):
+    return hashlib.sha256(pdf_bytes).hexdigest()
+
+def profile_cv(pdf_input):
+    """Extracts and profiles a CV, reusing cached text and profile for identical PDF bytes.
+
+    Returns (cv_text, profile). A cached CV costs no pdfplumber pass and no LLM
+    call; a failed profiling call falls back to the default profile and is not cached.
+    """
+    pdf_bytes = read_pdf_bytes(pdf_input)
+    fingerprint = pdf_fingerprint(pdf_bytes)
+    cached = cache.get_cv(fingerprint)
+    if cached and cached['profile'] is not None and cached['profile_version'] == PROFILE_PROMPT_VERSION:
+        return cached['cv_text'], cached['profile']
+
+    if cached:
+        cv_text = cached['cv_text']
+    else:
+        cv_text = extract_text_from_pdf(pdf_bytes)
+        cache.put_cv(fingerprint, cv_text)
+
+    if not cv_text.strip():
+        # Scanned or unreadable PDF: nothing for the LLM to profile
+        return cv_text, _default_profile()
+
+    print("🧠 Analyzing CV against IO criteria...")
     try:
-        api_key = get_openai_key()
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY not found in secrets or environment")
-        client = openai.OpenAI(api_key=api_key)
-        response = client.chat.completions.create(
-            model="gpt-4o-mini", 
-            messages=[{"role": "user", "content": prompt}], 
-            response_format={"type": "json_object"}
-        )
-        return json.loads(response.choices[0].message.content)
+        profile = _request_profile(cv_text)
     except Exception as e:
         print(f"Error generating profile: {e}")
-        return {"search_keywords": ["Evaluation", "Policy"], "1_essential_qualifications": {"years_experience": 5}}
+        return cv_text, _default_profile()
+    cache.put_cv(fingerprint, cv_text, profile, PROFILE_PROMPT_VERSION)
+    return cv_text, profile
+
+def _content_hash(*parts):
+    return hashlib.sha256("\x1f".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+
+def _known_postings(source):
+    """Returns {external_id: content_hash} from the posting store, or {} if it can't be read."""
+    try:
+        return database.get_posting_hashes(source)
+    except Exception as e:
+        print(f"Posting store unavailable for {source}: {e}")
+        return {}
+
+def _unchanged(source, external_id, content_hash):
+    """Placeholder for a stored posting whose content hasn't changed since the last crawl."""
+    return {"source": source, "external_id": external_id, "content_hash": content_hash, "changed": False}
+
+def _reliefweb_query(payload):
+    """One ReliefWeb jobs API call; {} on failure, so one bad page doesn't sink the others."""
+    try:
+        response = http_client.post(RELIEFWEB_URL, json=payload)
+        if response.status_code != 200:
+            print(f"ReliefWeb Error: {response.status_code}")
+            return {}
+        return response.json()
+    except Exception as e:
+        print(f"ReliefWeb Exception: {e}")
+        return {}
+
+def reliefweb_keywords(profile):
+    """The keywords fetch_reliefweb queries for profile."""
+    # Ensure keywords are strings
+    return [str(k) for k in profile.get('search_keywords', ["Evaluation"])] or ["Evaluation"]
+
+def _reliefweb_listing(query_string, since):
+    """Every posting created since `since` that matches query_string, with the minimal profile, a page at a time.
+
+    None if the first page can't be read.
+    """
+    listing = {
+        "profile": "minimal",
+        "query": {"value": query_string},
+        "filter": {"field": "date.created", "value": {"from": since}},
+        "fields": {"include": ["title", "date.changed"]},
+        "sort": ["date.created:desc"],
+        "limit": RELIEFWEB_PAGE_SIZE
+    }
+    first = _reliefweb_query(dict(listing, offset=0))
+    if not first:
+        return None
+    entries = first.get('data', [])
+    total = min(first.get('totalCount', len(entries)), RELIEFWEB_PAGE_SIZE * RELIEFWEB_MAX_PAGES)
+    offsets = range(RELIEFWEB_PAGE_SIZE, total, RELIEFWEB_PAGE_SIZE)
+    for page in _map_in_scope(lambda offset: _reliefweb_query(dict(listing, offset=offset)), offsets):
+        entries.extend(page.get('data', []))
+    return entries
 
 def fetch_reliefweb(profile):
+    """Postings created in the last RELIEFWEB_WINDOW_DAYS that match the profile's keywords.
+
+    Keywords are ORed RELIEFWEB_KEYWORDS_PER_QUERY at a time, so a long merged
+    keyword list becomes several listing queries rather than losing its tail.
+    A listing pass pages through every match with the minimal profile (id,
+    title, last change date); only postings that are new or changed since the
+    last crawl are then requested with their bodies, a batch of ids at a time.
+    None if no listing query could be read.
+    """
     print("\n🔍 [ReliefWeb] Connecting...")
-    keywords = profile.get('search_keywords', ["Evaluation"])
-    # Ensure keywords are strings
-    keywords = [str(k) for k in keywords]
-    query_string = " OR ".join([f'"{k}"' for k in keywords[:3]])
-    appname = "AngeloDiLegge-JobResearch-9k2x5-g1sb1E"
-    url = f"https://api.reliefweb.int/v2/jobs?appname={appname}"
-    cutoff = datetime.now() - timedelta(days=7)
+    keywords = reliefweb_keywords(profile)
+    queries = [" OR ".join([f'"{k}"' for k in keywords[i:i + RELIEFWEB_KEYWORDS_PER_QUERY]])
+               for i in range(0, len(keywords), RELIEFWEB_KEYWORDS_PER_QUERY)]
+    since = (datetime.now(timezone.utc) - timedelta(days=RELIEFWEB_WINDOW_DAYS)).strftime("%Y-%m-%dT%H:%M:%S+00:00")
     try:
-        payload = {
-            "limit": 50, 
-            "preset": "latest", 
-            "query": { "value": query_string }, 
-            "fields": { "include": ["title", "body", "source", "url", "date"] }
-        }
-        response = requests.post(url, json=payload)
-        if response.status_code != 200: 
-            print(f"ReliefWeb Error: {response.status_code}")
-            return []
+        listings = _map_in_scope(lambda query_string: _reliefweb_listing(query_string, since), queries)
+        if all(listed is None for listed in listings):
+            return None
+        entries = [entry for listed in listings if listed for entry in listed]
+        
+        known = _known_postings("ReliefWeb")
         jobs = []
-        for j in response.json().get('data', []):
-            date = datetime.fromisoformat(j['fields']['date']['created']).replace(tzinfo=None)
-            if date > cutoff:
-                soup = BeautifulSoup(j['fields']['body'], "html.parser")
-                jobs.append({
-                    "title": j['fields']['title'], 
-                    "org": j['fields']['source'][0]['name'], 
-                    "clean_body": soup.get_text(separator="\n"), 
-                    "url": j['fields']['url'], 
-                    "source": "ReliefWeb"
-                })
-        print(f"   ✅ Found {len(jobs)} jobs.")
+        wanted = {}
+        seen = set()
+        for j in entries:
+            external_id = str(j['id'])
+            if external_id in seen:
+                continue  # Matched by two keyword queries, or shifted onto the next page mid-crawl
+            seen.add(external_id)
+            content_hash = _content_hash(j['fields'].get('title', ''), j['fields'].get('date', {}).get('changed', ''))
+            if known.get(external_id) == content_hash:
+                jobs.append(_unchanged("ReliefWeb", external_id, content_hash))
+            else:
+                wanted[external_id] = content_hash
+        
+        ids = [int(i) for i in wanted]
+        batches = [ids[i:i + RELIEFWEB_DETAIL_BATCH] for i in range(0, len(ids), RELIEFWEB_DETAIL_BATCH)]
+        details = {}
+        for page in _map_in_scope(lambda batch: _reliefweb_query({
+            "filter": {"field": "id", "value": batch},
+            "fields": {"include": ["title", "body", "source.name", "url"]},
+            "limit": len(batch)
+        }), batches):
+            details.update({str(j['id']): j['fields'] for j in page.get('data', [])})
+        
+        for external_id, content_hash in wanted.items():
+            fields = details.get(external_id)
+            if not fields:
+                continue
+            jobs.append({
+                "title": fields['title'], 
+                "org": fields['source'][0]['name'], 
+                "clean_body": normalize.normalize_body(fields.get('body', '')), 
+                "url": fields['url'], 
+                "source": "ReliefWeb",
+                "external_id": external_id,
+                "content_hash": content_hash,
+                "changed": True
+            })
+        print(f"   ✅ Found {len(jobs)} jobs ({len(entries)} listed, {len(details)} bodies downloaded).")
         return jobs
     except Exception as e:
         print(f"ReliefWeb Exception: {e}")
-        return []
+        return None
+
+def _smartrecruiters_detail(org, posting):
+    """Normalized body of a SmartRecruiters posting, from the detail cache while its releasedDate is unchanged.
+
+    None if the detail request fails.
+    """
+    body = cache.get_detail("SmartRecruiters", posting['id'], posting['releasedDate'])
+    if body is not None:
+        return body
+    try:
+        response = http_client.get(f"https://api.smartrecruiters.com/v1/companies/{org}/postings/{posting['id']}")
+        if response.status_code != 200:
+            return None
+        detail = response.json()
+    except Exception as e:
+        print(f"SmartRecruiters detail {org}/{posting['id']} failed: {e}")
+        return None
+    full_text = posting['name'] + "\n"
+    if 'jobAd' in detail:
+        for key in detail['jobAd']['sections']: 
+            full_text += detail['jobAd']['sections'][key].get('text', '') + "\n"
+    body = normalize.normalize_body(full_text)
+    cache.put_detail("SmartRecruiters", posting['id'], posting['releasedDate'], body)
+    return body
 
-def fetch_smartrecruiters(profile):
-    targets = ["OECD", "CERN", "TheGlobalFund", "Euroclear", "ReliefInternational", "InternationalSOS", "JobsForHumanity", "OxfamAmerica2", "PlanInternational", "Dalberg"]
+def fetch_smartrecruiters(profile, targets=None):
+    """Recent postings of the SmartRecruiters orgs whose titles share a term with the profile.
+
+    Listing pages are fetched concurrently after the first one reports the
+    total. A posting is identified by its id and releasedDate: unchanged ones
+    come back as placeholders, and changed ones reuse a cached detail body
+    when there is one, so detail requests are only made for new releases.
+    """
+    if targets is None:
+        targets = sources.targets("SmartRecruiters")
     print(f"\n🔍 [SmartRecruiters] Scanning {len(targets)} Orgs...")
-    all_jobs = []
     cutoff = datetime.now() - timedelta(days=30)
-    for org in targets:
+    known = _known_postings("SmartRecruiters")
+    # Each match costs a detail request, so only titles sharing a term with the profile qualify
+    terms = relevance.title_terms(profile)
+
+    def listing_page(org, offset):
+        url = f"https://api.smartrecruiters.com/v1/companies/{org}/postings?limit={SMARTRECRUITERS_PAGE_SIZE}&offset={offset}"
+        response = http_client.get(url, conditional=True)
+        if response.status_code != 200:
+            raise ValueError(f"listing returned {response.status_code}")
+        return response.json()
+
+    def fetch_org(org):
+        jobs = []
         try:
-            response = requests.get(f"https://api.smartrecruiters.com/v1/companies/{org}/postings")
-            if response.status_code != 200: continue
-            for j in response.json().get('content', []):
+            first = listing_page(org, 0)
+            entries = first.get('content', [])
+            total = min(first.get('totalFound', len(entries)), SMARTRECRUITERS_PAGE_SIZE * SMARTRECRUITERS_MAX_PAGES)
+            offsets = range(SMARTRECRUITERS_PAGE_SIZE, total, SMARTRECRUITERS_PAGE_SIZE)
+            for page in _map_in_scope(lambda offset: listing_page(org, offset), offsets):
+                entries.extend(page.get('content', []))
+            
+            wanted = []
+            seen = set()
+            for j in entries:
                 date_str = j.get('releasedDate')
-                if date_str and datetime.fromisoformat(date_str[:19]) > cutoff:
-                    if any(k in j['name'] for k in ['Policy', 'Evaluat', 'Regul', 'Analyst', 'Data', 'Program']):
-                        detail = requests.get(f"https://api.smartrecruiters.com/v1/companies/{org}/postings/{j['id']}").json()
-                        full_text = j['name'] + "\n"
-                        if 'jobAd' in detail:
-                            for key in detail['jobAd']['sections']: 
-                                full_text += detail['jobAd']['sections'][key].get('text', '') + "\n"
-                        all_jobs.append({
-                            "title": j['name'], 
-                            "org": org, 
-                            "clean_body": full_text, 
-                            "url": f"https://jobs.smartrecruiters.com/{org}/{j['id']}", 
-                            "source": "SmartRecruiters"
-                        })
-                        time.sleep(0.1)
-        except: continue
+                if not date_str or j['id'] in seen or datetime.fromisoformat(date_str[:19]) <= cutoff:
+                    continue
+                seen.add(j['id'])
+                if relevance.title_matches(j['name'], terms):
+                    external_id = str(j['id'])
+                    content_hash = _content_hash(j['name'], date_str)
+                    if known.get(external_id) == content_hash:
+                        jobs.append(_unchanged("SmartRecruiters", external_id, content_hash))
+                    else:
+                        wanted.append((j, content_hash))
+            
+            # Detail calls run concurrently; http_client keeps them under the per-host limit
+            bodies = _map_in_scope(lambda j: _smartrecruiters_detail(org, j), [j for j, _ in wanted])
+            for (j, content_hash), body in zip(wanted, bodies):
+                if body is None:
+                    continue
+                jobs.append({
+                    "title": j['name'], 
+                    "org": org, 
+                    "clean_body": body, 
+                    "url": f"https://jobs.smartrecruiters.com/{org}/{j['id']}", 
+                    "source": "SmartRecruiters",
+                    "external_id": str(j['id']),
+                    "content_hash": content_hash,
+                    "changed": True
+                })
+        except Exception as e:
+            print(f"SmartRecruiters {org} failed: {e}")
+            return None
+        return jobs
+
+    all_jobs = _fetch_orgs(fetch_org, targets, "SmartRecruiters", sources.query_keys("SmartRecruiters", profile))
     print(f"   ✅ Found {len(all_jobs)} jobs.")
     return all_jobs
 
-def fetch_greenhouse(profile):
-    targets = ["worldresourcesinstitute", "path", "dataorg", "interamerican", "educate", "onecampaign"]
+def fetch_greenhouse(profile, targets=None):
+    if targets is None:
+        targets = sources.targets("Greenhouse")
     print(f"\n🔍 [Greenhouse] Scanning {len(targets)} Orgs...")
-    all_jobs = []
-    for org in targets:
+    known = _known_postings("Greenhouse")
+
+    def fetch_org(org):
+        jobs = []
         try:
-            response = requests.get(f"https://boards-api.greenhouse.io/v1/boards/{org}/jobs?content=true")
-            if response.status_code != 200: continue
-            for j in response.json().get('jobs', []):
-                if any(k in j['title'] for k in ["Director", "Senior", "Head", "Evaluation", "Policy", "Regulatory"]):
-                    soup = BeautifulSoup(j['content'], "html.parser")
-                    all_jobs.append({
-                        "title": j['title'], 
-                        "org": org.title(), 
-                        "clean_body": soup.get_text(separator="\n"), 
-                        "url": j['absolute_url'], 
-                        "source": "Greenhouse"
-                    })
-            time.sleep(0.1)
-        except: continue
+            # Boards with full content run to megabytes; parse them a posting at a time
+            response = http_client.get(f"https://boards-api.greenhouse.io/v1/boards/{org}/jobs?content=true",
+                                       conditional=True, stream=True)
+            if response.status_code != 200:
+                response.close()
+                return None
+            for j in http_client.iter_json(response, key="jobs"):
+                external_id = str(j['id'])
+                content_hash = _content_hash(j['title'], j['content'])
+                if known.get(external_id) == content_hash:
+                    jobs.append(_unchanged("Greenhouse", external_id, content_hash))
+                    continue
+                jobs.append({
+                    "title": j['title'], 
+                    "org": org.title(), 
+                    "clean_body": normalize.normalize_body(j['content']), 
+                    "url": j['absolute_url'], 
+                    "source": "Greenhouse",
+                    "external_id": external_id,
+                    "content_hash": content_hash,
+                    "changed": True
+                })
+        except: return None
+        return jobs
+
+    all_jobs = _fetch_orgs(fetch_org, targets, "Greenhouse")
     print(f"   ✅ Found {len(all_jobs)} jobs.")
     return all_jobs
 
-def fetch_lever(profile):
-    targets = ["climatepolicyinitiative", "vitalstrategies", "dimagi", "givedirectly", "openai", "anthropic"]
+def fetch_lever(profile, targets=None):
+    if targets is None:
+        targets = sources.targets("Lever")
     print(f"\n🔍 [Lever] Scanning {len(targets)} Orgs...")
-    all_jobs = []
-    for org in targets:
+    known = _known_postings("Lever")
+
+    def fetch_org(org):
+        jobs = []
         try:
-            response = requests.get(f"https://api.lever.co/v0/postings/{org}")
-            if response.status_code != 200: continue
-            for j in response.json():
-                if any(k in j['text'] for k in ["Director", "Senior", "Head", "Evaluation", "Policy"]):
-                    all_jobs.append({
-                        "title": j['text'], 
-                        "org": org.title(), 
-                        "clean_body": j.get('descriptionPlain', j['text']), 
-                        "url": j['hostedUrl'], 
-                        "source": "Lever"
-                    })
-            time.sleep(0.1)
-        except: continue
+            response = http_client.get(f"https://api.lever.co/v0/postings/{org}", conditional=True, stream=True)
+            if response.status_code != 200:
+                response.close()
+                return None
+            for j in http_client.iter_json(response):
+                external_id = str(j['id'])
+                content_hash = _content_hash(j['text'], j.get('descriptionPlain', ''))
+                if known.get(external_id) == content_hash:
+                    jobs.append(_unchanged("Lever", external_id, content_hash))
+                    continue
+                jobs.append({
+                    "title": j['text'], 
+                    "org": org.title(), 
+                    "clean_body": normalize.normalize_body(j.get('descriptionPlain', j['text'])), 
+                    "url": j['hostedUrl'], 
+                    "source": "Lever",
+                    "external_id": external_id,
+                    "content_hash": content_hash,
+                    "changed": True
+                })
+        except: return None
+        return jobs
+
+    all_jobs = _fetch_orgs(fetch_org, targets, "Lever")
     print(f"   ✅ Found {len(all_jobs)} jobs.")
     return all_jobs
 
 def fetch_remoteok(profile):
     print("\n🔍 [Remote OK] Connecting...")
     try:
-        response = requests.get("https://remoteok.com/api", headers={'User-Agent': 'Mozilla/5.0'})
-        if response.status_code != 200: return []
+        # Not conditional: the read stops at the cap, so the body is never complete enough to cache
+        response = http_client.get("https://remoteok.com/api", stream=True, headers={'User-Agent': 'Mozilla/5.0'})
+        if response.status_code != 200:
+            response.close()
+            return None
+        known = _known_postings("Remote OK")
+        # The feed is capped at 10 postings, so spend the cap on titles sharing a term with the profile;
+        # it is parsed as it downloads and the connection dropped once the cap is reached
+        terms = relevance.title_terms(profile)
         jobs = []
-        for j in response.json()[1:]:
-            if any(k in j.get('position', '').lower() for k in ["data", "policy", "manager"]):
-                jobs.append({
-                    "title": j['position'], 
-                    "org": j.get('company', 'Unknown'), 
-                    "clean_body": j.get('description', ''), 
-                    "url": j.get('url', ''), 
-                    "source": "Remote OK"
-                })
+        items = http_client.iter_json(response)
+        next(items, None)  # Legal notice
+        for j in items:
+            if relevance.title_matches(j.get('position', ''), terms):
+                external_id = str(j.get('id', j.get('url', '')))
+                content_hash = _content_hash(j['position'], j.get('description', ''))
+                if known.get(external_id) == content_hash:
+                    jobs.append(_unchanged("Remote OK", external_id, content_hash))
+                else:
+                    jobs.append({
+                        "title": j['position'], 
+                        "org": j.get('company', 'Unknown'), 
+                        "clean_body": normalize.normalize_body(j.get('description', '')), 
+                        "url": j.get('url', ''), 
+                        "source": "Remote OK",
+                        "external_id": external_id,
+                        "content_hash": content_hash,
+                        "changed": True
+                    })
                 if len(jobs) >= 10: break
+        items.close()
         print(f"   ✅ Found {len(jobs)} jobs.")
         return jobs
-    except: return []
+    except: return None
 
-def fetch_all_jobs(profile, status_callback=None):
-    all_jobs = []
-    
-    sources = [
-        ("ReliefWeb", fetch_reliefweb),
-        ("SmartRecruiters", fetch_smartrecruiters),
-        ("Greenhouse", fetch_greenhouse),
-        ("Lever", fetch_lever),
-        ("Remote OK", fetch_remoteok)
-    ]
+# --- Source registry ---
+# Fetchers are looked up when called, so a patched fetcher is the one that runs. ReliefWeb queries the
+# profile's keywords and SmartRecruiters and Remote OK filter titles by its terms, so their postings depend on
+# the profile and their crawls record the keys they covered
+sources.register("ReliefWeb", lambda profile, targets: fetch_reliefweb(profile), keys=reliefweb_keywords)
+sources.register("SmartRecruiters", lambda profile, targets: fetch_smartrecruiters(profile, targets), SMARTRECRUITERS_ORGS,
+                 keys=relevance.title_terms)
+sources.register("Greenhouse", lambda profile, targets: fetch_greenhouse(profile, targets), GREENHOUSE_ORGS)
+sources.register("Lever", lambda profile, targets: fetch_lever(profile, targets), LEVER_ORGS)
+sources.register("Remote OK", lambda profile, targets: fetch_remoteok(profile), keys=relevance.title_terms)
+
+def fetch_all_jobs(profile, status_callback=None, deadline=FETCH_DEADLINE, incremental=False, scheduled=False,
+                   new_keys_only=False):
+    """Runs every registered source concurrently and returns the combined jobs.
+
+    status_callback is only ever called from the calling thread, so it is safe to
+    pass Streamlit elements such as st.status. Sources still running when the
+    deadline expires are reported and skipped. Every crawled posting is recorded
+    in the postings table; with incremental=True only postings that are new or
+    changed since the last crawl are returned. With scheduled=True only the
+    sources and org boards due by their crawl schedule, or not yet crawled for
+    the profile's keywords, are fetched; with new_keys_only=True only the latter.
+    """
+    plan = sources.plan(scheduled, profile=profile, new_keys_only=new_keys_only)
+    if scheduled or new_keys_only:
+        waiting = [name for name in sources.names() if name not in dict(plan)]
+        if waiting and status_callback:
+            status_callback(f"⏭️ Not due yet: {', '.join(waiting)}")
+    if not plan:
+        return []
     
-    for name, fetcher in sources:
-        if status_callback:
-            status_callback(f"Searching {name}...")
-        
-        jobs = fetcher(profile)
-        count = len(jobs)
-        all_jobs.extend(jobs)
-        
+    def run_source(name, targets):
+        """(jobs, crawls to record if the jobs are accepted before the deadline)."""
+        _crawls.pending = crawls = []
+        try:
+            with instrument.scope(name) as state:
+                jobs = sources.fetcher(name)(profile, targets)
+                if jobs is None:
+                    # The feed couldn't be read: it stays due rather than counting as a crawl with no changes
+                    state["error"] = "fetch failed"
+                    return [], crawls
+                state["postings"] = len(jobs)
+            if targets is None:
+                crawls.append((name, sources.FEED, jobs, sources.query_keys(name, profile)))
+            return jobs, crawls
+        finally:
+            _crawls.pending = None
+
+    instrument.start_run()
+    results = {}
+    pool = ThreadPoolExecutor(max_workers=max(1, len(plan)))
+    futures = {}
+    for name, targets in plan:
         if status_callback:
-            status_callback(f"✅ Found {count} jobs from {name}")
+            status_callback(f"Searching {name}..." if targets is None else f"Searching {name} ({len(targets)} orgs)...")
+        futures[pool.submit(run_source, name, targets)] = name
+    
+    try:
+        for future in as_completed(futures, timeout=deadline):
+            name = futures[future]
+            try:
+                jobs, crawls = future.result()
+            except Exception as e:
+                print(f"{name} Exception: {e}")
+                jobs, crawls = [], []
+            results[name] = jobs
+            for source, org, crawled, keys in crawls:
+                sources.record_crawl(source, org, crawled, keys=keys)
             
-    return all_jobs
+            if status_callback:
+                fresh = sum(1 for j in jobs if j.get('changed', True))
+                status_callback(f"✅ Found {len(jobs)} jobs from {name} ({fresh} new or changed)")
+    except FuturesTimeout:
+        for name in futures.values():
+            if name not in results and status_callback:
+                status_callback(f"⏱️ {name} timed out after {deadline}s, skipping")
+    finally:
+        # Don't block on stragglers past the deadline
+        pool.shutdown(wait=False, cancel_futures=True)
+    
+    # Per-source timings, slowest first, so a slow scan points at its cause
+    for line in instrument.summary_lines(instrument.end_run()):
+        (status_callback or print)(f"📊 {line}")
+    
+    all_jobs = []
+    for name, _ in plan:
+        all_jobs.extend(results.get(name, []))
+    return _sync_posting_store(all_jobs, incremental)
 
-def match_job_to_cv(job_text, candidate_profile):
-    prompt = f"""
+def _sync_posting_store(jobs, incremental):
+    """Records a crawl in the posting store, links duplicates and resolves unchanged placeholders.
+
+    New or changed postings that duplicate another posting (the same vacancy
+    from another source or URL) are stored, linked to the canonical posting and
+    left out of the result and the vector index. In incremental mode only new
+    or changed postings are returned; otherwise unchanged ones are filled in
+    from their stored copy.
+    """
+    for job in jobs:
+        if job.get('changed', True):
+            dedup.fingerprint(job)
+    try:
+        database.upsert_postings_many(jobs)
+    except Exception as e:
+        print(f"Posting store update failed: {e}")
+        return [j for j in jobs if j.get('changed', True)]
+    
+    try:
+        duplicates = _link_duplicates(jobs)
+    except Exception as e:
+        print(f"Dedup failed: {e}")
+        duplicates = set()
+    fresh = [j for j in jobs if j.get('changed', True) and j.get('posting_id') not in duplicates]
+    
+    try:
+        vector_index.add_postings(fresh)
+    except Exception as e:
+        print(f"Vector index update failed: {e}")
+    
+    if incremental:
+        return fresh
+    
+    stored = {p['id']: p for p in database.get_postings([j['posting_id'] for j in jobs if not j.get('changed', True)])}
+    resolved = []
+    for job in jobs:
+        if job.get('changed', True):
+            if job.get('posting_id') not in duplicates:
+                resolved.append(job)
+        elif job.get('posting_id') in stored and not stored[job['posting_id']]['canonical_id']:
+            p = stored[job['posting_id']]
+            resolved.append({
+                "title": p['title'],
+                "org": p['org'],
+                "clean_body": p['clean_body'],
+                "url": p['url'],
+                "source": p['source'],
+                "external_id": p['external_id'],
+                "content_hash": p['content_hash'],
+                "posting_id": p['id'],
+                "changed": False
+            })
+    return resolved
+
+def _link_duplicates(jobs):
+    """Runs dedup over the crawl's new and changed postings against the recently seen store.
+
+    Returns the posting ids of the ones linked as duplicates.
+    """
+    changed = [j for j in jobs if j.get('changed', True) and j.get('posting_id')]
+    if not changed:
+        return set()
+    start = time.time()
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=POSTING_MAX_AGE_DAYS)).strftime("%Y-%m-%d %H:%M:%S")
+    batch_ids = {j['posting_id'] for j in changed}
+    known = [row for row in database.get_posting_fingerprints(cutoff) if row['id'] not in batch_ids]
+    
+    # Postings stored before dedup existed are fingerprinted once
+    missing = [dedup.fingerprint(row) for row in known if row['dedup_key'] is None]
+    if missing:
+        database.update_fingerprints_many(missing)
+    
+    links = dedup.find_duplicates(changed, known)
+    if links:
+        database.link_postings_many(links)
+    for job in changed:
+        if links.get(job['posting_id']):
+            job['canonical_id'] = links[job['posting_id']]
+    duplicates = {pid for pid in batch_ids if links.get(pid)}
+    print(f"🔗 Dedup: {len(duplicates)} of {len(changed)} new or changed postings are duplicates "
+          f"({len(known)} stored compared, {time.time() - start:.2f}s)")
+    return duplicates
+
+def store_is_fresh(max_age_hours=CRAWL_MAX_AGE_HOURS):
+    """True if the posting store was crawled within max_age_hours, so a search can skip the live crawl."""
+    try:
+        last = database.get_last_crawl_time()
+    except Exception:
+        return False
+    if not last:
+        return False
+    last_seen = datetime.strptime(last, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
+    return datetime.now(timezone.utc) - last_seen < timedelta(hours=max_age_hours)
+
+def find_matching_postings(profile, top_k=relevance.TOP_K, allowed_ids=None, max_age_days=POSTING_MAX_AGE_DAYS):
+    """Top-K stored postings for a profile from the vector index, without crawling.
+
+    Postings not seen by a crawl within max_age_days are treated as closed;
+    duplicates of another posting and index rows whose content no longer
+    matches the store are skipped.
+    """
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=max_age_days)).strftime("%Y-%m-%d %H:%M:%S")
+    if vector_index.size() == 0:
+        # Index missing (first run or deleted): rebuild it from the store
+        vector_index.rebuild(database.get_postings_seen_since(cutoff))
+    
+    # Over-fetch so postings dropped as stale or closed don't shrink the shortlist
+    candidates = vector_index.query(profile, top_k * 3, allowed_ids=allowed_ids)
+    stored = {p['id']: p for p in database.get_postings([pid for pid, _, _ in candidates])}
+    jobs = []
+    for posting_id, hash_key, score in candidates:
+        p = stored.get(posting_id)
+        if not p or p['last_seen'] < cutoff or p['canonical_id'] or vector_index.hash_key(p['content_hash']) != hash_key:
+            continue
+        jobs.append({
+            "title": p['title'],
+            "org": p['org'],
+            "clean_body": p['clean_body'],
+            "url": p['url'],
+            "source": p['source'],
+            "external_id": p['external_id'],
+            "content_hash": p['content_hash'],
+            "posting_id": p['id'],
+            "relevance": round(score, 4)
+        })
+        if len(jobs) >= top_k:
+            break
+    return jobs
+
+def digest_postings(jobs):
+    """jobs plus the stored postings still waiting for a daily digest.
+
+    Postings found by on-demand searches, or by crawls whose digest failed, are
+    picked up this way, so a scheduled crawl that skips their board doesn't lose them.
+    """
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=POSTING_MAX_AGE_DAYS)).strftime("%Y-%m-%d %H:%M:%S")
+    try:
+        pending = database.get_digest_postings(cutoff)
+    except Exception as e:
+        print(f"Reading pending postings failed: {e}")
+        return jobs
+    seen = {j['posting_id'] for j in jobs if j.get('posting_id')}
+    return jobs + [p for p in pending if p['id'] not in seen]
+
+MATCH_MODEL = "gpt-4o-mini"
+MATCH_PROMPT = """
     Act as a Forensic Career Analyst. Compare this Candidate vs this Job.
-    CANDIDATE PROFILE: {json.dumps(candidate_profile)}
-    JOB DESCRIPTION: {job_text[:6000]}
+    CANDIDATE PROFILE: {profile}
+    JOB DESCRIPTION (key sections): {job_text}
     INSTRUCTIONS:
     1. Analyze Requirements (Hard Skills, Languages, Sector).
     2. Cross-reference with Candidate.
@@ -257,21 +807,297 @@ def match_job_to_cv(job_text, candidate_profile):
         "gaps": ["Gap 1 (Critical)", "Gap 2", "Gap 3"]
     }}
     """
+# Any edit to the template or the job excerpt budget changes the version and so invalidates cached matches
+MATCH_PROMPT_VERSION = hashlib.sha256((MATCH_PROMPT + str(prompt.JOB_TOKEN_BUDGET)).encode("utf-8")).hexdigest()[:12]
+
+_match_cache_purged = False
+
+def build_match_prompt(job_text, candidate_profile, profile_text=None):
+    """The match prompt for a job and its input token count.
+
+    profile_text is the profile already compacted by prompt.compact_profile,
+    so callers scoring many jobs compact it once.
+    """
+    if profile_text is None:
+        profile_text = prompt.compact_profile(candidate_profile)
+    excerpt = prompt.job_excerpt(job_text[:normalize.BODY_MAX_CHARS])
+    text = MATCH_PROMPT.format(profile=profile_text, job_text=excerpt)
+    return text, prompt.count_tokens(text)
+
+def _request_match(job_text, candidate_profile, profile_text=None, max_retries=llm.LLM_MAX_RETRIES):
+    """Sends one match prompt to OpenAI and returns the parsed analysis. Raises on failure."""
+    text, n_tokens = build_match_prompt(job_text, candidate_profile, profile_text)
+    return llm.chat_json(MATCH_MODEL, text, kind="match", local_tokens=n_tokens, max_retries=max_retries)
+
+BATCH_PROMPT = """
+    Act as a Forensic Career Analyst. Quickly screen these Jobs for this Candidate.
+    CANDIDATE PROFILE: {profile}
+    JOBS: {jobs}
+    Scoring: 100 (Perfect), 85-95 (Strong Skill/Wrong Sector), 60-80 (Good Skill/Missing Context), <50 (Irrelevant).
+    OUTPUT JSON ONLY, one entry per job id:
+    {{
+        "scores": [{{"id": "<job id>", "score": <int>}}]
+    }}
+    """
+
+def _request_batch(jobs, profile_text, max_retries=llm.LLM_MAX_RETRIES):
+    """Sends one screening prompt for several jobs. Returns {index in jobs: score} for the well-formed entries. Raises on failure."""
+    items = [{"id": str(i), "title": job.get('title', ''), "org": job.get('org', ''),
+              "text": prompt.job_excerpt(job['clean_body'][:normalize.BODY_MAX_CHARS], BATCH_JOB_TOKENS)}
+             for i, job in enumerate(jobs)]
+    text = BATCH_PROMPT.format(profile=profile_text, jobs=json.dumps(items, separators=(",", ":"), ensure_ascii=False))
+    data = llm.chat_json(MATCH_MODEL, text, kind="screen", local_tokens=prompt.count_tokens(text), max_retries=max_retries)
+    return parse_batch_scores(data, len(jobs))
+
+def parse_batch_scores(data, n_jobs):
+    """{index: score} from a parsed batch response. Entries with unknown ids or non-numeric scores are skipped."""
+    entries = data.get("scores") if isinstance(data, dict) else data
+    if not isinstance(entries, list):
+        raise ValueError("Batch response has no scores list")
+    scores = {}
+    for entry in entries:
+        try:
+            index = int(entry["id"])
+            score = int(entry["score"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        if 0 <= index < n_jobs:
+            scores[index] = max(0, min(100, score))
+    return scores
+
+def _match_cache_key(job_text, candidate_profile):
+    global _match_cache_purged
+    if not _match_cache_purged:
+        # First lookup in this process: drop entries from older prompt versions
+        _match_cache_purged = True
+        try:
+            cache.purge_matches(MATCH_PROMPT_VERSION, MATCH_MODEL)
+        except Exception as e:
+            print(f"Match cache purge failed: {e}")
+    return cache.match_key(job_text, candidate_profile, MATCH_PROMPT_VERSION, MATCH_MODEL)
+
+def _store_match(key, analysis):
+    cache.put_match(key, MATCH_PROMPT_VERSION, MATCH_MODEL, analysis)
+
+def profile_version(candidate_profile):
+    """Short fingerprint of a profile plus the match prompt and model, stored with each match."""
+    material = json.dumps(candidate_profile, sort_keys=True) + MATCH_PROMPT_VERSION + MATCH_MODEL
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()[:12]
+
+def match_record(user_id, job, analysis, version):
+    """The row database.record_matches_many stores for a scored stored posting, or None if it isn't worth keeping.
+
+    Jobs scoring 0 (including failed calls) are not kept; the match cache makes rescoring them free.
+    """
+    if not job.get('posting_id') or analysis.get('score', 0) <= 0:
+        return None
+    return {
+        "user_id": user_id,
+        "posting_id": job['posting_id'],
+        "score": analysis.get('score', 0),
+        "summary": analysis.get('job_summary', 'N/A'),
+        "strengths": analysis.get('strengths', []),
+        "gaps": analysis.get('gaps', []),
+        "profile_version": version
+    }
+
+def match_job_to_cv(job_text, candidate_profile):
+    key = _match_cache_key(job_text, candidate_profile)
+    cached = cache.get_match(key)
+    if cached is not None:
+        return cached
     try:
-        api_key = get_openai_key()
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY not found in secrets or environment")
-        client = openai.OpenAI(api_key=api_key)
-        response = client.chat.completions.create(
-            model="gpt-4o-mini", 
-            messages=[{"role": "user", "content": prompt}], 
-            response_format={"type": "json_object"}
-        )
-        return json.loads(response.choices[0].message.content)
+        analysis = _request_match(job_text, candidate_profile)
+        _store_match(key, analysis)
+        return analysis
     except Exception as e:
         print(f"Error matching job: {e}")
         return {"score": 0, "job_summary": "Error", "strengths": [], "gaps": []}
 
+class _AdaptiveLimiter:
+    """In-flight limit for OpenAI calls that halves on a 429 and grows back by one
+    after a full window of successes (AIMD)."""
+
+    def __init__(self, max_in_flight):
+        self.max_in_flight = max_in_flight
+        self.limit = max_in_flight
+        self.in_flight = 0
+        self.successes = 0
+        self.resume_at = 0.0
+        self.cond = threading.Condition()
+
+    def __enter__(self):
+        with self.cond:
+            while self.in_flight >= self.limit:
+                self.cond.wait()
+            self.in_flight += 1
+            pause = self.resume_at - time.monotonic()
+        if pause > 0:
+            time.sleep(pause)
+        return self
+
+    def __exit__(self, *exc):
+        with self.cond:
+            self.in_flight -= 1
+            self.cond.notify_all()
+
+    def success(self):
+        with self.cond:
+            self.successes += 1
+            if self.successes >= self.limit and self.limit < self.max_in_flight:
+                self.limit += 1
+                self.successes = 0
+                self.cond.notify_all()
+
+    def throttled(self, retry_after):
+        with self.cond:
+            self.limit = max(1, self.limit // 2)
+            self.successes = 0
+            self.resume_at = max(self.resume_at, time.monotonic() + retry_after)
+
+def _retry_after(error, attempt):
+    """Seconds to wait after a 429: the server's Retry-After if given, else jittered exponential backoff."""
+    response = getattr(error, 'response', None)
+    if response is not None:
+        try:
+            return float(response.headers.get('retry-after'))
+        except (TypeError, ValueError):
+            pass
+    return min(SCORING_MAX_BACKOFF, 0.5 * 2 ** attempt) * random.uniform(0.5, 1.5)
+
+def _limited(limiter, max_retries, request, *args):
+    """Runs request under the limiter, backing off on rate limits. Raises on other errors or when retries run out.
+
+    request is called with max_retries=0 so the OpenAI client hands rate limits
+    straight to the limiter; connection errors and 5xx are retried here instead,
+    as often as the client would have (llm.LLM_MAX_RETRIES).
+    """
+    failures = 0
+    for attempt in range(max_retries + 1):
+        with limiter:
+            try:
+                result = request(*args, max_retries=0)
+            except openai.RateLimitError as e:
+                limiter.throttled(_retry_after(e, attempt))
+                continue
+            except (openai.APIConnectionError, openai.InternalServerError):
+                failures += 1
+                if failures > llm.LLM_MAX_RETRIES:
+                    raise
+                time.sleep(min(SCORING_MAX_BACKOFF, 0.5 * 2 ** failures) * random.uniform(0.5, 1.5))
+                continue
+        limiter.success()
+        return result
+    raise RuntimeError(f"Still rate limited after {max_retries} retries")
+
+def _screen_batch(jobs, profile_text, limiter, max_retries):
+    """Quick scores {index in jobs: score} from batch prompts.
+
+    Jobs missing from a partial response are sent again as a smaller batch; a
+    batch whose response is unusable is split in half, down to single jobs.
+    Jobs that can't be screened are left out, so they get the full analysis.
+    """
+    try:
+        scores = _limited(limiter, max_retries, _request_batch, jobs, profile_text)
+    except Exception as e:
+        print(f"Batch scoring of {len(jobs)} jobs failed: {e}")
+        scores = {}
+    missing = [i for i in range(len(jobs)) if i not in scores]
+    if not missing or len(jobs) == 1:
+        return scores
+    if len(missing) == len(jobs):
+        parts = [missing[:len(missing) // 2], missing[len(missing) // 2:]]
+    else:
+        parts = [missing]
+    for part in parts:
+        for i, score in _screen_batch([jobs[i] for i in part], profile_text, limiter, max_retries).items():
+            scores[part[i]] = score
+    return scores
+
+def _screened_analysis(score):
+    return {"score": score, "job_summary": "Quick screen only (below the full-analysis threshold)",
+            "strengths": [], "gaps": []}
+
+def score_jobs(jobs, candidate_profile, max_in_flight=None, max_retries=5, batch=None):
+    """Scores jobs concurrently and yields (job, analysis) pairs in completion order.
+
+    At most max_in_flight OpenAI calls run at once; the limit backs off on rate
+    limits and recovers as calls succeed. Cached matches are returned without an
+    API call. Jobs that still fail get the same error analysis match_job_to_cv
+    returns. With batch (default BATCH_SCORING), jobs are screened in batches first.
+    """
+    tasks = [(job, candidate_profile) for job in jobs]
+    for (job, _), analysis in score_many(tasks, max_in_flight, max_retries, batch):
+        yield job, analysis
+
+def score_many(tasks, max_in_flight=None, max_retries=5, batch=None, batch_size=None, threshold=None):
+    """Like score_jobs for (job, candidate_profile) pairs that may mix profiles.
+
+    All tasks share one worker pool and one adaptive in-flight limit, so scoring
+    for many users at once still respects the API rate limit. Yields
+    ((job, candidate_profile), analysis) in completion order.
+
+    In batch mode, uncached jobs are first scored batch_size at a time per
+    profile with the short screening prompt. Only jobs scoring at least
+    threshold (or that couldn't be screened) get the full analysis; the rest
+    are yielded with their screening score and no strengths or gaps.
+    """
+    max_in_flight = max_in_flight or MAX_SCORING_IN_FLIGHT
+    batch = BATCH_SCORING if batch is None else batch
+    batch_size = batch_size or BATCH_SIZE
+    threshold = BATCH_THRESHOLD if threshold is None else threshold
+    limiter = _AdaptiveLimiter(max_in_flight)
+    # Each distinct profile is compacted once, not once per job
+    profile_texts = {id(profile): prompt.compact_profile(profile) for _, profile in tasks}
+
+    def score(job, candidate_profile, key=None):
+        if key is None:
+            key = _match_cache_key(job['clean_body'], candidate_profile)
+            cached = cache.get_match(key)
+            if cached is not None:
+                return cached
+        try:
+            analysis = _limited(limiter, max_retries, _request_match, job['clean_body'], candidate_profile,
+                                profile_texts[id(candidate_profile)])
+        except Exception as e:
+            print(f"Error matching job: {e}")
+            return {"score": 0, "job_summary": "Error", "strengths": [], "gaps": []}
+        _store_match(key, analysis)
+        return analysis
+
+    if not tasks:
+        return
+    with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+        full = [(task, None) for task in tasks]
+        if batch:
+            full = []
+            uncached = {}
+            for job, profile in tasks:
+                key = _match_cache_key(job['clean_body'], profile)
+                cached = cache.get_match(key)
+                if cached is not None:
+                    yield (job, profile), cached
+                else:
+                    uncached.setdefault(id(profile), []).append(((job, profile), key))
+            screens = {}
+            for group in uncached.values():
+                for start in range(0, len(group), batch_size):
+                    chunk = group[start:start + batch_size]
+                    jobs = [job for (job, _), _ in chunk]
+                    future = pool.submit(_screen_batch, jobs, profile_texts[id(chunk[0][0][1])], limiter, max_retries)
+                    screens[future] = chunk
+            for future in as_completed(screens):
+                scores = future.result()
+                for i, (task, key) in enumerate(screens[future]):
+                    if i in scores and scores[i] < threshold:
+                        yield task, _screened_analysis(scores[i])
+                    else:
+                        full.append((task, key))
+
+        futures = {pool.submit(score, job, profile, key): (job, profile) for (job, profile), key in full}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
 def get_email_credentials():
     """Get email credentials from secrets or environment."""
     try:
@@ -1,5 +1,7 @@
 import os
+import database
 import logic
+import relevance
 from getpass import getpass
 
 def main():
@@ -33,9 +35,9 @@ def main():
     my_profile = {"search_keywords": ["Evaluation", "Policy"]}
     
     if cv_path and os.path.exists(cv_path):
-        cv_text = logic.extract_text_from_pdf(cv_path)
+        cv_text, profile = logic.profile_cv(cv_path)
         if cv_text:
-            my_profile = logic.generate_candidate_profile(cv_text)
+            my_profile = profile
             print("✅ CV Profiled.")
         else:
             print("⚠️ Could not extract text from CV. Using default profile.")
@@ -43,16 +45,15 @@ def main():
         print("⚠️ No CV provided or file not found. Using default profile.")
 
     # Fetch Jobs
-    jobs = logic.fetch_all_jobs(my_profile)
+    database.init_db()
+    jobs = relevance.rank_jobs(logic.fetch_all_jobs(my_profile), my_profile)
     
     # Match and Report
     results = []
     print(f"\n🤖 Analyzing {len(jobs)} jobs...")
-    for job in jobs:
-        print(f"   👉 {job['title'][:40]}...", end="")
-        analysis = logic.match_job_to_cv(job['clean_body'], my_profile)
+    for job, analysis in logic.score_jobs(jobs, my_profile):
         score = analysis.get('score', 0)
-        print(f" Score: {score}")
+        print(f"   👉 {job['title'][:40]}... Score: {score}")
         results.append({
             "Job Title": job['title'], 
             "Organization": job['org'], 
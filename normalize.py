@@ -0,0 +1,100 @@
+import re
+import html
+
+import relevance
+
+# Shared posting-body normalizer used by every fetcher. HTML is stripped in a
+# few linear regex passes over the markup (no tree is built), whitespace is
+# collapsed, boilerplate such as EEO statements and benefits sections is
+# dropped, and the result is cut to the text budget the matching prompt and the
+# index use.
+
+BODY_MAX_CHARS = relevance.JOB_TEXT_CHARS
+MAX_HTML_RATIO = 10  # Markup beyond this many times the text budget is only scanned for skipped blocks
+
+_SKIP_RE = re.compile(r"<(script|style|head|noscript|template)\b.*?</\1\s*>|<!--.*?-->", re.S | re.I)
+# A skipped block or comment that is never closed hides the rest of the document
+_OPEN_SKIP_RE = re.compile(r"<(?:script|style|head|noscript|template)\b|<!--", re.I)
+# Tag attributes may be quoted and contain ">"
+_ATTRS = r"""(?:"[^"]*"|'[^']*'|[^'">])*"""
+_BLOCK_TAG_RE = re.compile(
+    r"</?(?:p|br|div|li|ul|ol|tr|table|section|article|h[1-6]|blockquote|pre|hr|dt|dd)\b" + _ATTRS + ">", re.I)
+_TAG_RE = re.compile(r"</?[a-zA-Z!]" + _ATTRS + ">")
+_PARTIAL_TAG_RE = re.compile(r"</?[a-zA-Z!]" + _ATTRS + r"\Z")
+
+# Paragraphs that are legal boilerplate rather than a description of the job.
+# Lines are only run through the regex when they contain one of the markers.
+BOILERPLATE_MARKERS = ("opportunit", "regard", "accommodation", "verify", "affirmative", "veteran",
+                       "drug", "discriminat", "eeo", "diversity")
+BOILERPLATE_RE = re.compile(
+    r"equal (employment )?opportunit(y|ies)|without regard to|regardless of (race|age|gender|sex)"
+    r"|reasonable accommodation|e-verify|affirmative action|protected veteran|drug[- ]free workplace"
+    r"|we (do not|don't) discriminate|diversity,? equity,? and inclusion is|eeo\b")
+# Headings whose whole section is dropped, up to the next heading
+SKIP_SECTION_RE = re.compile(
+    r"^(our )?(benefits|perks|what we offer|what'?s in it for you|why (join|work)|compensation (and|&) benefits"
+    r"|equal opportunity|eeo statement|diversity (and|&) inclusion)\b", re.IGNORECASE)
+# Headings that end a skipped section (its bullets are short lines too, so not every short line does)
+SECTION_RE = re.compile(
+    r"^(about|responsibilities|requirements|qualifications|key |main |the role|role|the position|position"
+    r"|what you|who you|your |skills|experience|education|how to apply|location|duties|job description"
+    r"|summary|profile|competencies|tasks|mission)", re.IGNORECASE)
+
+def html_to_text(raw, max_chars=None):
+    """Text content of an HTML fragment, with block-level tags turned into line breaks."""
+    if "<" not in raw and "&lt;" in raw:
+        # Some boards (e.g. Greenhouse) send entity-escaped HTML
+        raw = html.unescape(raw)
+    if "<" in raw:
+        # Skipped blocks go before the cut, which could otherwise leave a script half open
+        raw = _SKIP_RE.sub("", raw)
+        unclosed = _OPEN_SKIP_RE.search(raw)
+        if unclosed:
+            raw = raw[:unclosed.start()]
+    if max_chars and len(raw) > max_chars * MAX_HTML_RATIO:
+        raw = raw[:max_chars * MAX_HTML_RATIO]
+        cut = raw.rfind("<")
+        if cut >= 0 and _PARTIAL_TAG_RE.match(raw, cut):
+            raw = raw[:cut]  # The tag the cut went through
+    if "<" in raw:
+        raw = _BLOCK_TAG_RE.sub("\n", raw)
+        raw = _TAG_RE.sub("", raw)
+    if "&" in raw:
+        raw = html.unescape(raw)
+    return raw
+
+def _is_boilerplate(line, markers):
+    lower = line.lower()
+    return any(marker in lower for marker in markers) and BOILERPLATE_RE.search(lower) is not None
+
+def _is_heading(line):
+    return len(line) <= 60 and not line.endswith((".", ",", ";")) and len(line.split()) <= 8
+
+def strip_boilerplate(lines):
+    """Drops EEO-style paragraphs and benefits sections from a list of cleaned lines."""
+    lower_text = "\n".join(lines).lower()
+    markers = [marker for marker in BOILERPLATE_MARKERS if marker in lower_text]
+    kept = []
+    skipping = False
+    for line in lines:
+        if _is_heading(line):
+            title = line.rstrip(":").strip()
+            if SKIP_SECTION_RE.match(title):
+                skipping = True
+                continue
+            if line.endswith(":") or SECTION_RE.match(title):
+                skipping = False
+        if skipping or (markers and _is_boilerplate(line, markers)):
+            continue
+        kept.append(line)
+    return kept
+
+def normalize_body(raw, max_chars=BODY_MAX_CHARS):
+    """Plain, boilerplate-free posting text from an HTML or plain-text body, at most max_chars long."""
+    if not raw:
+        return ""
+    # str.split() collapses every kind of blank (tabs, nbsp) far faster than a regex
+    lines = [" ".join(line.split()) for line in html_to_text(raw, max_chars).split("\n")]
+    lines = strip_boilerplate([line for line in lines if line])
+    body = "\n".join(lines)
+    return body[:max_chars] if max_chars else body
@@ -0,0 +1,109 @@
+import io
+import os
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import pdfplumber
+
+# Streaming CV text extraction. Pages are extracted lazily and extraction stops
+# once the profiling prompt's character budget is filled, so a long publication
+# list costs no more than its first pages. Long documents are extracted a few
+# pages at a time in a process pool, in page order.
+
+CV_TEXT_CHARS = 12000  # Characters of CV text the profiling prompt uses
+PARALLEL_MIN_PAGES = int(os.getenv("JOBHUNTER_PDF_PARALLEL_PAGES", "16"))
+PDF_WORKERS = int(os.getenv("JOBHUNTER_PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+PAGES_PER_TASK = 2
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _get_pool():
+    """The shared extraction pool, started on first use. Spawned, not forked, since the app is multi-threaded."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+def _page_text(page):
+    text = page.extract_text() or ""
+    # Drop the page's parsed layout objects as soon as its text is out
+    page.close()
+    return text
+
+def _extract_pages(pdf_bytes, start, stop):
+    """Runs in a pool worker: text of pages [start, stop)."""
+    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+        return [_page_text(pdf.pages[i]) for i in range(start, min(stop, len(pdf.pages)))]
+
+def iter_pages(pdf_bytes):
+    """Yields the text of each page in order, extracting one page at a time."""
+    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+        for page in pdf.pages:
+            yield _page_text(page)
+
+def iter_pages_parallel(pdf_bytes, n_pages, workers=None):
+    """Yields page texts in order while the pool extracts the pages ahead.
+
+    Only a window of page ranges is submitted at a time, so a consumer that
+    stops early leaves the rest of the document untouched.
+    """
+    workers = workers or PDF_WORKERS
+    pool = _get_pool()
+    ranges = [(start, start + PAGES_PER_TASK) for start in range(0, n_pages, PAGES_PER_TASK)]
+    pending = []
+    try:
+        for start, stop in ranges[:workers * 2]:
+            pending.append(pool.submit(_extract_pages, pdf_bytes, start, stop))
+        next_range = len(pending)
+        while pending:
+            texts = pending.pop(0).result()
+            if next_range < len(ranges):
+                pending.append(pool.submit(_extract_pages, pdf_bytes, *ranges[next_range]))
+                next_range += 1
+            yield from texts
+    finally:
+        for future in pending:
+            future.cancel()
+
+def extract_text(pdf_bytes, max_chars=CV_TEXT_CHARS):
+    """Extracts up to max_chars of text from a PDF (all of it when max_chars is None).
+
+    Returns "" for PDFs that can't be opened (corrupt, or encrypted with a
+    non-empty password) and for scanned PDFs without a text layer.
+    """
+    try:
+        with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+            n_pages = len(pdf.pages)
+    except Exception as e:
+        print(f"Error opening PDF (encrypted or corrupt?): {e}")
+        return ""
+
+    if n_pages >= PARALLEL_MIN_PAGES and PDF_WORKERS > 1:
+        pages = iter_pages_parallel(pdf_bytes, n_pages)
+    else:
+        pages = iter_pages(pdf_bytes)
+
+    parts = []
+    n_chars = 0
+    try:
+        for text in pages:
+            if not text:
+                continue
+            parts.append(text + "\n")
+            n_chars += len(text) + 1
+            if max_chars is not None and n_chars >= max_chars:
+                break
+    except Exception as e:
+        print(f"Error extracting text from PDF: {e}")
+    finally:
+        pages.close()
+
+    text = "".join(parts)
+    if max_chars is not None:
+        text = text[:max_chars]
+    if not text.strip():
+        print("⚠️ No text found in PDF (scanned document?)")
+    return text
@@ -0,0 +1,139 @@
+import os
+import re
+import json
+import threading
+from functools import lru_cache
+
+import normalize
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Builds the compact inputs of the match prompt. The candidate profile is
+# reduced once per run to a minimal canonical JSON, and each posting is cut
+# down to its requirement-bearing sections (qualifications, responsibilities,
+# skills...) under a token budget. Tokens are counted with tiktoken when it is
+# installed and with a conservative local estimate otherwise.
+
+TOKEN_ENCODING = "o200k_base"  # gpt-4o family
+JOB_TOKEN_BUDGET = int(os.getenv("JOBHUNTER_JOB_TOKENS", "700"))
+LEAD_TOKENS = 80  # Opening lines kept so the model knows what the job is
+
+# Headings of the sections a match is judged on
+REQUIREMENT_RE = re.compile(
+    r"^(key |main |your |essential |desired |minimum |preferred |required )?"
+    r"(requirements|qualifications|responsibilities|duties|skills|experience|education|competencies|tasks"
+    r"|profile|what you('ll| will)? (do|bring|need|have)|who you are|what we('re| are) looking for"
+    r"|must[- ]haves?|nice[- ]to[- ]haves?|the role|role|about the role|job description|mission)\b", re.IGNORECASE)
+
+_PIECE_RE = re.compile(r"\w{1,5}|[^\w\s]")
+
+_encoding = None
+_encoding_lock = threading.Lock()
+
+def _get_encoding():
+    """The tiktoken encoding, or None when tiktoken is missing or its data can't be loaded."""
+    global _encoding
+    if tiktoken is None:
+        return None
+    with _encoding_lock:
+        if _encoding is None:
+            try:
+                _encoding = tiktoken.get_encoding(TOKEN_ENCODING)
+            except Exception as e:
+                print(f"tiktoken unavailable, estimating tokens: {e}")
+                _encoding = False
+        return _encoding or None
+
+def count_tokens(text):
+    """Tokens in text. Without tiktoken, an estimate that errs on the high side."""
+    encoding = _get_encoding()
+    if encoding:
+        return len(encoding.encode(text))
+    return len(_PIECE_RE.findall(text))
+
+def truncate_tokens(text, budget):
+    """The longest prefix of text that fits in budget tokens."""
+    encoding = _get_encoding()
+    if encoding:
+        tokens = encoding.encode(text)
+        return text if len(tokens) <= budget else encoding.decode(tokens[:budget])
+    for i, piece in enumerate(_PIECE_RE.finditer(text)):
+        if i == budget:
+            return text[:piece.start()].rstrip()
+    return text
+
+def _compact(value):
+    if isinstance(value, dict):
+        out = {}
+        for key, item in value.items():
+            item = _compact(item)
+            if item not in (None, "", [], {}):
+                # "1_essential_qualifications" -> "essential_qualifications"
+                out[re.sub(r"^\d+_", "", str(key))] = item
+        return out
+    if isinstance(value, list):
+        seen = set()
+        out = []
+        for item in value:
+            item = _compact(item)
+            marker = json.dumps(item, sort_keys=True).lower()
+            if item not in (None, "", [], {}) and marker not in seen:
+                seen.add(marker)
+                out.append(item)
+        return out
+    if isinstance(value, str):
+        return " ".join(value.split())
+    return value
+
+def compact_profile(candidate_profile):
+    """Minimal canonical JSON of a profile: no empty fields, duplicates or key numbering, no spaces."""
+    return json.dumps(_compact(candidate_profile), sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+def _is_section_heading(line):
+    if not normalize._is_heading(line):
+        return False
+    title = line.rstrip(":").strip()
+    return line.endswith(":") or normalize.SECTION_RE.match(title) is not None or REQUIREMENT_RE.match(title) is not None
+
+def sections(job_text):
+    """Splits normalized posting text into (heading, lines) sections; the text before the first heading has heading None."""
+    result = [(None, [])]
+    for line in job_text.split("\n"):
+        if not line:
+            continue
+        if _is_section_heading(line):
+            result.append((line, []))
+        else:
+            result[-1][1].append(line)
+    return [(heading, lines) for heading, lines in result if heading or lines]
+
+@lru_cache(maxsize=2048)
+def job_excerpt(job_text, budget=JOB_TOKEN_BUDGET):
+    """The opening lines and the requirement sections of a posting, within budget tokens.
+
+    Postings without recognizable requirement headings are kept from the top
+    until the budget runs out.
+    """
+    parts = sections(job_text)
+    wanted = [(heading, lines) for heading, lines in parts
+              if heading and REQUIREMENT_RE.match(heading.rstrip(":").strip())]
+    if not wanted:
+        return truncate_tokens(job_text, budget)
+
+    lead = parts[0][1] if parts[0][0] is None else []
+    out = []
+    if lead:
+        out.append(truncate_tokens("\n".join(lead), min(LEAD_TOKENS, budget)))
+    used = count_tokens(out[0]) if out else 0
+    for heading, lines in wanted:
+        block = "\n".join([heading] + lines)
+        remaining = budget - used
+        if remaining <= 0:
+            break
+        block = truncate_tokens(block, remaining)
+        out.append(block)
+        used += count_tokens(block) + 1
+    return "\n".join(out)
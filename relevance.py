@@ -0,0 +1,108 @@
+import os
+import re
+import zlib
+import numpy as np
+
+# Local relevance stage between the crawl and LLM scoring. Profiles and postings
+# are embedded as signed feature-hashed TF-IDF vectors (unigrams + bigrams) and
+# ranked by cosine similarity in one matrix product, so only the top-K postings
+# cost an OpenAI call.
+
+EMBEDDING_DIM = 1024
+TOP_K = int(os.getenv("JOBHUNTER_TOP_K", "25"))
+TITLE_WEIGHT = 3  # Title tokens count this many times in a posting's vector
+JOB_TEXT_CHARS = 6000
+
+STOPWORDS = set("""
+a an and are as at be been by for from has have in is it its of on or our that the their this to was we
+will with you your who what which all any can may must should other more such into about also
+""".split())
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#]*")
+_feature_cache = {}
+
+def tokenize(text):
+    tokens = [t for t in _TOKEN_RE.findall(text.lower()) if len(t) > 1 and t not in STOPWORDS]
+    return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+def _feature(token):
+    """Stable (bucket, sign) for a token; crc32 so vectors are identical across processes."""
+    feature = _feature_cache.get(token)
+    if feature is None:
+        h = zlib.crc32(token.encode("utf-8"))
+        feature = (h % EMBEDDING_DIM, 1.0 if (h >> 20) & 1 else -1.0)
+        if len(_feature_cache) < 500000:
+            _feature_cache[token] = feature
+    return feature
+
+def term_frequencies(texts):
+    """Returns a (len(texts), EMBEDDING_DIM) float32 matrix of sublinear (1 + log tf) hashed term weights."""
+    matrix = np.zeros((len(texts), EMBEDDING_DIM), dtype=np.float32)
+    for row, text in enumerate(texts):
+        counts = {}
+        for token in tokenize(text):
+            counts[token] = counts.get(token, 0) + 1
+        if not counts:
+            continue
+        features = [_feature(t) for t in counts]
+        buckets = np.fromiter((f[0] for f in features), dtype=np.int64, count=len(features))
+        weights = np.fromiter((f[1] * (1.0 + np.log(c)) for f, c in zip(features, counts.values())),
+                              dtype=np.float32, count=len(features))
+        np.add.at(matrix[row], buckets, weights)
+    return matrix
+
+def idf_weights(document_frequency, n_documents):
+    return (np.log((n_documents + 1.0) / (document_frequency + 1.0)) + 1.0).astype(np.float32)
+
+def normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+def profile_text(profile):
+    """The parts of a candidate profile that describe what they should be matched on."""
+    terms = list(profile.get('2_core_tech_stack') or []) + list(profile.get('search_keywords') or [])
+    return " . ".join(str(t) for t in terms)
+
+def job_text(job):
+    title = job.get('title') or ""
+    return " ".join([title] * TITLE_WEIGHT) + " . " + (job.get('clean_body') or "")[:JOB_TEXT_CHARS]
+
+def rank_jobs(jobs, profile, top_k=TOP_K):
+    """Returns copies of the top_k jobs most similar to the profile, best first, with 'relevance' set.
+
+    Jobs sharing no terms with the profile are dropped. If the profile has no
+    usable terms every job is kept in its original order.
+    """
+    if not jobs:
+        return []
+    query = term_frequencies([profile_text(profile)])
+    if not query.any():
+        return list(jobs[:top_k]) if top_k else list(jobs)
+
+    docs = term_frequencies([job_text(job) for job in jobs])
+    idf = idf_weights(np.count_nonzero(docs, axis=0), len(jobs))
+    scores = normalize_rows(docs * idf) @ normalize_rows(query * idf)[0]
+
+    order = np.argsort(-scores, kind="stable")
+    if top_k:
+        order = order[:top_k]
+    ranked = []
+    for i in order:
+        if scores[i] <= 0:
+            break
+        # Copy so the same posting can be ranked for several profiles
+        ranked.append(dict(jobs[i], relevance=round(float(scores[i]), 4)))
+    return ranked
+
+# --- Title gate for fetchers that pay per posting ---
+
+def _stems(text):
+    return {t[:5] for t in _TOKEN_RE.findall(text.lower()) if len(t) > 2 and t not in STOPWORDS}
+
+def title_terms(profile, default=("Evaluation", "Policy")):
+    """Stems of the profile's keywords and core skills, used to pre-select titles before a detail fetch."""
+    return _stems(profile_text(profile)) or _stems(" ".join(default))
+
+def title_matches(title, terms):
+    return bool(_stems(title) & terms)
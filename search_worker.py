@@ -0,0 +1,155 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import database
+import logic
+import sources
+
+# Runs "Find New Jobs" searches off the Streamlit script thread. Searches live in
+# a process-wide registry keyed by user id, so reruns, reconnects and repeated
+# clicks attach to the search already in flight instead of starting another one.
+# The page polls snapshot() and renders results as they are scored.
+
+MAX_CONCURRENT_SEARCHES = int(os.getenv("JOBHUNTER_MAX_SEARCHES", "4"))
+FINISHED_SEARCH_TTL = 3600  # Seconds a finished search stays attachable
+MATCH_FLUSH_SIZE = 10  # Scored matches written to the matches table per transaction
+
+_executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_SEARCHES, thread_name_prefix="search")
+_searches = {}
+_searches_lock = threading.Lock()
+_crawl_lock = threading.Lock()  # One live crawl at a time; searches queued behind it reuse its postings
+
+class Search:
+    """Progress and results of one user's search, shared between the worker and the page."""
+
+    def __init__(self, user_id, profile):
+        self.user_id = user_id
+        self.profile = profile
+        self.state = "queued"  # queued -> crawling -> scoring -> done | failed
+        self.messages = []
+        self.results = []
+        self.shortlisted = None
+        self.scored = 0
+        self.error = None
+        self.started_at = time.time()
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def done(self):
+        return self.state in ("done", "failed")
+
+    def log(self, message):
+        with self._lock:
+            self.messages.append(message)
+
+    def set_state(self, state, **fields):
+        with self._lock:
+            self.state = state
+            for name, value in fields.items():
+                setattr(self, name, value)
+            if self.done:
+                self.finished_at = time.time()
+
+    def add_result(self, job, analysis):
+        with self._lock:
+            self.scored += 1
+            row = result_row(job, analysis)
+            if row:
+                self.results.append(row)
+
+    def snapshot(self):
+        """A consistent copy for rendering; results are sorted best first."""
+        with self._lock:
+            return {
+                "state": self.state,
+                "done": self.done,
+                "messages": list(self.messages),
+                "results": sorted(self.results, key=lambda x: x['score'], reverse=True),
+                "shortlisted": self.shortlisted,
+                "scored": self.scored,
+                "error": self.error,
+                "elapsed": (self.finished_at or time.time()) - self.started_at,
+            }
+
+def result_row(job, analysis):
+    """The card shown for a scored job, or None when it scored 0."""
+    score = analysis.get('score', 0)
+    if score <= 0:
+        return None
+    return {
+        "title": job['title'],
+        "org": job['org'],
+        "score": score,
+        "summary": analysis.get('job_summary', 'N/A'),
+        "strengths": analysis.get('strengths', []),
+        "gaps": analysis.get('gaps', []),
+        "url": job['url'],
+        "source": job['source']
+    }
+
+def _run(search):
+    try:
+        search.set_state("crawling")
+        with _crawl_lock:
+            # Reuse the posting store when it is recent, searching only for keywords no crawl has covered yet;
+            # otherwise refresh the boards that are due
+            if logic.store_is_fresh():
+                search.log(f"Using postings crawled in the last {logic.CRAWL_MAX_AGE_HOURS} hours")
+                if sources.plan(profile=search.profile, new_keys_only=True):
+                    logic.fetch_all_jobs(search.profile, status_callback=search.log, incremental=True, new_keys_only=True)
+            else:
+                logic.fetch_all_jobs(search.profile, status_callback=search.log, incremental=True, scheduled=True)
+
+        # Only the stored postings closest to the profile go on to LLM scoring
+        jobs = logic.find_matching_postings(search.profile)
+        search.set_state("scoring", shortlisted=len(jobs))
+        version = logic.profile_version(search.profile)
+        pending = []
+        for job, analysis in logic.score_jobs(jobs, search.profile):
+            search.add_result(job, analysis)
+            record = logic.match_record(search.user_id, job, analysis, version)
+            if record:
+                pending.append(record)
+            if len(pending) >= MATCH_FLUSH_SIZE:
+                _save_matches(pending)
+                pending = []
+        _save_matches(pending)
+        search.set_state("done")
+    except Exception as e:
+        print(f"Search for user {search.user_id} failed: {e}")
+        search.set_state("failed", error=str(e))
+
+def _save_matches(records):
+    """Stores scored matches so the feed survives logout and restarts."""
+    if not records:
+        return
+    try:
+        database.record_matches_many(records)
+    except Exception as e:
+        print(f"Saving matches failed: {e}")
+
+def _prune():
+    cutoff = time.time() - FINISHED_SEARCH_TTL
+    for user_id, search in list(_searches.items()):
+        if search.done and search.finished_at < cutoff:
+            del _searches[user_id]
+
+def start_search(user_id, profile):
+    """Starts a search for the user, or returns the one already running. Returns (search, started)."""
+    with _searches_lock:
+        _prune()
+        search = _searches.get(user_id)
+        if search and not search.done:
+            return search, False
+        search = Search(user_id, profile)
+        _searches[user_id] = search
+        _executor.submit(_run, search)
+        return search, True
+
+def get_search(user_id):
+    """The user's running or most recent search, or None."""
+    with _searches_lock:
+        return _searches.get(user_id)
@@ -0,0 +1,158 @@
+import os
+import json
+from datetime import datetime, timedelta, timezone
+
+import database
+
+# Source registry and crawl scheduler. Fetchers register here under a source
+# name, with the org boards they scan by default; the sources and their org
+# targets live in the sources table, where targets can be added or disabled
+# without a deploy. Each crawl of a target updates its observed change rate
+# (new or changed postings per hour), and the scheduler gives every target a
+# crawl interval from it: boards that change hourly are crawled often, quiet
+# ones only every few days. Sources whose query depends on the profile
+# (keywords, title terms) also record which query keys each crawl covered; a
+# target is due early for keys it hasn't been crawled for within its interval,
+# so a new user's keywords are searched on their first search.
+
+MIN_INTERVAL_HOURS = float(os.getenv("JOBHUNTER_MIN_CRAWL_HOURS", "1"))
+MAX_INTERVAL_HOURS = float(os.getenv("JOBHUNTER_MAX_CRAWL_HOURS", "168"))  # Well inside the 14 days after which postings count as closed
+DEFAULT_INTERVAL_HOURS = 24  # Until a target has been crawled twice
+CHANGES_PER_CRAWL = 1.0  # Aim for about this many new or changed postings per crawl
+RATE_SMOOTHING = 0.3  # Weight of the latest crawl in the moving average change rate
+
+FEED = ""  # org of a source crawled as one feed (ReliefWeb, Remote OK)
+
+_registry = {}  # name -> (fetcher, default org targets or None, query keys or None), in registration order
+
+def register(name, fetcher, targets=None, keys=None):
+    """Adds a source. fetcher(profile, targets) returns its postings; targets are its default orgs, None for a feed.
+
+    A feed's fetcher returns None when the feed can't be read (org boards do the same through logic._fetch_orgs).
+    keys(profile) returns the terms the source's query is built from, for sources whose postings depend on the profile.
+    """
+    _registry[name] = (fetcher, list(targets) if targets is not None else None, keys)
+
+def names():
+    return list(_registry)
+
+def fetcher(name):
+    return _registry[name][0]
+
+def has_targets(name):
+    return _registry[name][1] is not None
+
+def query_keys(name, profile):
+    """The sorted query keys a crawl of the source covers for profile; [] for sources that ignore the profile."""
+    keys = _registry[name][2]
+    if keys is None or profile is None:
+        return []
+    return sorted({str(k) for k in keys(profile)})
+
+def _now():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def _format(when):
+    return when.strftime("%Y-%m-%d %H:%M:%S")
+
+def _parse(value):
+    return datetime.strptime(value[:19], "%Y-%m-%d %H:%M:%S") if value else None
+
+def registry():
+    """Every stored target of the registered sources (registering adds its default targets)."""
+    rows = []
+    for name, (_, targets, _) in _registry.items():
+        rows.extend((name, org) for org in (targets if targets is not None else [FEED]))
+    database.ensure_sources(rows)
+    return [row for row in database.get_sources() if row['source'] in _registry]
+
+def targets(name):
+    """Enabled org targets of a source; its registered defaults if the table can't be read."""
+    try:
+        return [row['org'] for row in registry() if row['source'] == name and row['enabled'] and row['org'] != FEED]
+    except Exception as e:
+        print(f"Source registry unavailable, using default targets: {e}")
+        return list(_registry[name][1] or [])
+
+def _crawled_keys(row):
+    try:
+        return json.loads(row.get('crawled_keys') or "{}")
+    except ValueError:
+        return {}
+
+def uncovered(row, keys, now=None):
+    """The keys a target hasn't been crawled for within its interval."""
+    now = now or _now()
+    interval = timedelta(hours=row['interval_hours'] or DEFAULT_INTERVAL_HOURS)
+    crawled = _crawled_keys(row)
+    return [k for k in keys if k not in crawled or _parse(crawled[k]) + interval <= now]
+
+def is_due(row, now=None, keys=()):
+    if not row['last_crawled']:
+        return True
+    interval = row['interval_hours'] or DEFAULT_INTERVAL_HOURS
+    if _parse(row['last_crawled']) + timedelta(hours=interval) <= (now or _now()):
+        return True
+    return bool(uncovered(row, keys, now))
+
+def plan(scheduled=False, now=None, profile=None, new_keys_only=False):
+    """[(source, targets)] to crawl, in registration order; targets is None for a feed.
+
+    With scheduled=True only targets that are due are included, and sources
+    with nothing due are left out. A target is also due when profile has query
+    keys it hasn't been crawled for; with new_keys_only=True only those
+    targets are included.
+    """
+    try:
+        rows = registry()
+    except Exception as e:
+        print(f"Source registry unavailable, crawling every source: {e}")
+        return [(name, None if targets is None else list(targets)) for name, (_, targets, _) in _registry.items()]
+
+    def wanted(row, keys):
+        if not row['enabled']:
+            return False
+        if new_keys_only:
+            return bool(uncovered(row, keys, now))
+        return not scheduled or is_due(row, now, keys)
+
+    result = []
+    for name in _registry:
+        keys = query_keys(name, profile)
+        due = [row for row in rows if row['source'] == name and wanted(row, keys)]
+        if not due:
+            continue
+        result.append((name, [row['org'] for row in due] if has_targets(name) else None))
+    return result
+
+def next_interval(change_rate):
+    """Hours until the next crawl of a target that sees change_rate new or changed postings per hour."""
+    if change_rate is None:
+        return DEFAULT_INTERVAL_HOURS
+    if change_rate <= 0:
+        return MAX_INTERVAL_HOURS
+    return min(MAX_INTERVAL_HOURS, max(MIN_INTERVAL_HOURS, CHANGES_PER_CRAWL / change_rate))
+
+def record_crawl(source, org, jobs, now=None, keys=()):
+    """Updates a target's change rate and crawl interval from the postings one crawl returned.
+
+    keys are the query keys the crawl covered; keys not crawled for MAX_INTERVAL_HOURS are forgotten.
+    """
+    now = now or _now()
+    try:
+        row = next((r for r in database.get_sources() if r['source'] == source and r['org'] == (org or FEED)), None)
+        changed = sum(1 for job in jobs if job.get('changed', True))
+        rate = row['change_rate'] if row else None
+        last = _parse(row['last_crawled']) if row else None
+        if last:
+            hours = max((now - last).total_seconds() / 3600, MIN_INTERVAL_HOURS / 4)
+            observed = changed / hours
+            rate = observed if rate is None else RATE_SMOOTHING * observed + (1 - RATE_SMOOTHING) * rate
+        crawled = _crawled_keys(row) if row else {}
+        crawled.update({k: _format(now) for k in keys})
+        cutoff = now - timedelta(hours=MAX_INTERVAL_HOURS)
+        crawled = {k: when for k, when in crawled.items() if _parse(when) > cutoff}
+        database.update_source_schedule(source, org or FEED, rate, next_interval(rate), _format(now), changed > 0,
+                                        json.dumps(crawled, sort_keys=True) if crawled else None)
+    except Exception as e:
+        print(f"Crawl schedule update failed for {source} {org or ''}: {e}")
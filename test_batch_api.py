@@ -0,0 +1,93 @@
+import os
+import json
+import tempfile
+from unittest.mock import patch
+
+import batch_api
+import cache
+import llm
+import logic
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+cache.CACHE_DB_NAME = os.path.join(tempfile.mkdtemp(), "cache.db")
+batch_api.BATCH_STATE_PATH = os.path.join(tempfile.mkdtemp(), "batch_state.json")
+
+profile = {"search_keywords": ["Evaluation"], "2_core_tech_stack": ["Impact Evaluation"]}
+
+def respond(body):
+    """Scores 90 for evaluation jobs and 30 otherwise; fails outright on jobs mentioning 'broken'."""
+    text = body['messages'][0]['content']
+    if "broken" in text:
+        raise ValueError("server error")
+    score = 90 if "evaluation" in text else 30
+    content = json.dumps({"score": score, "job_summary": "Batched", "strengths": [], "gaps": []})
+    return {"choices": [{"message": {"content": content}}], "usage": {"prompt_tokens": 100}}
+
+def make_jobs(prefix, bodies):
+    return [{"title": f"Job {i}", "clean_body": f"{prefix} {i}: {b}"} for i, b in enumerate(bodies)]
+
+print("📦 Testing offline scoring...")
+jobs = make_jobs("a", ["impact evaluation lead", "kitchen staff", "evaluation officer"])
+client = batch_api.LocalBatchClient(respond, ready_after=3)
+with patch('time.sleep'):
+    results = {job['clean_body']: a for (job, _), a in batch_api.score_offline([(j, profile) for j in jobs], client=client)}
+if len(client.jobs) == 1 and [results[j['clean_body']]['score'] for j in jobs] == [90, 30, 90] \
+        and not os.path.exists(batch_api.BATCH_STATE_PATH):
+    print("✅ All prompts scored in one batch, state cleared")
+else:
+    print(f"❌ {len(client.jobs)} batches, results {results}")
+
+client = batch_api.LocalBatchClient(respond)
+again = list(batch_api.score_offline([(j, profile) for j in jobs], client=client))
+if len(again) == 3 and not client.jobs:
+    print("✅ Batch results cached; no second batch")
+else:
+    print(f"❌ Second run submitted {len(client.jobs)} batches")
+
+print("\n🔁 Testing synchronous fallback...")
+jobs = make_jobs("b", ["evaluation analyst", "broken posting"])
+client = batch_api.LocalBatchClient(respond)
+with patch('openai.OpenAI') as MockClient:
+    llm.reset_client()
+    create = MockClient.return_value.chat.completions.create
+    create.return_value.choices[0].message.content = '{"score": 55, "job_summary": "Sync", "strengths": [], "gaps": []}'
+    results = {job['clean_body']: a for (job, _), a in batch_api.score_offline([(j, profile) for j in jobs], client=client)}
+if create.call_count == 1 and results[jobs[0]['clean_body']]['score'] == 90 and results[jobs[1]['clean_body']]['job_summary'] == "Sync":
+    print("✅ Only the failed request rescored synchronously")
+else:
+    print(f"❌ {create.call_count} sync calls, results {results}")
+
+jobs = make_jobs("c", ["evaluation analyst", "evaluation lead"])
+client = batch_api.LocalBatchClient(respond, ready_after=1000, finished_on_cancel=1)
+with patch('openai.OpenAI') as MockClient:
+    llm.reset_client()
+    create = MockClient.return_value.chat.completions.create
+    create.return_value.choices[0].message.content = '{"score": 55, "job_summary": "Sync", "strengths": [], "gaps": []}'
+    results = {job['clean_body']: a for (job, _), a in batch_api.score_offline([(j, profile) for j in jobs], client=client, max_wait=0)}
+batch = list(client.jobs.values())[0]
+if batch['status'] == "cancelled" and create.call_count == 1 and results[jobs[0]['clean_body']]['job_summary'] == "Batched" \
+        and results[jobs[1]['clean_body']]['job_summary'] == "Sync" and not os.path.exists(batch_api.BATCH_STATE_PATH):
+    print("✅ Batch past the wait limit cancelled; its finished results kept, the rest rescored")
+else:
+    print(f"❌ Batch {batch['status']}, {create.call_count} sync calls, results {results}")
+
+print("\n♻️ Testing resume after a restart...")
+jobs = make_jobs("d", ["evaluation specialist", "driver"])
+client = batch_api.LocalBatchClient(respond)
+lines = [batch_api.request_line(f"job-{i}", job, "{}") for i, job in enumerate(jobs)]
+batch_id = batch_api.submit(client, lines)
+keys = [logic._match_cache_key(job['clean_body'], profile) for job in jobs]
+batch_api.save_state({"batch_id": batch_id, "requests": {f"job-{i}": {"key": key, "meta": {"posting_id": i}}
+                                                         for i, key in enumerate(keys)}})
+# The process "restarts" here: only the state file and the remote batch survive
+resumed = sorted(batch_api.resume(client), key=lambda x: x[0]['posting_id'])
+if [(meta['posting_id'], a['score']) for meta, a in resumed] == [(0, 90), (1, 30)] \
+        and cache.get_match(keys[0])['score'] == 90 and batch_api.load_state() is None:
+    print("✅ Pending batch finished, cached and mapped back to its postings")
+else:
+    print(f"❌ Resumed {resumed}")
+
+if batch_api.resume(client) == []:
+    print("✅ Nothing to resume once the batch is done")
+else:
+    print("❌ Batch resumed twice")
@@ -0,0 +1,124 @@
+import cache
+import llm
+import logic
+import os
+import tempfile
+import time
+from unittest.mock import patch
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+cache.CACHE_DB_NAME = os.path.join(tempfile.mkdtemp(), "cache.db")
+
+profile = {"search_keywords": ["Evaluation"], "2_core_tech_stack": ["CBA"]}
+
+print("🔑 Testing match keys...")
+key = cache.match_key("Senior  Policy\nAnalyst", profile, "v1", "gpt-4o-mini")
+same = cache.match_key("Senior Policy Analyst", dict(reversed(list(profile.items()))), "v1", "gpt-4o-mini")
+other = cache.match_key("Senior Policy Analyst", profile, "v2", "gpt-4o-mini")
+if key == same and key != other:
+    print("✅ Keys ignore whitespace/key order and change with prompt version")
+else:
+    print("❌ Key normalization failed")
+
+print("\n💾 Testing hit/miss...")
+if cache.get_match(key) is None:
+    print("✅ Miss on empty cache")
+cache.put_match(key, "v1", "gpt-4o-mini", {"score": 90})
+if cache.get_match(key) == {"score": 90}:
+    print("✅ Hit after put")
+else:
+    print("❌ Cached analysis not returned")
+stats = cache.get_stats("match")
+if stats == {"hits": 1, "misses": 1}:
+    print(f"✅ Counters: {stats}")
+else:
+    print(f"❌ Counters wrong: {stats}")
+
+print("\n⏳ Testing TTL...")
+time.sleep(0.05)
+if cache.get_match(key, ttl=0.01) is None and cache.get_match(key) is None:
+    print("✅ Expired entry dropped")
+else:
+    print("❌ Expired entry returned")
+
+print("\n🧹 Testing LRU eviction...")
+for i in range(5):
+    cache.put_match(f"k{i}", "v1", "gpt-4o-mini", {"score": i}, max_entries=3)
+    time.sleep(0.01)
+if cache.get_match("k0") is None and cache.get_match("k4") == {"score": 4}:
+    print("✅ Oldest entries evicted")
+else:
+    print("❌ LRU eviction failed")
+
+print("\n🔄 Testing prompt version purge...")
+removed = cache.purge_matches("v2", "gpt-4o-mini")
+if removed == 3 and cache.get_match("k4") is None:
+    print("✅ Entries from old prompt version purged")
+else:
+    print(f"❌ Purge removed {removed}")
+
+print("\n🤖 Testing match_job_to_cv uses the cache...")
+with patch('openai.OpenAI') as MockClient:
+    llm.reset_client()
+    create = MockClient.return_value.chat.completions.create
+    create.return_value.choices[0].message.content = '{"score": 77, "job_summary": "x", "strengths": [], "gaps": []}'
+    first = logic.match_job_to_cv("Evaluation Officer", profile)
+    second = logic.match_job_to_cv("Evaluation  Officer", profile)
+    scored = list(logic.score_jobs([{"clean_body": "Evaluation Officer"}], profile))
+    if create.call_count == 1 and first == second == scored[0][1]:
+        print("✅ Repeated job scored once")
+    else:
+        print(f"❌ OpenAI called {create.call_count} times")
+
+print("\n📄 Testing CV cache...")
+with patch('logic.extract_text_from_pdf', return_value="CV text") as mock_extract, patch('openai.OpenAI') as MockClient:
+    llm.reset_client()
+    create = MockClient.return_value.chat.completions.create
+    create.return_value.choices[0].message.content = '{"search_keywords": ["Policy"]}'
+    first = logic.profile_cv(b"%PDF-1.4 fake cv")
+    second = logic.profile_cv(b"%PDF-1.4 fake cv")
+    if first == second == ("CV text", {"search_keywords": ["Policy"]}) and mock_extract.call_count == 1 and create.call_count == 1:
+        print("✅ Same PDF extracted and profiled once")
+    else:
+        print(f"❌ extract called {mock_extract.call_count}x, OpenAI called {create.call_count}x")
+    logic.profile_cv(b"%PDF-1.4 other cv")
+    if mock_extract.call_count == 2:
+        print("✅ Different PDF re-extracted")
+    else:
+        print("❌ Different PDF served from cache")
+
+print("\n🗂️ Testing detail cache...")
+cache.put_detail("SmartRecruiters", "42", "2026-01-01T00:00:00Z", "Body v1")
+for i in range(3):
+    cache.put_detail("SmartRecruiters", f"old-{i}", "v", "Old", max_entries=3)
+if cache.get_detail("SmartRecruiters", "42", "2026-02-01T00:00:00Z") is None \
+        and cache.get_detail("SmartRecruiters", "old-2", "v") == "Old" and cache.get_detail("SmartRecruiters", "42", "2026-01-01T00:00:00Z") is None:
+    print("✅ New releasedDate misses; oldest entry evicted past the limit")
+else:
+    print("❌ Detail cache returned a stale or evicted body")
+
+print("\n🚦 Testing lookups stay read-only...")
+import database
+statements = []
+with database.connection(cache.CACHE_DB_NAME) as conn:
+    conn.set_trace_callback(statements.append)
+cache.put_match("hot", "v1", "gpt-4o-mini", {"score": 1})
+cache.flush_stats()
+statements.clear()
+hits = [cache.get_match("hot") for _ in range(cache.STATS_FLUSH_EVERY - 1)]
+writes = [s for s in statements if not s.lstrip().upper().startswith(("SELECT", "BEGIN", "COMMIT"))]
+if all(h == {"score": 1} for h in hits) and writes == [] and cache.get_stats("match")["hits"] >= len(hits):
+    print("✅ Hits buffered: no writes until the counters are flushed")
+else:
+    print(f"❌ Lookups wrote: {writes[:3]}")
+
+statements.clear()
+for i in range(250):
+    cache.put_match(f"e{i}", "v1", "gpt-4o-mini", {"score": i}, max_entries=10000)
+evictions = [s for s in statements if s.lstrip().startswith("DELETE")]
+with database.connection(cache.CACHE_DB_NAME) as conn:
+    conn.set_trace_callback(None)
+if len(evictions) == 2:
+    print("✅ LRU eviction runs once per 100 inserts, not on every insert")
+else:
+    print(f"❌ {len(evictions)} evictions for 250 inserts")
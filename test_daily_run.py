@@ -0,0 +1,98 @@
+import cache
+import daily_run
+import database
+import llm
+import logic
+import os
+import relevance
+import tempfile
+import vector_index
+from unittest.mock import patch
+
+os.environ.update({"OPENAI_API_KEY": "test-key", "EMAIL_USER": "bot@example.com", "EMAIL_PASS": "pass"})
+os.environ.pop("TARGET_EMAIL", None)
+cache.CACHE_DB_NAME = os.path.join(tempfile.mkdtemp(), "cache.db")
+database.DB_NAME = os.path.join(tempfile.mkdtemp(), "jobs.db")
+vector_index.INDEX_DIR = os.path.join(tempfile.mkdtemp(), "vector_index")
+database.init_db()
+
+print("👥 Setting up subscribers...")
+alice = database.create_user("alice@example.com", "pw", "alice-alerts@example.com")
+database.save_profile(alice, "cv", {"2_core_tech_stack": ["Evaluation"]}, ["Evaluation", "Policy"])
+bob = database.create_user("bob@example.com", "pw", "bob-alerts@example.com")
+database.save_profile(bob, "cv", {"2_core_tech_stack": ["Data"]}, ["Data", "Policy"])
+carol = database.create_user("carol@example.com", "pw", "carol@example.com")
+database.save_profile(carol, "cv", {}, ["Regulation"])
+database.toggle_subscription(carol, False)
+
+subscribers = [{"search_keywords": ["Evaluation", "Policy"], "2_core_tech_stack": ["Cost-Benefit Analysis"]},
+               {"search_keywords": ["Data", "Policy"]}]
+crawl_profile = daily_run.build_crawl_profile(subscribers)
+if crawl_profile['search_keywords'][0] == "Policy" and len(crawl_profile['search_keywords']) == 3 \
+        and relevance.title_terms(subscribers[0]) <= relevance.title_terms(crawl_profile):
+    print("✅ Crawl profile ranks shared keywords first and keeps every subscriber's title terms")
+else:
+    print(f"❌ Unexpected crawl profile: {crawl_profile}")
+
+print("\n📬 Testing batch run...")
+jobs = [{"title": f"Policy Officer {i}", "org": "Org", "clean_body": f"Evaluation and data policy work {i}", "url": f"http://x/{i}", "source": "Lever"} for i in range(4)]
+with patch('logic.fetch_all_jobs', return_value=jobs) as mock_fetch, \
+     patch('logic.send_visual_email') as mock_send, \
+     patch('openai.OpenAI') as MockClient:
+    llm.reset_client()
+    MockClient.return_value.chat.completions.create.return_value.choices[0].message.content = \
+        '{"score": 80, "job_summary": "Ok", "strengths": [], "gaps": []}'
+    daily_run.main()
+
+    recipients = sorted(call.args[1] for call in mock_send.call_args_list)
+    if mock_fetch.call_count == 1 and recipients == ["alice-alerts@example.com", "bob-alerts@example.com"]:
+        print("✅ Crawled once, emailed each subscriber")
+    else:
+        print(f"❌ Crawled {mock_fetch.call_count}x, emailed {recipients}")
+    if all(len(call.args[0]) == len(jobs) for call in mock_send.call_args_list):
+        print("✅ Each email covers every posting")
+    else:
+        print("❌ Email results incomplete")
+
+print("\n💾 Testing stored matches...")
+stored_jobs = [dict(job, external_id=str(i), content_hash=logic._content_hash(job["url"])) for i, job in enumerate(jobs)]
+database.upsert_postings_many(stored_jobs)
+vector_index.add_postings(stored_jobs)
+with patch('logic.fetch_all_jobs', return_value=stored_jobs), \
+     patch('logic.send_visual_email') as mock_send, \
+     patch('openai.OpenAI') as MockClient:
+    llm.reset_client()
+    MockClient.return_value.chat.completions.create.return_value.choices[0].message.content = \
+        '{"score": 75, "job_summary": "Rescored", "strengths": [], "gaps": []}'
+    daily_run.main()
+
+alice_matches = database.get_matches(alice)
+# Same postings and profiles as the first run, so scores come from the match cache
+if len(alice_matches) == len(jobs) and alice_matches[0]['score'] == 80 and alice_matches[0]['title'].startswith("Policy Officer"):
+    print("✅ Matches stored for each subscriber")
+else:
+    print(f"❌ Unexpected stored matches: {alice_matches}")
+
+print("\n📦 Testing offline (Batch API) run...")
+import batch_api
+batch_api.BATCH_STATE_PATH = os.path.join(tempfile.mkdtemp(), "batch_state.json")
+offline_jobs = [dict(job, clean_body=job["clean_body"] + " offline", url=job["url"] + "/offline", external_id=f"off-{i}",
+                     content_hash=logic._content_hash(job["url"] + "/offline")) for i, job in enumerate(jobs)]
+database.upsert_postings_many(offline_jobs)
+vector_index.add_postings(offline_jobs)
+answer = {"choices": [{"message": {"content": '{"score": 66, "job_summary": "Batched", "strengths": [], "gaps": []}'}}]}
+local = batch_api.LocalBatchClient(lambda body: answer)
+with patch.object(batch_api, 'OFFLINE_SCORING', True), \
+     patch('llm.get_client', return_value=local), \
+     patch('logic.fetch_all_jobs', return_value=offline_jobs), \
+     patch('logic.send_visual_email') as mock_send, \
+     patch('openai.OpenAI') as MockClient:
+    llm.reset_client()
+    daily_run.main()
+    batched = database.get_matches(alice, limit=100)
+    if len(local.jobs) == 1 and MockClient.return_value.chat.completions.create.call_count == 0 \
+            and mock_send.call_count == 2 and sum(m['score'] == 66 for m in batched) == len(jobs) \
+            and not os.path.exists(batch_api.BATCH_STATE_PATH):
+        print("✅ Scored in one batch, emailed and stored")
+    else:
+        print(f"❌ {len(local.jobs)} batches, {mock_send.call_count} emails, matches {[m['score'] for m in batched]}")
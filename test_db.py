@@ -53,3 +53,113 @@ if len(jobs2) == 0:
     print("✅ User 2 sees 0 jobs (Isolation working)")
 else:
     print(f"❌ Isolation failed, User 2 sees: {jobs2}")
+
+print("\n🗂️ Testing Posting Store...")
+posting = {"source": "Lever", "external_id": "abc", "title": "Policy Lead", "org": "Org",
+           "clean_body": "Body v1", "url": "http://lever.co/abc", "content_hash": "h1", "changed": True}
+database.upsert_postings_many([posting])
+first_id = posting['posting_id']
+database.upsert_postings_many([{"source": "Lever", "external_id": "abc", "content_hash": "h1", "changed": False}])
+changed = dict(posting, clean_body="Body v2", content_hash="h2")
+database.upsert_postings_many([changed])
+stored = database.get_postings([first_id])
+if changed['posting_id'] == first_id and stored[0]['clean_body'] == "Body v2" and database.get_posting_hashes("Lever") == {"abc": "h2"}:
+    print("✅ Posting upserted in place and hash tracked")
+else:
+    print(f"❌ Posting store mismatch: {stored}")
+
+print("\n📦 Testing Bulk Writes...")
+batch = [{"title": f"Analyst {i}", "org": "Org", "score": 70 + i, "url": f"http://bulk/{i}"} for i in range(3)]
+inserted = database.save_jobs_many(user_id, batch + [{"title": "AI Engineer", "org": "Google", "score": 95, "url": "http://google.com/jobs/1"}])
+if inserted == 3 and len(database.get_saved_jobs(user_id)) == 4:
+    print("✅ Bulk save skipped the already saved job")
+else:
+    print(f"❌ Bulk save inserted {inserted}")
+
+match = {"user_id": user_id, "posting_id": first_id, "score": 60, "summary": "Ok",
+         "strengths": ["Policy"], "gaps": [], "profile_version": "p1"}
+database.record_matches_many([match])
+database.record_matches_many([dict(match, score=80, profile_version="p2"), dict(match, posting_id=None)])
+with database.connection() as conn:
+    rows = conn.execute("SELECT score, profile_version, strengths FROM matches WHERE user_id = ?", (user_id,)).fetchall()
+if [tuple(r) for r in rows] == [(80, "p2", '["Policy"]')]:
+    print("✅ Matches recorded and rescored in place")
+else:
+    print(f"❌ Unexpected matches: {[tuple(r) for r in rows]}")
+
+print("\n📰 Testing Match Feed...")
+first_visit = database.touch_last_visit(user_id)
+with database.connection() as conn:
+    conn.execute("UPDATE users SET last_visit = '2000-01-01 00:00:00' WHERE id = ?", (user_id,))
+    conn.execute("UPDATE matches SET scored_at = '1999-01-01 00:00:00' WHERE user_id = ?", (user_id,))
+second = dict(posting, external_id="def", url="http://lever.co/def")
+database.upsert_postings_many([second])
+database.record_matches_many([dict(match, posting_id=second['posting_id'], score=90, profile_version="p2")])
+last_visit = database.touch_last_visit(user_id)
+feed = database.get_matches(user_id, limit=1)
+page_two = database.get_matches(user_id, limit=1, offset=1)
+new_since = database.get_matches(user_id, since=last_visit)
+if first_visit is None and last_visit == "2000-01-01 00:00:00" and feed[0]['score'] == 90 and page_two[0]['score'] == 80 \
+        and [m['url'] for m in new_since] == ["http://lever.co/def"] and database.count_matches(user_id) == 2 \
+        and database.count_matches(user_id, profile_version="p1") == 0:
+    print("✅ Feed paginates, filters by version and finds matches new since the last visit")
+else:
+    print(f"❌ Unexpected feed: {feed} / {page_two} / {new_since}")
+
+with database.connection() as conn:
+    conn.execute("UPDATE matches SET scored_at = '2001-01-01 00:00:00' WHERE user_id = ?", (user_id,))
+database.record_matches_many([dict(match, posting_id=second['posting_id'], score=90, profile_version="p2"),
+                              dict(match, score=60, profile_version="p2")])
+rescored = database.get_matches(user_id, since="2002-01-01 00:00:00")
+if [m['url'] for m in rescored] == [posting['url']] and rescored[0]['score'] == 60:
+    print("✅ Re-recording an unchanged match keeps it out of the new ones; a changed score counts")
+else:
+    print(f"❌ New after re-recording: {rescored}")
+
+with database.connection() as conn:
+    plan = " ".join(row[3] for row in conn.execute("EXPLAIN QUERY PLAN SELECT * FROM profiles WHERE user_id = ?", (user_id,)))
+if "idx_profiles_user_id" in plan:
+    print("✅ Profile lookup uses its index")
+else:
+    print(f"❌ Profile lookup plan: {plan}")
+
+print("\n🔌 Testing Connection Pool...")
+with database.connection() as conn:
+    journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+    first_conn = conn
+with database.connection() as conn:
+    reused = conn is first_conn
+if journal_mode == "wal" and reused:
+    print("✅ WAL enabled and connection reused")
+else:
+    print(f"❌ Journal mode {journal_mode}, reused={reused}")
+
+try:
+    with database.connection() as conn:
+        conn.execute("INSERT INTO saved_jobs (user_id, title, url) VALUES (?, ?, ?)", (user2_id, "Rolled back", "http://x/rb"))
+        raise RuntimeError("abort")
+except RuntimeError:
+    pass
+if database.get_saved_jobs(user2_id) == []:
+    print("✅ Failed block rolled back")
+else:
+    print("❌ Failed block left rows behind")
+
+import threading
+errors = []
+def writer(n):
+    try:
+        for i in range(20):
+            database.save_job(user2_id, f"Job {n}-{i}", "Org", 50, f"http://x/{n}/{i}")
+            database.get_saved_jobs(user2_id)
+    except Exception as e:
+        errors.append(e)
+threads = [threading.Thread(target=writer, args=(n,)) for n in range(8)]
+for t in threads:
+    t.start()
+for t in threads:
+    t.join()
+if not errors and len(database.get_saved_jobs(user2_id)) == 160:
+    print("✅ Concurrent readers and writers did not lock each other out")
+else:
+    print(f"❌ Concurrent access failed: {errors[:1]}")
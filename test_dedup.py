@@ -0,0 +1,121 @@
+import os
+import time
+import random
+import tempfile
+
+import database
+import dedup
+import logic
+import vector_index
+
+database.DB_NAME = os.path.join(tempfile.mkdtemp(), "jobs.db")
+vector_index.INDEX_DIR = os.path.join(tempfile.mkdtemp(), "vector_index")
+database.init_db()
+
+WORDS = ("evaluation monitoring programme impact data policy research climate health finance budget report "
+         "field partners donor survey analysis team lead manage design develop support quality learning").split()
+
+def body(seed, n=250):
+    r = random.Random(seed)
+    return " ".join(r.choice(WORDS) + str(r.randint(0, 40)) for _ in range(n))
+
+def job(source, external_id, title, org, text, url):
+    return {"source": source, "external_id": external_id, "title": title, "org": org, "clean_body": text,
+            "url": url, "content_hash": logic._content_hash(title, org, text)}
+
+print("🔗 Testing URL canonicalization...")
+a = dedup.canonical_url("https://www.Example.org/jobs/123/?utm_source=x&b=2&a=1#apply")
+b = dedup.canonical_url("http://example.org/jobs/123?a=1&b=2&gh_src=feed")
+if a == b == "example.org/jobs/123?a=1&b=2" and dedup.canonical_url("https://x.org/jobs?id=1") != dedup.canonical_url("https://x.org/jobs?id=2"):
+    print(f"✅ Tracking params, www, scheme, fragment and trailing slash dropped: {a}")
+else:
+    print(f"❌ {a} vs {b}")
+
+print("\n🏷️ Testing title + org keys...")
+if dedup.dedup_key("M&E Officer (Remote)", "Save the Children, Inc.") == dedup.dedup_key("m&e officer", "SaveTheChildren") \
+        and dedup.dedup_key("M&E Officer", "Oxfam") != dedup.dedup_key("M&E Lead", "Oxfam"):
+    print("✅ Case, punctuation, bracketed notes and legal suffixes ignored")
+else:
+    print("❌ Keys differ")
+
+print("\n#️⃣ Testing SimHash...")
+text = body(1)
+edited = text.replace(text.split()[5], "rewritten", 1) + " Apply through our careers page."
+unrelated = body(2)
+d_near = dedup.distance(dedup.simhash(text), dedup.simhash(edited))
+d_far = dedup.distance(dedup.simhash(text), dedup.simhash(unrelated))
+if d_near <= dedup.MAX_DISTANCE < d_far and dedup.simhash("too short") is None \
+        and dedup.simhash(text) == dedup.simhash(text) and -(1 << 63) <= dedup.simhash(text) < (1 << 63):
+    print(f"✅ Near-duplicate bodies {d_near} bits apart, unrelated {d_far}")
+else:
+    print(f"❌ near {d_near}, far {d_far}")
+
+print("\n🧮 Testing find_duplicates...")
+postings = [
+    dict(job("Greenhouse", "1", "Evaluation Officer", "Oxfam", body(10), "https://boards.greenhouse.io/oxfam/jobs/1"), posting_id=1),
+    dict(job("ReliefWeb", "9", "Evaluation Officer (Remote)", "Oxfam Inc", body(10) + " How to apply: see link.",
+             "https://reliefweb.int/job/9"), posting_id=2),
+    dict(job("Lever", "3", "Data Analyst", "Oxfam", body(11), "https://boards.greenhouse.io/oxfam/jobs/1?utm_source=lever"), posting_id=3),
+    dict(job("Lever", "4", "Evaluation Officer", "Oxfam", body(12), "https://jobs.lever.co/oxfam/4"), posting_id=4),
+    dict(job("Remote OK", "5", "Budget Analyst", "Acme", body(13), "https://remoteok.com/5"), posting_id=5),
+]
+for p in postings:
+    dedup.fingerprint(p)
+links = dedup.find_duplicates(postings)
+# 2: same body and key as 1; 3: same URL as 1; 4: same title + org but a different body (another vacancy)
+if links == {2: 1, 3: 1}:
+    print("✅ Body, key and URL duplicates linked to the first posting; distinct vacancy kept")
+else:
+    print(f"❌ Links {links}")
+
+known = [{"id": 100, "canonical_id": None, **{k: postings[4][k] for k in ("canonical_url", "dedup_key", "simhash")}},
+         {"id": 101, "canonical_id": 50, "canonical_url": "x.org/1", "dedup_key": "x|y", "simhash": None}]
+links = dedup.find_duplicates([dict(postings[4], posting_id=200)], known)
+if links == {200: 100, 101: None}:
+    print("✅ Matched against stored postings; orphaned duplicate unlinked")
+else:
+    print(f"❌ Links {links}")
+
+print("\n🗄️ Testing dedup in the posting store...")
+crawl = [
+    job("Greenhouse", "g1", "Evaluation Officer", "Oxfam", body(20), "https://boards.greenhouse.io/oxfam/jobs/1"),
+    job("Lever", "l1", "Budget Analyst", "Acme", body(21), "https://jobs.lever.co/acme/1"),
+]
+first = logic._sync_posting_store([dict(j) for j in crawl], incremental=True)
+second_crawl = [dict(j, changed=False) for j in crawl] + [
+    job("ReliefWeb", "r1", "Evaluation Officer", "OXFAM", body(20) + " How to apply online.", "https://reliefweb.int/job/r1")]
+fresh = logic._sync_posting_store([dict(j) for j in second_crawl], incremental=True)
+full = logic._sync_posting_store([dict(j, changed=False) for j in second_crawl], incremental=False)
+stored = {p['source']: p for p in database.get_postings_seen_since("1970-01-01")}
+alternates = database.get_alternates([stored["Greenhouse"]['id']])
+if len(first) == 2 and fresh == [] and sorted(j['source'] for j in full) == ["Greenhouse", "Lever"] \
+        and stored["ReliefWeb"]['canonical_id'] == stored["Greenhouse"]['id'] \
+        and [a['source'] for a in alternates.get(stored["Greenhouse"]['id'], [])] == ["ReliefWeb"]:
+    print("✅ Aggregator copy stored, linked to the org's posting and kept out of scoring")
+else:
+    print(f"❌ first {len(first)}, fresh {len(fresh)}, full {[j['source'] for j in full]}, alternates {alternates}")
+
+with database.connection() as conn:
+    conn.execute("UPDATE postings SET dedup_key = NULL, simhash = NULL, canonical_url = NULL, canonical_id = NULL")
+logic._sync_posting_store([dict(second_crawl[2], content_hash="changed")], incremental=True)
+stored = {p['source']: p for p in database.get_postings_seen_since("1970-01-01")}
+if stored["Greenhouse"]['dedup_key'] and stored["ReliefWeb"]['canonical_id'] == stored["Greenhouse"]['id']:
+    print("✅ Postings stored before dedup fingerprinted and matched")
+else:
+    print(f"❌ {stored}")
+
+print("\n⏱️ Testing near-linear scaling...")
+def timed(n):
+    batch = [dict(job("Src", str(i), f"Role {i}", f"Org {i % 50}", body(1000 + i, 120), f"https://x.org/{i}"),
+                  posting_id=i + 1) for i in range(n)]
+    for p in batch:
+        dedup.fingerprint(p)
+    start = time.perf_counter()
+    dedup.find_duplicates(batch)
+    return time.perf_counter() - start
+timed(500)  # Warm up
+small, large = timed(2000), timed(8000)
+if large < small * 4 * 2.5:
+    print(f"✅ 4x postings took {large / small:.1f}x the time ({small * 1000:.0f} ms -> {large * 1000:.0f} ms)")
+else:
+    print(f"❌ 4x postings took {large / small:.1f}x the time")
@@ -0,0 +1,148 @@
+import http_client
+import os
+import json
+import tempfile
+import threading
+import time
+import requests
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+http_client.RESPONSE_CACHE_DIR = os.path.join(tempfile.mkdtemp(), "http_cache")
+hits = {"200": 0, "304": 0}
+FEED_ITEMS = 20000
+feed_sent = {"items": 0}
+
+class BoardHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        if self.path == "/slow":
+            time.sleep(1)
+        if self.path == "/feed":
+            return self.send_feed()
+        if self.path == "/board" and self.headers.get("If-None-Match") == '"v1"':
+            hits["304"] += 1
+            self.send_response(304)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        hits["200"] += 1
+        body = b'{"jobs": [{"title": "Policy Analyst"}]}'
+        self.send_response(200)
+        self.send_header("ETag", '"v1"')
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_feed(self):
+        """A large {"legal": ..., "jobs": [...]} feed, written in chunks as a board API would."""
+        if self.headers.get("If-None-Match") == '"f1"':
+            self.send_response(304)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", '"f1"')
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        feed_sent["items"] = 0
+        def chunk(text):
+            data = text.encode("utf-8")
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        try:
+            chunk('{"legal": {"note": "[not the jobs]"}, "jobs": [')
+            for i in range(FEED_ITEMS):
+                chunk(("," if i else "") + json.dumps({"id": i, "title": f"Analyste {i} – é", "content": "x" * 200}))
+                feed_sent["items"] += 1
+            chunk("]}")
+            self.wfile.write(b"0\r\n\r\n")
+        except OSError:
+            pass
+
+    def log_message(self, *args):
+        pass
+
+server = ThreadingHTTPServer(("127.0.0.1", 0), BoardHandler)
+server.handle_error = lambda request, client_address: None  # Timed-out clients hang up mid-response
+threading.Thread(target=server.serve_forever, daemon=True).start()
+base = f"http://127.0.0.1:{server.server_port}"
+
+print("🌐 Testing conditional GET...")
+first = http_client.get(f"{base}/board", conditional=True)
+second = http_client.get(f"{base}/board", conditional=True)
+if first.status_code == second.status_code == 200 and second.json() == first.json() and second.from_cache:
+    print(f"✅ Unchanged board served from cache ({hits})")
+else:
+    print(f"❌ Conditional GET failed: {second.status_code} {hits}")
+
+print("\n🌊 Testing streamed JSON...")
+chunks = ['[{"a": [1, 2', ']}, 12', '3, "x\\u00e9"', ', null]']
+feed = '{"meta": {"jobs": 1}, "jobs": [{"id": 1}, {"id": 2}], "count": 2}'
+if list(http_client.iter_json_items(chunks)) == [{"a": [1, 2]}, 123, "x\u00e9", None] \
+        and list(http_client.iter_json_items((feed[i:i + 3] for i in range(0, len(feed), 3)), key="jobs")) == [{"id": 1}, {"id": 2}] \
+        and list(http_client.iter_json_items(["{}"], key="jobs")) == []:
+    print("✅ Items decoded across chunk boundaries, nested arrays skipped")
+else:
+    print("❌ Items decoded wrongly")
+
+numbers = '[1.5, -2e3, 0, 10.25E-1, 7]'
+splits = [[numbers[:i], numbers[i:]] for i in range(1, len(numbers))]
+if all(list(http_client.iter_json_items(parts)) == [1.5, -2000.0, 0, 1.025, 7] for parts in splits) \
+        and list(http_client.iter_json_items(['[1.', '5, 2]'])) == [1.5, 2] and list(http_client.iter_json_items(['[1e', '3]'])) == [1000.0]:
+    print("✅ Numbers split across chunks decoded whole")
+else:
+    print("❌ Split numbers decoded wrongly")
+
+response = http_client.get(f"{base}/feed", conditional=True, stream=True)
+items = http_client.iter_json(response, key="jobs", chunk_size=4096)
+first_items = [next(items) for _ in range(10)]
+items.close()
+if [j["id"] for j in first_items] == list(range(10)) and feed_sent["items"] < FEED_ITEMS \
+        and not any(f.endswith(".tmp") for f in os.listdir(http_client.RESPONSE_CACHE_DIR)) \
+        and http_client._read_meta(http_client._cache_paths(f"{base}/feed")[0]) is None:
+    print(f"✅ Stopped after 10 items; {feed_sent['items']} of {FEED_ITEMS} sent, nothing cached")
+else:
+    print(f"❌ Early stop: {feed_sent['items']} sent, cache {os.listdir(http_client.RESPONSE_CACHE_DIR)}")
+
+full = list(http_client.iter_json(http_client.get(f"{base}/feed", conditional=True, stream=True), key="jobs"))
+again = http_client.get(f"{base}/feed", conditional=True, stream=True)
+from_disk = list(http_client.iter_json(again, key="jobs"))
+if len(full) == FEED_ITEMS and again.from_cache and from_disk == full and full[-1]["title"].endswith("– é"):
+    print(f"✅ Full read cached; 304 streamed {len(from_disk)} items from disk")
+else:
+    print(f"❌ Full read {len(full)}, from cache {again.from_cache}, {len(from_disk)} items")
+
+print("\n🚦 Testing per-host limit on streamed bodies...")
+host = f"127.0.0.1:{server.server_port}"
+http_client.HOST_CONCURRENCY[host] = 1
+http_client._host_semaphores.clear()
+streaming = http_client.get(f"{base}/feed", stream=True)
+queued = threading.Thread(target=lambda: http_client.get(f"{base}/board"))
+queued.start()
+queued.join(0.3)
+waited = queued.is_alive()
+streaming.close()
+queued.join(5)
+if waited and not queued.is_alive():
+    print("✅ Second request waited until the streamed response was closed")
+else:
+    print(f"❌ Slot not held while streaming (waited={waited}, finished={not queued.is_alive()})")
+del http_client.HOST_CONCURRENCY[host]
+http_client._host_semaphores.clear()
+
+print("\n🔁 Testing shared session...")
+if http_client.get_session() is http_client.get_session():
+    print("✅ One pooled session per process")
+else:
+    print("❌ Session recreated")
+
+print("\n⏱️ Testing timeouts...")
+try:
+    http_client.get(f"{base}/slow", timeout=0.2)
+    print("❌ Slow response did not time out")
+except requests.exceptions.Timeout:
+    print("✅ Slow response timed out")
+
+server.shutdown()
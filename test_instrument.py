@@ -0,0 +1,95 @@
+import os
+import json
+import time
+import tempfile
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import database
+import http_client
+import instrument
+import logic
+import vector_index
+
+instrument.METRICS_LOG = os.path.join(tempfile.mkdtemp(), "fetch_metrics.jsonl")
+database.DB_NAME = os.path.join(tempfile.mkdtemp(), "jobs.db")
+vector_index.INDEX_DIR = os.path.join(tempfile.mkdtemp(), "vector_index")
+database.init_db()
+
+def fake_request(method, url, **kwargs):
+    time.sleep(0.01)
+    if "broken" in url:
+        raise ConnectionError("refused")
+    status = 404 if "missing" in url else 200
+    return SimpleNamespace(status_code=status, headers={"Content-Length": "2048"}, content=b"{}", url=url)
+
+session = MagicMock()
+session.request.side_effect = fake_request
+
+def fetch_boards(profile, targets=None):
+    def fetch_org(org):
+        response = http_client.get(f"https://boards.example.com/{org}")
+        time.sleep(0.02)  # "parsing"
+        return [] if response.status_code != 200 else [
+            {"title": f"{org} job {i}", "org": org, "clean_body": "Evaluation", "url": f"https://x/{org}/{i}",
+             "source": "SmartRecruiters", "external_id": f"{org}-{i}", "content_hash": logic._content_hash(org, i)}
+            for i in range(3)]
+    return logic._fetch_orgs(fetch_org, ["alpha", "missing", "beta"], "SmartRecruiters")
+
+def fetch_feed(profile):
+    try:
+        http_client.post("https://feed.example.com/broken")
+    except ConnectionError:
+        pass
+    return []
+
+print("⏱️ Testing crawl instrumentation...")
+lines = []
+with patch('http_client.get_session', return_value=session), \
+     patch('logic.fetch_reliefweb', fetch_feed), patch('logic.fetch_smartrecruiters', fetch_boards), \
+     patch('logic.fetch_greenhouse', return_value=[]), patch('logic.fetch_lever', return_value=[]), \
+     patch('logic.fetch_remoteok', return_value=[]):
+    jobs = logic.fetch_all_jobs({"search_keywords": ["Evaluation"]}, status_callback=lines.append)
+
+summary = instrument.summarize(instrument.run_events())
+boards = summary.get("SmartRecruiters", {})
+orgs = boards.get("orgs", {})
+if len(jobs) == 6 and boards['postings'] == 6 and boards['requests'] == 3 and boards['bytes'] == 3 * 2048 \
+        and boards['statuses'] == {"200": 2, "404": 1} and boards['errors'] == 1:
+    print("✅ HTTP calls, bytes, statuses and postings attributed to the source")
+else:
+    print(f"❌ Unexpected source stats: {boards}")
+if set(orgs) == {"alpha", "missing", "beta"} and orgs['alpha']['postings'] == 3 and orgs['missing']['postings'] == 0 \
+        and orgs['alpha']['parse_ms'] >= 15 and orgs['alpha']['p50_ms'] >= 8:
+    print("✅ Per-org latency, postings and parse time")
+else:
+    print(f"❌ Unexpected org stats: {orgs}")
+feed = summary.get("ReliefWeb", {})
+if feed.get('statuses') == {"error": 1} and feed['errors'] == 1 and sum(feed['histogram'].values()) == 1:
+    print("✅ Failed requests recorded")
+else:
+    print(f"❌ Unexpected feed stats: {feed}")
+
+report = [line for line in lines if line.startswith("📊")]
+if len(report) == 5 and "slowest org" in report[0] and report[0].startswith("📊 SmartRecruiters"):
+    print("✅ Run summary reported, slowest source first")
+else:
+    print(f"❌ Unexpected report: {report}")
+
+print("\n📝 Testing JSON lines log...")
+with open(instrument.METRICS_LOG) as f:
+    events = [json.loads(line) for line in f]
+kinds = {e['event'] for e in events}
+runs = instrument.load_runs()
+if kinds == {"run_start", "http", "fetch", "run_end"} and len({e['run'] for e in events}) == 1 \
+        and len(runs) == 1 and instrument.summarize(runs[0][2]) == summary:
+    print("✅ Events logged and the run rebuilt from the log")
+else:
+    print(f"❌ Logged {kinds}, {len(runs)} runs")
+
+with patch('sources.plan', return_value=[]):
+    jobs = logic.fetch_all_jobs({"search_keywords": ["Evaluation"]}, scheduled=True)
+if jobs == [] and len(instrument.load_runs()) == 1:
+    print("✅ Nothing due: no empty run logged")
+else:
+    print(f"❌ {len(instrument.load_runs())} runs after a crawl with nothing due")
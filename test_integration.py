@@ -1,24 +1,42 @@
+import cache
+import database
+import llm
 import logic
 import os
+import vector_index
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
 from unittest.mock import MagicMock, patch
+import openai
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+cache.CACHE_DB_NAME = os.path.join(tempfile.mkdtemp(), "cache.db")
+database.DB_NAME = os.path.join(tempfile.mkdtemp(), "jobs.db")
+vector_index.INDEX_DIR = os.path.join(tempfile.mkdtemp(), "vector_index")
+database.init_db()
 
 # Mock OpenAI
 with patch('openai.OpenAI') as MockClient:
+    llm.reset_client()
     mock_instance = MockClient.return_value
     mock_instance.chat.completions.create.return_value.choices[0].message.content = '{"score": 85, "job_summary": "Good match", "strengths": ["Python"], "gaps": ["None"]}'
 
     # Mock requests
-    with patch('requests.post') as mock_post, patch('requests.get') as mock_get:
+    with patch('http_client.post') as mock_post, patch('http_client.get') as mock_get:
         # Mock ReliefWeb response
         mock_post.return_value.status_code = 200
         mock_post.return_value.json.return_value = {
             "data": [{
+                "id": 1,
                 "fields": {
                     "title": "Test Job",
                     "source": [{"name": "Test Org"}],
                     "body": "<p>Test Description</p>",
                     "url": "http://example.com",
-                    "date": {"created": "2025-11-20T12:00:00+00:00"}
+                    "date": {"created": datetime.now().isoformat()}
                 }
             }]
         }
@@ -32,9 +50,153 @@ with patch('openai.OpenAI') as MockClient:
         jobs = logic.fetch_all_jobs(profile)
         print(f"Fetched {len(jobs)} jobs.")
         
+        print("Testing incremental crawl...")
+        again = logic.fetch_all_jobs(profile)
+        fresh = logic.fetch_all_jobs(profile, incremental=True)
+        if len(again) == len(jobs) and again[0]['clean_body'] == jobs[0]['clean_body'] and not fresh:
+            print("✅ Unchanged postings served from the store and skipped incrementally")
+        else:
+            print(f"❌ Incremental crawl returned {len(fresh)} jobs, full crawl {len(again)}")
+
         if jobs:
             print("Testing match_job_to_cv...")
             match = logic.match_job_to_cv(jobs[0]['clean_body'], profile)
             print(f"Match score: {match.get('score')}")
 
+# Slow boards should run in parallel and be cut off by the deadline
+def slow_get(url, **kwargs):
+    time.sleep(0.5)
+    response = MagicMock()
+    response.status_code = 200
+    response.json.return_value = []
+    return response
+
+with patch('http_client.post', side_effect=slow_get), patch('http_client.get', side_effect=slow_get):
+    print("Testing fetch_all_jobs concurrency...")
+    messages = []
+    start = time.time()
+    logic.fetch_all_jobs({"search_keywords": ["Test"]}, status_callback=messages.append)
+    elapsed = time.time() - start
+    # 10 SmartRecruiters orgs at 0.5s each would take 5s serially
+    if elapsed < 3:
+        print(f"✅ Scan finished in {elapsed:.2f}s")
+    else:
+        print(f"❌ Scan took {elapsed:.2f}s")
+
+    print("Testing fetch_all_jobs deadline...")
+    messages = []
+    running = set(threading.enumerate())
+    start = time.time()
+    logic.fetch_all_jobs({"search_keywords": ["Test"]}, status_callback=messages.append, deadline=0.2)
+    elapsed = time.time() - start
+    if elapsed < 0.5 and any("timed out" in m for m in messages):
+        print(f"✅ Deadline respected ({elapsed:.2f}s)")
+    else:
+        print(f"❌ Deadline not respected ({elapsed:.2f}s): {messages}")
+    # The sources cut off by the deadline keep running in the background; keep
+    # the stubs in place until their threads finish so they never reach the network
+    for straggler in set(threading.enumerate()) - running:
+        straggler.join(30)
+
+# ReliefWeb pages through the dated listing concurrently and downloads only new or changed bodies
+listed = [{"id": i, "fields": {"title": f"Officer {i}", "date": {"changed": "2026-01-01T00:00:00+00:00"}}} for i in range(450)]
+payloads = []
+def reliefweb_post(url, json=None, **kwargs):
+    payloads.append(json)
+    response = MagicMock()
+    response.status_code = 200
+    if json["filter"]["field"] == "id":
+        response.json.return_value = {"data": [{"id": i, "fields": {"title": f"Officer {i}", "body": "Body",
+                                                 "source": [{"name": "Org"}], "url": f"http://rw/{i}"}} for i in json["filter"]["value"]]}
+    else:
+        response.json.return_value = {"totalCount": len(listed), "data": listed[json["offset"]:json["offset"] + json["limit"]]}
+    return response
+
+print("Testing ReliefWeb paging...")
+stored = {str(i): logic._content_hash(f"Officer {i}", "2026-01-01T00:00:00+00:00") for i in range(400)}
+with patch('http_client.post', side_effect=reliefweb_post), patch('logic._known_postings', return_value=stored):
+    rw_jobs = logic.fetch_reliefweb({"search_keywords": ["Evaluation"]})
+listings = [p for p in payloads if p["filter"]["field"] == "date.created"]
+details = [i for p in payloads if p["filter"]["field"] == "id" for i in p["filter"]["value"]]
+if len(rw_jobs) == 450 and sum(j['changed'] for j in rw_jobs) == 50 and sorted(p["offset"] for p in listings) == [0, 200, 400] \
+        and sorted(details) == list(range(400, 450)) and all(p["profile"] == "minimal" and "body" not in p["fields"]["include"] for p in listings):
+    print("✅ All 3 listing pages fetched without bodies; only the 50 unstored postings downloaded")
+else:
+    print(f"❌ {len(rw_jobs)} jobs, listing offsets {[p['offset'] for p in listings]}, {len(details)} bodies")
+
+# A long merged keyword list is split over several listing queries instead of being cut to the first few
+payloads.clear()
+keywords = [f"Keyword{i}" for i in range(7)]
+with patch('http_client.post', side_effect=reliefweb_post), patch('logic._known_postings', return_value=stored):
+    rw_jobs = logic.fetch_reliefweb({"search_keywords": keywords})
+queries = {p["query"]["value"] for p in payloads if p["filter"]["field"] == "date.created"}
+if len(queries) == 2 and all(any(f'"{k}"' in q for q in queries) for k in keywords) and len(rw_jobs) == 450:
+    print("✅ All 7 keywords queried in 2 listing queries, shared postings kept once")
+else:
+    print(f"❌ Queries {queries}, {len(rw_jobs)} jobs")
+
+# SmartRecruiters pages the listing and only fetches details for new releases, concurrently
+released = {i: (datetime.now() - timedelta(days=1)).isoformat() for i in range(250)}
+sr_calls = {"pages": [], "details": 0, "in_flight": 0, "max_in_flight": 0}
+sr_lock = threading.Lock()
+def smartrecruiters_request(method, url, **kwargs):
+    response = MagicMock()
+    response.status_code = 200
+    response.headers = {}
+    if "/companies/acme/" not in url:
+        response.status_code = 404  # Stragglers from the scans above
+    elif "/postings/" in url:
+        with sr_lock:
+            sr_calls["details"] += 1
+            sr_calls["in_flight"] += 1
+            sr_calls["max_in_flight"] = max(sr_calls["max_in_flight"], sr_calls["in_flight"])
+        time.sleep(0.01)
+        with sr_lock:
+            sr_calls["in_flight"] -= 1
+        response.json.return_value = {"jobAd": {"sections": {"jobDescription": {"text": "Evaluation work"}}}}
+    else:
+        offset = int(url.split("offset=")[1])
+        sr_calls["pages"].append(offset)
+        response.json.return_value = {"totalFound": len(released), "content": [
+            {"id": str(i), "name": f"Evaluation Officer {i}", "releasedDate": released[i]}
+            for i in range(offset, min(offset + 100, len(released)))]}
+    return response
+
+print("Testing SmartRecruiters paging and detail cache...")
+session = MagicMock()
+session.request.side_effect = smartrecruiters_request
+with patch('http_client.get_session', return_value=session), \
+     patch('logic._known_postings', return_value={}), patch('sources.record_crawl'):
+    first_run = logic.fetch_smartrecruiters({"search_keywords": ["Evaluation"]}, ["acme"])
+    first_details = sr_calls["details"]
+    released[7] = datetime.now().isoformat()
+    second_run = logic.fetch_smartrecruiters({"search_keywords": ["Evaluation"]}, ["acme"])
+if len(first_run) == len(second_run) == 250 and sorted(sr_calls["pages"]) == [0, 0, 100, 100, 200, 200] \
+        and first_details == 250 and sr_calls["details"] == 251 and 1 < sr_calls["max_in_flight"] <= 6:
+    print(f"✅ 3 listing pages, details cached by releasedDate, up to {sr_calls['max_in_flight']} detail calls in flight")
+else:
+    print(f"❌ pages {sorted(sr_calls['pages'])}, details {first_details} then {sr_calls['details']}, "
+          f"max in flight {sr_calls['max_in_flight']}, jobs {len(first_run)}/{len(second_run)}")
+
+# Scoring pipeline should retry rate-limited calls and yield every job
+class FakeRateLimitError(openai.RateLimitError):
+    def __init__(self):
+        Exception.__init__(self, "429")
+        self.response = SimpleNamespace(headers={"retry-after": "0.05"})
+
+with patch('openai.OpenAI') as MockClient:
+    llm.reset_client()
+    create = MockClient.return_value.chat.completions.create
+    ok = MagicMock()
+    ok.choices[0].message.content = '{"score": 70, "job_summary": "Ok", "strengths": [], "gaps": []}'
+    create.side_effect = [FakeRateLimitError(), ok, ok, ok]
+
+    print("Testing score_jobs...")
+    jobs = [{"title": f"Job {i}", "clean_body": f"Body {i}"} for i in range(3)]
+    scored = list(logic.score_jobs(jobs, {"search_keywords": ["Test"]}, max_in_flight=2))
+    if len(scored) == 3 and all(a['score'] == 70 for _, a in scored) and MockClient.call_args.kwargs['max_retries'] == 0:
+        print("✅ All jobs scored after 429 backoff, with the limiter doing the retrying")
+    else:
+        print(f"❌ Unexpected scoring results: {scored}")
+
 print("Test complete.")
@@ -0,0 +1,80 @@
+import os
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import llm
+
+os.environ["OPENAI_API_KEY"] = "test-key"
+
+def completion(content, prompt_tokens=120, completion_tokens=30):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+                           usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens))
+
+print("🔌 Testing shared client...")
+llm.reset_metrics()
+with patch('openai.OpenAI') as MockClient, patch.object(llm, 'get_api_key', wraps=llm.get_api_key) as get_key:
+    llm.reset_client()
+    create = MockClient.return_value.chat.completions.create
+    create.return_value = completion('{"score": 80}')
+    results = [llm.chat_json("gpt-4o-mini", f"job {i}", kind="match") for i in range(5)]
+    if MockClient.call_count == 1 and get_key.call_count == 1 and results == [{"score": 80}] * 5:
+        print("✅ One client and one key lookup for five calls")
+    else:
+        print(f"❌ {MockClient.call_count} clients, {get_key.call_count} key lookups")
+    kwargs = MockClient.call_args.kwargs
+    if kwargs['timeout'] == llm.LLM_TIMEOUT and kwargs['max_retries'] == llm.LLM_MAX_RETRIES \
+            and create.call_args.kwargs['timeout'] == llm.LLM_TIMEOUT:
+        print("✅ Client built with timeouts and retries")
+    else:
+        print(f"❌ Client built with {kwargs}")
+
+    llm.chat_json("gpt-4o-mini", "limited", kind="match", max_retries=0)
+    if MockClient.call_count == 2 and MockClient.call_args.kwargs['max_retries'] == 0:
+        print("✅ Calls under the scoring limiter get a client without SDK retries")
+    else:
+        print(f"❌ Clients built with {[c.kwargs for c in MockClient.call_args_list]}")
+
+    llm.reset_client()
+    llm.chat_json("gpt-4o-mini", "again", kind="match", timeout=5)
+    if MockClient.call_count == 3 and create.call_args.kwargs['timeout'] == 5:
+        print("✅ reset_client rebuilds; per-call timeout honoured")
+    else:
+        print(f"❌ {MockClient.call_count} clients after reset")
+
+print("\n📊 Testing metrics...")
+with patch('openai.OpenAI') as MockClient:
+    llm.reset_client()
+    create = MockClient.return_value.chat.completions.create
+    create.side_effect = [RuntimeError("timeout"), completion('{"score": 1}', prompt_tokens=None)]
+    try:
+        llm.chat_json("gpt-4o-mini", "x", kind="screen", local_tokens=40)
+    except RuntimeError:
+        pass
+    llm.chat_json("gpt-4o-mini", "y", kind="screen", local_tokens=40)
+m = llm.metrics()
+if m['match']['calls'] == 7 and m['match']['input_tokens'] == 840 and m['match']['output_tokens'] == 210 \
+        and m['match']['tokens_per_call'] == 120 and m['match']['p95_s'] >= m['match']['p50_s'] >= 0:
+    print("✅ Calls, tokens and latency percentiles per kind")
+else:
+    print(f"❌ Unexpected match metrics: {m.get('match')}")
+if m['screen']['calls'] == 2 and m['screen']['errors'] == 1 and m['screen']['input_tokens'] == 80:
+    print("✅ Failed calls counted; local token count used without usage")
+else:
+    print(f"❌ Unexpected screen metrics: {m.get('screen')}")
+
+print("\n⚡ Testing async client...")
+with patch('openai.AsyncOpenAI') as MockAsync:
+    llm.reset_client()
+    MockAsync.return_value.chat.completions.create = AsyncMock(return_value=completion('{"score": 64}'))
+
+    async def score_all():
+        return await asyncio.gather(*(llm.chat_json_async("gpt-4o-mini", f"job {i}", kind="async") for i in range(3)))
+
+    results = asyncio.run(score_all())
+kwargs = MockAsync.call_args.kwargs
+if results == [{"score": 64}] * 3 and MockAsync.call_count == 1 and llm.metrics()['async']['calls'] == 3 \
+        and kwargs['timeout'] == llm.LLM_TIMEOUT and kwargs['max_retries'] == llm.LLM_MAX_RETRIES:
+    print("✅ Concurrent async calls share one client")
+else:
+    print(f"❌ Async results {results}, {MockAsync.call_count} clients")
@@ -0,0 +1,48 @@
+import html
+
+import normalize
+
+POSTING = """<div><h2>About the role</h2><p>We are   looking for an <b>Evaluation</b>\tOfficer.&nbsp;You will lead M&amp;E.</p>
+<h3>Benefits</h3><ul><li>Health insurance</li><li>Pension</li></ul>
+<h3>Requirements:</h3><ul><li>5 years of experience, budgets &lt; $1M</li></ul>
+<script>var tracking = 1;</script><style>p { margin: 0 }</style><!-- footer -->
+<p>XYZ is an Equal Opportunity Employer and considers all applicants without regard to race or religion.</p></div>"""
+
+EXPECTED = """About the role
+We are looking for an Evaluation Officer. You will lead M&E.
+Requirements:
+5 years of experience, budgets < $1M"""
+
+print("🧹 Testing body normalizer...")
+body = normalize.normalize_body(POSTING)
+if body == EXPECTED:
+    print("✅ Tags, scripts, benefits and EEO boilerplate removed")
+else:
+    print(f"❌ Unexpected body:\n{body}")
+
+if normalize.normalize_body(html.escape(POSTING)) == EXPECTED:
+    print("✅ Entity-escaped HTML (Greenhouse) handled")
+else:
+    print("❌ Escaped HTML not unescaped")
+
+plain = "Salary < 50k  and\n\n\n  remote\xa0friendly"
+if normalize.normalize_body(plain) == "Salary < 50k and\nremote friendly":
+    print("✅ Plain text only has its whitespace collapsed")
+else:
+    print(f"❌ Plain text changed: {normalize.normalize_body(plain)!r}")
+
+long_body = "<p>" + "evaluation policy " * 2000 + "</p>"
+if len(normalize.normalize_body(long_body)) == normalize.BODY_MAX_CHARS and normalize.normalize_body("") == "":
+    print("✅ Body cut to the matching budget")
+else:
+    print("❌ Body not truncated")
+
+budget = normalize.BODY_MAX_CHARS * normalize.MAX_HTML_RATIO
+tracking = "<script>var s = '" + "x" * budget + "';</script>"
+quoted = '<p title="a > b" data-x=\'<i>\'>Monitoring officer</p>'
+cut_tag = "<p>Officer</p>" + " " * (budget - 20) + '<a href="https://example.org/apply">Apply</a>'
+if normalize.normalize_body(tracking + "<p>Evaluation Officer</p>") == "Evaluation Officer" \
+        and normalize.normalize_body(quoted) == "Monitoring officer" and normalize.normalize_body(cut_tag) == "Officer":
+    print("✅ Long scripts dropped before the cut; quoted '>' and cut tags not leaked")
+else:
+    print(f"❌ Markup leaked: {normalize.normalize_body(tracking)[:80]!r} / {normalize.normalize_body(quoted)!r} / {normalize.normalize_body(cut_tag)!r}")
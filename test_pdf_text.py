@@ -0,0 +1,54 @@
+import os
+import subprocess
+import sys
+import tempfile
+from unittest.mock import patch
+
+import bench_pdf
+import cache
+import llm
+import logic
+import pdf_text
+
+cache.CACHE_DB_NAME = os.path.join(tempfile.mkdtemp(), "cache.db")
+
+print("📄 Testing streaming extraction...")
+long_cv = bench_pdf.synthetic_pdf(12, lines_per_page=40)
+full = bench_pdf.full_single_pass(long_cv)
+with patch('pdf_text._page_text', wraps=pdf_text._page_text) as mock_page:
+    text = pdf_text.extract_text(long_cv, max_chars=5000)
+if text == full[:5000] and mock_page.call_count < 12:
+    print(f"✅ Stopped after {mock_page.call_count} of 12 pages with the first 5000 chars")
+else:
+    print(f"❌ Extracted {len(text)} chars over {mock_page.call_count} pages")
+
+if pdf_text.extract_text(bench_pdf.synthetic_pdf(3, lines_per_page=10), max_chars=None) == bench_pdf.full_single_pass(bench_pdf.synthetic_pdf(3, lines_per_page=10)):
+    print("✅ Full extraction matches a single pdfplumber pass")
+else:
+    print("❌ Full extraction differs")
+
+print("\n🧵 Testing pooled extraction...")
+# Run in a fresh interpreter: spawned pool workers would otherwise re-import this script
+code = ("import pdf_text, bench_pdf; pdf_text.PDF_WORKERS = 2; pdf_text.PARALLEL_MIN_PAGES = 4; "
+        "b = bench_pdf.synthetic_pdf(7, lines_per_page=8); "
+        "print(pdf_text.extract_text(b, None) == bench_pdf.full_single_pass(b))")
+result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, timeout=120)
+if result.stdout.strip().endswith("True"):
+    print("✅ Pool returns pages in order")
+else:
+    print(f"❌ Pooled extraction failed: {result.stdout} {result.stderr[-500:]}")
+
+print("\n🖼️ Testing unreadable PDFs...")
+scanned = bench_pdf.synthetic_pdf(2, text_pages=set())
+if pdf_text.extract_text(scanned) == "" and pdf_text.extract_text(b"not a pdf") == "":
+    print("✅ Scanned and corrupt PDFs give empty text")
+else:
+    print("❌ Unreadable PDFs not handled")
+
+with patch('openai.OpenAI') as MockClient:
+    llm.reset_client()
+    cv_text, profile = logic.profile_cv(scanned)
+if cv_text == "" and profile == logic._default_profile() and not MockClient.called:
+    print("✅ Scanned CV skips the LLM and gets the default profile")
+else:
+    print(f"❌ Scanned CV profiled: {profile}")
@@ -0,0 +1,96 @@
+import os
+import json
+import types
+
+import llm
+import logic
+import normalize
+import prompt
+
+PROFILE = {
+    "1_essential_qualifications": {"education": "PhD  Economics", "years_experience": 8,
+                                   "languages": ["English", "French", "english"], "sector": ""},
+    "2_core_tech_stack": ["Impact Evaluation", "Cost-Benefit Analysis", "impact evaluation"],
+    "3_desired_stack": [],
+    "4_logistics": {"current_location": "Paris, France", "mobility": None},
+    "search_keywords": ["Evaluation", "Policy"]
+}
+
+POSTING = """<h2>Evaluation Officer</h2><p>Join our small team in Geneva.</p>
+<h3>About us</h3><p>We were founded in 1990 and have offices in twelve countries around the world.</p>
+<h3>Responsibilities</h3><ul><li>Design impact evaluations</li><li>Manage survey firms</li></ul>
+<h3>How to apply</h3><p>Send a cover letter through the portal before the deadline.</p>
+<h3>Qualifications</h3><ul><li>PhD in economics</li><li>Fluent French</li></ul>"""
+
+print("🗜️ Testing profile compaction...")
+compact = prompt.compact_profile(PROFILE)
+data = json.loads(compact)
+if data == {"core_tech_stack": ["Impact Evaluation", "Cost-Benefit Analysis"],
+            "essential_qualifications": {"education": "PhD Economics", "languages": ["English", "French"],
+                                         "years_experience": 8},
+            "logistics": {"current_location": "Paris, France"},
+            "search_keywords": ["Evaluation", "Policy"]} and '", "' not in compact:
+    print("✅ Empty fields, duplicates and key numbering dropped")
+else:
+    print(f"❌ Unexpected compact profile: {compact}")
+
+reordered = dict(reversed(list(PROFILE.items())))
+if prompt.compact_profile(reordered) == compact:
+    print("✅ Compact form is canonical")
+else:
+    print("❌ Key order changes the compact form")
+
+print("\n✂️ Testing job excerpt...")
+body = normalize.normalize_body(POSTING)
+excerpt = prompt.job_excerpt(body)
+if excerpt.split("\n") == ["Evaluation Officer", "Join our small team in Geneva.",
+                           "Responsibilities", "Design impact evaluations", "Manage survey firms",
+                           "Qualifications", "PhD in economics", "Fluent French"]:
+    print("✅ Lead and requirement sections kept, the rest dropped")
+else:
+    print(f"❌ Unexpected excerpt:\n{excerpt}")
+
+long_body = "Responsibilities\n" + "\n".join(f"Task number {i} for the evaluation unit." for i in range(500))
+excerpt = prompt.job_excerpt(long_body, 100)
+if prompt.count_tokens(excerpt) <= 100 and excerpt.startswith("Responsibilities\nTask number 0"):
+    print(f"✅ Excerpt held to the token budget ({prompt.count_tokens(excerpt)} tokens)")
+else:
+    print(f"❌ Excerpt over budget: {prompt.count_tokens(excerpt)} tokens")
+
+plain = " ".join(["word"] * 2000)
+excerpt = prompt.job_excerpt(plain, 50)
+if 0 < prompt.count_tokens(excerpt) <= 50 and plain.startswith(excerpt):
+    print("✅ Postings without headings cut from the top")
+else:
+    print("❌ Fallback excerpt wrong")
+
+print("\n🔢 Testing prompt size...")
+job_text = normalize.normalize_body(POSTING * 20)
+old_prompt = logic.MATCH_PROMPT.format(profile=json.dumps(PROFILE), job_text=job_text[:normalize.BODY_MAX_CHARS])
+new_prompt, n_tokens = logic.build_match_prompt(job_text, PROFILE)
+if n_tokens == prompt.count_tokens(new_prompt) and n_tokens < prompt.count_tokens(old_prompt):
+    print(f"✅ Prompt shrank from {prompt.count_tokens(old_prompt)} to {n_tokens} tokens")
+else:
+    print("❌ Prompt did not shrink")
+
+print("\n📊 Testing usage reporting...")
+class FakeCompletions:
+    def create(self, **kwargs):
+        message = types.SimpleNamespace(content=json.dumps({"score": 70}))
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)],
+                                     usage=types.SimpleNamespace(prompt_tokens=321))
+
+class FakeClient:
+    def __init__(self, **kwargs):
+        self.chat = types.SimpleNamespace(completions=FakeCompletions())
+
+logic.openai.OpenAI = FakeClient
+llm.reset_client()
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+llm.reset_metrics()
+analysis = logic._request_match(job_text, PROFILE)
+match = llm.metrics().get("match", {})
+if analysis == {"score": 70} and match.get('calls') == 1 and match.get('input_tokens') == 321:
+    print("✅ Input tokens recorded per call")
+else:
+    print(f"❌ Usage not recorded: {match}")
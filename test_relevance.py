@@ -0,0 +1,43 @@
+import relevance
+
+profile = {
+    "2_core_tech_stack": ["Impact Evaluation", "Cost-Benefit Analysis", "Public Policy"],
+    "search_keywords": ["Evaluation", "Policy Analyst"]
+}
+jobs = [
+    {"title": "Frontend Engineer", "clean_body": "React, TypeScript and CSS for our web app."},
+    {"title": "Evaluation Specialist", "clean_body": "Lead impact evaluation and cost-benefit analysis of public programmes."},
+    {"title": "Policy Analyst", "clean_body": "Support public policy research and evaluation of regulation."},
+    {"title": "Chef", "clean_body": "Prepare meals in our kitchen."},
+]
+
+print("📐 Testing rank_jobs...")
+ranked = relevance.rank_jobs(jobs, profile, top_k=2)
+titles = [j['title'] for j in ranked]
+if titles == ["Evaluation Specialist", "Policy Analyst"] and ranked[0]['relevance'] >= ranked[1]['relevance']:
+    print(f"✅ Relevant postings ranked first: {titles}")
+else:
+    print(f"❌ Unexpected ranking: {titles}")
+
+ranked = relevance.rank_jobs(jobs, profile, top_k=10)
+if "Chef" not in [j['title'] for j in ranked] and 'relevance' not in jobs[1]:
+    print("✅ Unrelated postings dropped, inputs left untouched")
+else:
+    print("❌ Unrelated posting kept or input mutated")
+
+print("\n🏷️ Testing title gate...")
+terms = relevance.title_terms(profile)
+if relevance.title_matches("Senior Evaluator", terms) and relevance.title_matches("Policies Lead", terms) \
+        and not relevance.title_matches("Chef de Partie", terms):
+    print("✅ Titles matched on profile term stems")
+else:
+    print("❌ Title gate mismatch")
+
+print("\n🔁 Testing stable embeddings...")
+a = relevance.term_frequencies(["impact evaluation"])
+relevance._feature_cache.clear()
+b = relevance.term_frequencies(["impact evaluation"])
+if (a == b).all() and a.any():
+    print("✅ Hashed vectors are deterministic")
+else:
+    print("❌ Vectors differ between runs")
@@ -0,0 +1,118 @@
+import os
+import json
+import tempfile
+import threading
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import cache
+import llm
+import logic
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+cache.CACHE_DB_NAME = os.path.join(tempfile.mkdtemp(), "cache.db")
+
+profile = {"search_keywords": ["Evaluation"], "2_core_tech_stack": ["Impact Evaluation"]}
+
+class FakeCompletions:
+    """Answers batch prompts by title (Evaluation jobs 90, others 20) and single-job prompts with a full analysis.
+
+    Batches larger than malformed_above get invalid JSON; partial drops the last
+    entry of every multi-job batch; jobs titled Broken break any batch they are in.
+    """
+
+    def __init__(self, malformed_above=None, partial=False):
+        self.malformed_above = malformed_above
+        self.partial = partial
+        self.batch_sizes = []
+        self.full_calls = 0
+        self.lock = threading.Lock()
+
+    def create(self, **kwargs):
+        text = kwargs['messages'][0]['content']
+        if "Quickly screen" not in text:
+            with self.lock:
+                self.full_calls += 1
+            content = {"score": 85, "job_summary": "Full", "strengths": ["Evaluation"], "gaps": []}
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=json.dumps(content)))])
+
+        jobs = json.loads(text.split("JOBS: ", 1)[1].split("\n", 1)[0])
+        with self.lock:
+            self.batch_sizes.append(len(jobs))
+        if (self.malformed_above and len(jobs) > self.malformed_above) or any(j['title'] == "Broken" for j in jobs):
+            content = '{"scores": [{"id": "0", "score": 9'
+        else:
+            entries = [{"id": j['id'], "score": 90 if "Evaluation" in j['title'] else 20} for j in jobs]
+            if self.partial and len(entries) > 1:
+                entries = entries[:-1]
+            content = json.dumps({"scores": entries})
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+def make_jobs(prefix, titles):
+    return [{"title": t, "org": "Org", "clean_body": f"{prefix} {i} {t}\nRequirements\nFive years of experience."}
+            for i, t in enumerate(titles)]
+
+def run(jobs, completions, **kwargs):
+    with patch('openai.OpenAI') as MockClient:
+        llm.reset_client()
+        MockClient.return_value.chat.completions = completions
+        return {job['clean_body']: a for job, a in logic.score_jobs(jobs, profile, max_in_flight=2, batch=True, **kwargs)}
+
+print("📦 Testing batch screening...")
+jobs = make_jobs("a", ["Evaluation Officer", "Chef", "Evaluation Lead", "Driver", "Cook", "Evaluation Analyst"])
+completions = FakeCompletions()
+with patch.object(logic, 'BATCH_SIZE', 3):
+    results = run(jobs, completions)
+full = [b for b, a in results.items() if a['strengths']]
+screened = [a['score'] for a in results.values() if not a['strengths']]
+if len(results) == 6 and completions.batch_sizes == [3, 3] and completions.full_calls == 3 \
+        and all("Evaluation" in b for b in full) and screened == [20, 20, 20]:
+    print("✅ Two batch calls; only the 3 strong jobs got a full analysis")
+else:
+    print(f"❌ batches {completions.batch_sizes}, full calls {completions.full_calls}, results {results}")
+
+print("\n🪓 Testing split on malformed responses...")
+jobs = make_jobs("b", ["Evaluation Officer", "Chef", "Driver", "Cook", "Evaluation Lead", "Baker", "Porter", "Clerk"])
+completions = FakeCompletions(malformed_above=2)
+results = run(jobs, completions)
+if len(results) == 8 and completions.full_calls == 2 and max(completions.batch_sizes[1:]) <= 4 \
+        and sorted(completions.batch_sizes)[:4] == [2, 2, 2, 2]:
+    print(f"✅ Malformed batch split until it parsed: {completions.batch_sizes}")
+else:
+    print(f"❌ batches {completions.batch_sizes}, full calls {completions.full_calls}")
+
+jobs = make_jobs("c", ["Chef", "Broken", "Driver", "Cook"])
+completions = FakeCompletions()
+results = run(jobs, completions)
+broken = [a for b, a in results.items() if "Broken" in b][0]
+if len(results) == 4 and broken['job_summary'] == "Full" and completions.full_calls == 1 \
+        and completions.batch_sizes.count(1) >= 1:
+    print("✅ Job that breaks every batch falls back to the full analysis")
+else:
+    print(f"❌ batches {completions.batch_sizes}, results {results}")
+
+print("\n🧩 Testing partial responses...")
+jobs = make_jobs("d", ["Chef", "Driver", "Cook", "Baker"])
+completions = FakeCompletions(partial=True)
+results = run(jobs, completions)
+if len(results) == 4 and completions.full_calls == 0 and completions.batch_sizes == [4, 1]:
+    print("✅ Missing ids retried in a smaller batch")
+else:
+    print(f"❌ batches {completions.batch_sizes}, full calls {completions.full_calls}")
+
+print("\n💾 Testing cached matches skip screening...")
+jobs = make_jobs("a", ["Evaluation Officer", "Chef"])
+completions = FakeCompletions()
+results = run(jobs, completions)
+if completions.batch_sizes == [1] and completions.full_calls == 0 and results[jobs[0]['clean_body']]['job_summary'] == "Full":
+    print("✅ Cached full analysis reused; only the uncached job screened")
+else:
+    print(f"❌ batches {completions.batch_sizes}, full calls {completions.full_calls}")
+
+print("\n🔍 Testing batch response parsing...")
+scores = logic.parse_batch_scores(json.loads('{"scores": [{"id": "0", "score": 120}, {"id": "7", "score": 50}, {"id": "1"}, '
+                                  '{"id": "2", "score": "40"}]}'), 3)
+if scores == {0: 100, 2: 40}:
+    print("✅ Out-of-range ids and broken entries skipped, scores clamped")
+else:
+    print(f"❌ Parsed {scores}")
@@ -0,0 +1,94 @@
+import time
+import threading
+from unittest.mock import patch
+
+import search_worker
+
+release = threading.Event()
+jobs = [{"title": f"Policy Officer {i}", "org": "Org", "url": f"http://x/{i}", "source": "Lever", "posting_id": i + 1} for i in range(3)]
+
+def slow_score_jobs(jobs, profile):
+    for i, job in enumerate(jobs):
+        if i == 1:
+            release.wait(5)  # Hold the search mid-way so the test can observe partial results
+        yield job, {"score": 90 - i * 45, "job_summary": "Ok", "strengths": [], "gaps": []}
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+print("🧵 Testing background search...")
+with patch('logic.store_is_fresh', return_value=True), patch('sources.plan', return_value=[]), \
+     patch('logic.fetch_all_jobs') as mock_fetch, \
+     patch('logic.find_matching_postings', return_value=jobs), \
+     patch('logic.score_jobs', side_effect=slow_score_jobs) as mock_score, \
+     patch('database.record_matches_many') as mock_record:
+    search, started = search_worker.start_search(1, {"search_keywords": ["Policy"]})
+    again, started_again = search_worker.start_search(1, {"search_keywords": ["Policy"]})
+    if started and not started_again and again is search:
+        print("✅ Second click attaches to the running search")
+    else:
+        print("❌ Second click started another search")
+
+    if wait_for(lambda: search.snapshot()['scored'] == 1):
+        snapshot = search.snapshot()
+        if not snapshot['done'] and len(snapshot['results']) == 1 and snapshot['shortlisted'] == 3:
+            print("✅ Partial results visible while scoring")
+        else:
+            print(f"❌ Unexpected partial snapshot: {snapshot}")
+    else:
+        print("❌ No progress from the background search")
+
+    release.set()
+    if wait_for(lambda: search.done):
+        snapshot = search.snapshot()
+        # The job scoring 0 is dropped from the feed
+        if snapshot['state'] == "done" and [r['url'] for r in snapshot['results']] == ["http://x/0", "http://x/1"]:
+            print("✅ Search completed with sorted results")
+        else:
+            print(f"❌ Unexpected final snapshot: {snapshot}")
+    else:
+        print("❌ Search did not finish")
+
+    recorded = [m['posting_id'] for call in mock_record.call_args_list for m in call.args[0]]
+    if recorded == [1, 2] and mock_record.call_args_list[0].args[0][0]['user_id'] == 1:
+        print("✅ Scored matches stored for the user")
+    else:
+        print(f"❌ Stored matches: {recorded}")
+
+    if mock_fetch.call_count == 0 and mock_score.call_count == 1:
+        print("✅ Fresh store reused without a crawl")
+    else:
+        print(f"❌ Crawled {mock_fetch.call_count}x, scored {mock_score.call_count}x")
+
+    if search_worker.get_search(1) is search:
+        print("✅ Finished search stays attachable after a rerun")
+    else:
+        print("❌ Finished search lost")
+
+    new_search, started = search_worker.start_search(1, {"search_keywords": ["Policy"]})
+    if started and new_search is not search and wait_for(lambda: new_search.done):
+        print("✅ New search starts once the previous one finished")
+    else:
+        print("❌ Could not start a new search")
+
+print("\n🔑 Testing keywords no crawl has covered...")
+with patch('logic.store_is_fresh', return_value=True), patch('sources.plan', return_value=[("ReliefWeb", None)]), \
+     patch('logic.fetch_all_jobs') as mock_fetch, patch('logic.find_matching_postings', return_value=[]):
+    search, _ = search_worker.start_search(3, {"search_keywords": ["Nutrition"]})
+    if wait_for(lambda: search.done) and mock_fetch.call_count == 1 and mock_fetch.call_args.kwargs.get('new_keys_only'):
+        print("✅ Fresh store still searched for the new keywords")
+    else:
+        print(f"❌ Crawl calls: {mock_fetch.call_args_list}")
+
+print("\n💥 Testing failed search...")
+with patch('logic.store_is_fresh', side_effect=RuntimeError("db locked")):
+    search, _ = search_worker.start_search(2, {})
+    if wait_for(lambda: search.done) and search.snapshot()['error'] == "db locked":
+        print("✅ Failure reported on the search")
+    else:
+        print(f"❌ Unexpected failure state: {search.snapshot()}")
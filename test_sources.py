@@ -0,0 +1,149 @@
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import database
+import instrument
+import logic
+import sources
+import vector_index
+
+instrument.METRICS_LOG = os.path.join(tempfile.mkdtemp(), "fetch_metrics.jsonl")
+database.DB_NAME = os.path.join(tempfile.mkdtemp(), "jobs.db")
+vector_index.INDEX_DIR = os.path.join(tempfile.mkdtemp(), "vector_index")
+database.init_db()
+
+print("📇 Testing the registry...")
+registry = sources.registry()
+lever = [t['org'] for t in registry if t['source'] == "Lever"]
+feeds = [t['source'] for t in registry if t['org'] == sources.FEED]
+if lever == logic.LEVER_ORGS and sorted(feeds) == ["ReliefWeb", "Remote OK"] and sources.names()[0] == "ReliefWeb":
+    print("✅ Registered sources and their default org boards stored")
+else:
+    print(f"❌ Lever {lever}, feeds {feeds}")
+
+database.ensure_sources([("Lever", "newboard")])
+database.set_source_enabled("Lever", "openai", False)
+targets = sources.targets("Lever")
+if "newboard" in targets and "openai" not in targets and len(sources.registry()) == len(registry) + 1:
+    print("✅ Boards added and disabled in the table without touching the code")
+else:
+    print(f"❌ Lever targets {targets}")
+
+print("\n📈 Testing change rates and intervals...")
+start = datetime(2026, 1, 1)
+changed = [{"changed": True}] * 6
+unchanged = [{"changed": False}] * 6
+sources.record_crawl("Remote OK", "", changed, now=start)
+sources.record_crawl("Remote OK", "", changed, now=start + timedelta(hours=2))
+sources.record_crawl("Lever", "dimagi", unchanged, now=start)
+for day in range(1, 4):
+    sources.record_crawl("Lever", "dimagi", unchanged, now=start + timedelta(days=day))
+rows = {(t['source'], t['org']): t for t in database.get_sources()}
+fast, slow = rows[("Remote OK", "")], rows[("Lever", "dimagi")]
+if fast['change_rate'] == 3 and fast['interval_hours'] == sources.MIN_INTERVAL_HOURS and fast['crawls'] == 2 \
+        and slow['interval_hours'] == sources.MAX_INTERVAL_HOURS and slow['last_changed'] is None:
+    print(f"✅ Busy feed every {fast['interval_hours']}h, quiet board every {slow['interval_hours']}h")
+else:
+    print(f"❌ fast {fast}, slow {slow}")
+
+sources.record_crawl("Lever", "dimagi", [{"changed": True}], now=start + timedelta(days=4))
+slow = {(t['source'], t['org']): t for t in database.get_sources()}[("Lever", "dimagi")]
+if 0 < slow['change_rate'] < 1 / 24 and sources.MIN_INTERVAL_HOURS < slow['interval_hours'] < sources.MAX_INTERVAL_HOURS:
+    print(f"✅ A change on a quiet board shortens its interval to {slow['interval_hours']:.0f}h")
+else:
+    print(f"❌ {slow}")
+
+print("\n🗓️ Testing the schedule...")
+now = start + timedelta(days=4, hours=3)
+plan = dict(sources.plan(scheduled=True, now=now))
+everything = dict(sources.plan())
+if "Remote OK" in plan and "dimagi" not in plan["Lever"] and "newboard" in plan["Lever"] \
+        and "openai" not in everything["Lever"] and "dimagi" in everything["Lever"]:
+    print("✅ Only due targets planned; disabled boards never")
+else:
+    print(f"❌ Scheduled {plan}")
+
+calls = {}
+def fake_lever(profile, targets=None):
+    calls["Lever"] = targets
+    return []
+with patch.object(sources, '_now', return_value=now), \
+     patch('logic.fetch_reliefweb', side_effect=lambda profile: calls.setdefault("ReliefWeb", None) or []), \
+     patch('logic.fetch_smartrecruiters', return_value=[]), patch('logic.fetch_greenhouse', return_value=[]), \
+     patch('logic.fetch_lever', side_effect=fake_lever), \
+     patch('logic.fetch_remoteok', side_effect=lambda profile: calls.setdefault("Remote OK", None) or []):
+    messages = []
+    logic.fetch_all_jobs({"search_keywords": ["Evaluation"]}, status_callback=messages.append, scheduled=True)
+if "dimagi" not in calls["Lever"] and "newboard" in calls["Lever"] and "Remote OK" in calls:
+    print("✅ Scheduled crawl fetches only the due boards")
+else:
+    print(f"❌ Fetched {calls}")
+
+crawls = lambda: {(t['source'], t['org']): t['crawls'] for t in database.get_sources()}
+before = crawls()
+later = now + timedelta(days=8)  # Every target due again
+failing = lambda profile, targets=None: logic._fetch_orgs(lambda org: None if org == "newboard" else [], targets, "Lever")
+with patch.object(sources, '_now', return_value=later), \
+     patch('logic.fetch_reliefweb', return_value=None), patch('logic.fetch_smartrecruiters', return_value=[]), \
+     patch('logic.fetch_greenhouse', return_value=[]), patch('logic.fetch_lever', side_effect=failing), \
+     patch('logic.fetch_remoteok', return_value=[]):
+    logic.fetch_all_jobs({"search_keywords": ["Evaluation"]}, scheduled=True)
+plan = dict(sources.plan(scheduled=True, now=later + timedelta(hours=1)))
+after = crawls()
+if after[("ReliefWeb", "")] == before[("ReliefWeb", "")] and after[("Remote OK", "")] == before[("Remote OK", "")] + 1 \
+        and "newboard" in plan["Lever"] and "dimagi" not in plan["Lever"]:
+    print("✅ Failed feeds and boards stay due; a failure isn't recorded as a quiet crawl")
+else:
+    print(f"❌ Crawls {before} -> {after}, still due {plan}")
+
+print("\n🔑 Testing keyword coverage...")
+soon = later + timedelta(hours=2)
+with patch.object(sources, '_now', return_value=soon), \
+     patch('logic.fetch_reliefweb', return_value=[]), patch('logic.fetch_smartrecruiters', return_value=[]), \
+     patch('logic.fetch_greenhouse', return_value=[]), patch('logic.fetch_lever', return_value=[]), \
+     patch('logic.fetch_remoteok', return_value=[]):
+    logic.fetch_all_jobs({"search_keywords": ["Evaluation"]}, new_keys_only=True)
+known = dict(sources.plan(scheduled=True, now=soon + timedelta(minutes=10), profile={"search_keywords": ["Evaluation"]}))
+new_keys = dict(sources.plan(now=soon + timedelta(minutes=10), profile={"search_keywords": ["Nutrition"]}, new_keys_only=True))
+if "ReliefWeb" not in known and "ReliefWeb" in new_keys and "Remote OK" in new_keys \
+        and "Lever" not in new_keys and "Greenhouse" not in new_keys:
+    print("✅ A crawled keyword waits for the schedule; a new one makes the keyword-driven sources due")
+else:
+    print(f"❌ Due for known keywords {list(known)}, for new ones {list(new_keys)}")
+
+print("\n⏱️ Testing sources past the deadline...")
+done = threading.Event()
+def slow_lever(profile, targets=None):
+    try:
+        time.sleep(0.3)
+        return logic._fetch_orgs(lambda org: [], targets, "Lever")
+    finally:
+        done.set()
+before = crawls()
+with patch.object(sources, '_now', return_value=soon + timedelta(days=30)), \
+     patch('logic.fetch_reliefweb', return_value=[]), patch('logic.fetch_smartrecruiters', return_value=[]), \
+     patch('logic.fetch_greenhouse', return_value=[]), patch('logic.fetch_lever', side_effect=slow_lever), \
+     patch('logic.fetch_remoteok', return_value=[]):
+    logic.fetch_all_jobs({"search_keywords": ["Evaluation"]}, deadline=0.05, scheduled=True)
+    done.wait(5)
+    time.sleep(0.1)  # Let the straggler finish returning
+after = crawls()
+if all(after[key] == before[key] for key in after if key[0] == "Lever") and after[("Remote OK", "")] == before[("Remote OK", "")] + 1:
+    print("✅ A source that overran the deadline isn't recorded as crawled")
+else:
+    print(f"❌ Lever crawls {[(k, before[k], after[k]) for k in after if k[0] == 'Lever']}")
+
+print("\n📬 Testing the digest queue...")
+jobs = [{"title": f"Analyst {i}", "org": "Org", "clean_body": f"Evaluation work {i}", "url": f"http://x/{i}",
+         "source": "Lever", "external_id": str(i), "content_hash": logic._content_hash(i)} for i in range(3)]
+database.upsert_postings_many(jobs)
+queued = logic.digest_postings([jobs[0]])
+database.clear_digest_pending([j['posting_id'] for j in queued])
+if sorted(j['posting_id'] for j in queued) == sorted(j['posting_id'] for j in jobs) and logic.digest_postings([]) == []:
+    print("✅ Stored postings waiting for a digest included once, then cleared")
+else:
+    print(f"❌ Digest {queued}")
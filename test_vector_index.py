@@ -0,0 +1,81 @@
+import database
+import logic
+import numpy as np
+import os
+import tempfile
+import vector_index
+
+database.DB_NAME = os.path.join(tempfile.mkdtemp(), "jobs.db")
+vector_index.INDEX_DIR = os.path.join(tempfile.mkdtemp(), "vector_index")
+database.init_db()
+
+profile = {"2_core_tech_stack": ["Impact Evaluation", "Public Policy"], "search_keywords": ["Evaluation"]}
+postings = [
+    {"source": "Lever", "external_id": "1", "title": "Evaluation Specialist", "org": "A", "url": "http://a/1",
+     "clean_body": "Design impact evaluation studies for public policy programmes.", "content_hash": "a1"},
+    {"source": "Lever", "external_id": "2", "title": "Line Cook", "org": "B", "url": "http://b/2",
+     "clean_body": "Prepare meals in a busy kitchen.", "content_hash": "b1"},
+    {"source": "Lever", "external_id": "3", "title": "Policy Analyst", "org": "C", "url": "http://c/3",
+     "clean_body": "Research public policy and support programme evaluation.", "content_hash": "c1"},
+]
+
+print("🗄️ Testing index append...")
+database.upsert_postings_many(postings)
+vector_index.add_postings(postings)
+if vector_index.size() == 3:
+    print("✅ Postings appended")
+else:
+    print(f"❌ Index size {vector_index.size()}")
+
+print("\n🔎 Testing top-K query...")
+jobs = logic.find_matching_postings(profile, top_k=2)
+titles = [j['title'] for j in jobs]
+if titles == ["Evaluation Specialist", "Policy Analyst"]:
+    print(f"✅ Top-K from the index: {titles}")
+else:
+    print(f"❌ Unexpected results: {titles}")
+
+print("\n🔄 Testing updated posting supersedes its old row...")
+changed = dict(postings[0], clean_body="Cooking and kitchen hygiene.", title="Kitchen Porter", content_hash="a2")
+database.upsert_postings_many([changed])
+vector_index.add_postings([changed])
+titles = [j['title'] for j in logic.find_matching_postings(profile, top_k=3)]
+if "Kitchen Porter" not in titles and "Evaluation Specialist" not in titles and titles[0] == "Policy Analyst":
+    print("✅ Stale row ignored")
+else:
+    print(f"❌ Stale row returned: {titles}")
+
+meta = vector_index._load_meta()
+vectors, rows = vector_index._open()
+live = vectors[vector_index._latest(rows[:, 0])]
+if meta['n_documents'] == 3 and (meta['df'] == np.count_nonzero(live, axis=0)).all():
+    print("✅ Document frequencies count only the latest rows")
+else:
+    print(f"❌ {meta['n_documents']} documents counted for {len(live)} live rows")
+
+print("\n🧹 Testing compaction...")
+vector_index.COMPACT_MIN_ROWS = 4
+for i in range(3):
+    vector_index.add_postings([dict(changed, content_hash=f"a{i + 3}")])
+database.upsert_postings_many([dict(changed, content_hash="a5")])
+titles = [j['title'] for j in logic.find_matching_postings(profile, top_k=3)]
+if vector_index.size() < 6 and vector_index._load_meta()['n_documents'] == 3 and titles[0] == "Policy Analyst" \
+        and not os.path.exists(vector_index.INDEX_DIR + ".old"):
+    print(f"✅ Superseded rows dropped ({vector_index.size()} rows left), queries unchanged")
+else:
+    print(f"❌ {vector_index.size()} rows, results {titles}")
+
+print("\n🎯 Testing allowed_ids filter...")
+only = logic.find_matching_postings(profile, allowed_ids={postings[0]['posting_id'], postings[1]['posting_id']})
+if not only:
+    print("✅ Query restricted to allowed postings")
+else:
+    print(f"❌ Unexpected results: {[j['title'] for j in only]}")
+
+print("\n🧱 Testing rebuild from the store...")
+vector_index.rebuild([])
+titles = [j['title'] for j in logic.find_matching_postings(profile, top_k=1)]
+if titles == ["Policy Analyst"]:
+    print("✅ Empty index rebuilt from stored postings")
+else:
+    print(f"❌ Rebuild failed: {titles}")
@@ -0,0 +1,201 @@
+import os
+import json
+import shutil
+import threading
+import numpy as np
+
+import relevance
+
+# On-disk similarity index over crawled postings. Each posting is stored as one
+# row of sublinear term weights (see relevance.term_frequencies) in an
+# append-only float32 matrix that is memory-mapped for queries, alongside an
+# append-only (posting_id, content hash) map and per-bucket document
+# frequencies of the latest row of each posting. Queries compute exact TF-IDF
+# cosine similarity in chunks, so a profile can be matched against every stored
+# posting without a live crawl. Once superseded rows make up most of the files,
+# the index is rewritten with only the latest rows.
+
+INDEX_DIR = "vector_index"
+QUERY_CHUNK_ROWS = 16384
+COMPACT_MIN_ROWS = 10000  # Smaller indexes are never compacted
+COMPACT_DEAD_FRACTION = 0.5  # Share of superseded rows that triggers a compaction
+
+_lock = threading.Lock()
+
+def _paths(index_dir=None):
+    index_dir = index_dir or INDEX_DIR
+    return (os.path.join(index_dir, "vectors.f32"),
+            os.path.join(index_dir, "rows.i64"),
+            os.path.join(index_dir, "meta.json"))
+
+def hash_key(content_hash):
+    """First 60 bits of a posting's content hash (fits an int64), used to spot stale rows."""
+    return int((content_hash or "0")[:15], 16)
+
+def _load_meta():
+    _, _, meta_path = _paths()
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        meta['df'] = np.asarray(meta['df'], dtype=np.float64)
+        return meta
+    except (OSError, ValueError, KeyError):
+        return {"dim": relevance.EMBEDDING_DIM, "n_documents": 0,
+                "df": np.zeros(relevance.EMBEDDING_DIM, dtype=np.float64)}
+
+def _save_meta(meta, index_dir=None):
+    _, _, meta_path = _paths(index_dir)
+    data = dict(meta, df=meta['df'].tolist())
+    with open(meta_path + ".tmp", "w") as f:
+        json.dump(data, f)
+    os.replace(meta_path + ".tmp", meta_path)
+
+def size():
+    _, rows_path, _ = _paths()
+    try:
+        return os.path.getsize(rows_path) // 16
+    except OSError:
+        return 0
+
+def _latest(ids):
+    """Mask of the last row of each id."""
+    _, last_from_end = np.unique(ids[::-1], return_index=True)
+    latest = np.zeros(len(ids), dtype=bool)
+    latest[len(ids) - 1 - last_from_end] = True
+    return latest
+
+def append_vectors(posting_ids, content_hashes, tf_matrix):
+    """Appends precomputed term-weight rows. Later rows for a posting id supersede earlier ones.
+
+    The rows they supersede stop counting toward the document frequencies.
+    """
+    if len(posting_ids) == 0:
+        return
+    posting_ids = np.asarray(posting_ids, dtype=np.int64)
+    keep = _latest(posting_ids)
+    tf_matrix = np.ascontiguousarray(np.asarray(tf_matrix, dtype=np.float32)[keep])
+    rows = np.column_stack([posting_ids[keep],
+                            np.asarray([hash_key(h) for h in content_hashes], dtype=np.int64)[keep]])
+    vectors_path, rows_path, _ = _paths()
+    with _lock:
+        os.makedirs(INDEX_DIR, exist_ok=True)
+        meta = _load_meta()
+        vectors, stored = _open()
+        if stored is not None:
+            superseded = np.flatnonzero(_latest(stored[:, 0]) & np.isin(stored[:, 0], rows[:, 0]))
+            if len(superseded):
+                meta['df'] -= np.count_nonzero(np.asarray(vectors[superseded]), axis=0)
+                meta['n_documents'] -= len(superseded)
+            del vectors
+        n = size()
+        # rows.i64 is the source of truth; drop vector rows left over from an interrupted append
+        with open(vectors_path, "ab") as f:
+            f.truncate(n * relevance.EMBEDDING_DIM * 4)
+            f.write(tf_matrix.tobytes())
+        with open(rows_path, "ab") as f:
+            f.write(rows.tobytes())
+        meta['df'] += np.count_nonzero(tf_matrix, axis=0)
+        meta['n_documents'] += len(rows)
+        _save_meta(meta)
+        total = n + len(rows)
+        if total >= COMPACT_MIN_ROWS and total - meta['n_documents'] > COMPACT_DEAD_FRACTION * total:
+            _compact()
+
+def _compact():
+    """Rewrites the index with only the latest row of each posting and recounts its document frequencies.
+
+    The new files are written to a side directory that replaces the index; a
+    crash mid-swap leaves no index, which find_matching_postings rebuilds from
+    the store. Call with _lock held.
+    """
+    vectors, rows = _open()
+    if rows is None:
+        return
+    keep = np.flatnonzero(_latest(rows[:, 0]))
+    new_dir, old_dir = INDEX_DIR + ".compact", INDEX_DIR + ".old"
+    shutil.rmtree(new_dir, ignore_errors=True)
+    os.makedirs(new_dir)
+    vectors_path, rows_path, _ = _paths(new_dir)
+    df = np.zeros(relevance.EMBEDDING_DIM, dtype=np.float64)
+    with open(vectors_path, "wb") as f:
+        for start in range(0, len(keep), QUERY_CHUNK_ROWS):
+            chunk = np.asarray(vectors[keep[start:start + QUERY_CHUNK_ROWS]])
+            df += np.count_nonzero(chunk, axis=0)
+            f.write(chunk.tobytes())
+    rows[keep].tofile(rows_path)
+    _save_meta({"dim": relevance.EMBEDDING_DIM, "n_documents": len(keep), "df": df}, new_dir)
+    del vectors
+    shutil.rmtree(old_dir, ignore_errors=True)
+    os.replace(INDEX_DIR, old_dir)
+    os.replace(new_dir, INDEX_DIR)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+def add_postings(postings):
+    """Embeds and appends postings (dicts with posting_id, content_hash, title, clean_body)."""
+    postings = [p for p in postings if p.get('posting_id')]
+    if not postings:
+        return
+    tf_matrix = relevance.term_frequencies([relevance.job_text(p) for p in postings])
+    append_vectors([p['posting_id'] for p in postings], [p.get('content_hash') for p in postings], tf_matrix)
+
+def _open():
+    vectors_path, rows_path, _ = _paths()
+    n = size()
+    if n == 0:
+        return None, None
+    vectors = np.memmap(vectors_path, dtype=np.float32, mode="r", shape=(n, relevance.EMBEDDING_DIM))
+    rows = np.fromfile(rows_path, dtype=np.int64, count=n * 2).reshape(n, 2)
+    return vectors, rows
+
+def query(profile, top_k=relevance.TOP_K, allowed_ids=None):
+    """Returns [(posting_id, content_hash_key, score)] for the top_k stored postings most similar to profile, best first.
+
+    allowed_ids restricts the search to a set of posting ids (e.g. today's new postings).
+    """
+    vectors, rows = _open()
+    if vectors is None:
+        return []
+    query_tf = relevance.term_frequencies([relevance.profile_text(profile)])[0]
+    if not query_tf.any():
+        return []
+
+    meta = _load_meta()
+    idf = relevance.idf_weights(meta['df'], meta['n_documents'])
+    weighted_query = query_tf * idf * idf
+    idf_squared = idf * idf
+
+    # Only the latest row of each posting counts
+    ids = rows[:, 0]
+    live = _latest(ids)
+    if allowed_ids is not None:
+        live &= np.isin(ids, np.fromiter(allowed_ids, dtype=np.int64))
+
+    # Score only live rows; a small allowed set touches just its own pages of the memmap
+    live_rows = np.flatnonzero(live)
+    scores = np.full(len(ids), -np.inf, dtype=np.float32)
+    for start in range(0, len(live_rows), QUERY_CHUNK_ROWS):
+        chunk_rows = live_rows[start:start + QUERY_CHUNK_ROWS]
+        if chunk_rows[-1] - chunk_rows[0] + 1 == len(chunk_rows):
+            chunk = np.asarray(vectors[chunk_rows[0]:chunk_rows[-1] + 1])
+        else:
+            chunk = vectors[chunk_rows]
+        norms = np.sqrt((chunk * chunk) @ idf_squared)
+        norms[norms == 0] = 1.0
+        scores[chunk_rows] = (chunk @ weighted_query) / norms
+
+    k = min(top_k, int(live.sum()))
+    if k <= 0:
+        return []
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top], kind="stable")]
+    query_norm = float(np.linalg.norm(query_tf * idf)) or 1.0
+    return [(int(ids[i]), int(rows[i, 1]), float(scores[i]) / query_norm) for i in top if scores[i] > 0]
+
+def rebuild(postings):
+    """Replaces the index with the given postings, e.g. after jobs.db was reset."""
+    vectors_path, rows_path, meta_path = _paths()
+    with _lock:
+        for path in (vectors_path, rows_path, meta_path):
+            if os.path.exists(path):
+                os.remove(path)
+    add_postings(postings)